@@ -0,0 +1,480 @@
+# cli.py
+"""
+Línea de comandos para tareas de mantenimiento y reportes.
+
+    python cli.py snapshot exportar reportes/contactos.snap
+    python cli.py snapshot actualizar reportes/contactos.snap
+    python cli.py cambios listar --desde 120
+    python cli.py cambios compactar
+    python cli.py purga --dias 30
+    python cli.py shards rebalancear --desde 0 --hasta 4
+    python cli.py stats
+    python cli.py dominios --limite 15
+    python cli.py dominios --listar acme.com
+    python cli.py listar --campos nombre,email --donde email_dominio=acme.com --orden apellido
+    python cli.py listar --etiquetas "cliente vip|socio -baja_pendiente"
+    python cli.py etiquetas listar
+    python cli.py etiquetas agregar cliente vip --ids 10 11 12
+    python cli.py carga --hilos 8 --procesos 2 --duracion 10
+    python cli.py backup completo respaldos/lunes.db.gz
+    python cli.py backup incremental respaldos/martes.db.gz --base respaldos/lunes.db.gz
+    python cli.py backup restaurar respaldos/martes.db.gz
+    python cli.py cifrado clave > ~/.contactos.clave
+    python cli.py cifrado cifrar
+    python cli.py cifrado medir --cantidad 20000
+    python cli.py reporte reportes/calidad.html --procesos 4
+    python cli.py calidad auditar
+    python cli.py listar --invalidos
+    python cli.py memoria --cantidad 200000
+    python cli.py vcard importar agenda.vcf --procesos 4
+    python cli.py vcard exportar reportes/contactos.vcf --version 4.0
+    python cli.py conformidad --operaciones 2000 --motores sqlite memoria particionado
+"""
+import argparse
+import os
+import sys
+
+# Añadir el directorio raíz del proyecto al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from repository.cambio_repository import CambioRepository
+from config.settings import DB_PATH, SHARD_CANTIDAD
+from repository import particionado_repository
+from repository.consulta import CAMPOS, Consulta, parsear_etiquetas
+from repository.contacto_repository import ContactoRepository
+from repository.fabrica import crear_repositorio
+from repository.cifrado import Cifrador, generar_clave, proveedor_configurado
+from services import (
+    backup_services,
+    calidad_services,
+    carga_services,
+    cifrado_services,
+    conformidad_services,
+    memoria_services,
+    purga_services,
+    reporte_services,
+    snapshot_services,
+    vcard_services,
+)
+from services.db_services import init_schema
+from services.estadisticas_services import PERIODOS, EstadisticasService
+
+
+def _cmd_snapshot(args):
+    if args.accion == "exportar":
+        n = snapshot_services.exportar_snapshot(args.destino, args.db)
+        print(f"Snapshot exportado: {n} contactos -> {args.destino}")
+    else:
+        n = snapshot_services.actualizar_snapshot(args.destino, args.db)
+        print(f"Snapshot actualizado: {n} contactos con cambios")
+
+
+def _cmd_cambios(args):
+    repo = CambioRepository(args.db)
+    if args.accion == "listar":
+        for cambio in repo.cambios_desde(args.desde, args.limite):
+            print(f"{cambio.seq}\t{cambio.momento}\t{cambio.operacion}\t{cambio.contacto_id}")
+    else:
+        truncadas, colapsadas = repo.compactar(args.hasta)
+        print(f"Registro compactado: {truncadas} truncadas, {colapsadas} colapsadas")
+
+
+def _cmd_purga(args):
+    for ruta in _rutas(args):
+        if args.habilitar_vacuum:
+            purga_services.habilitar_vacuum_incremental(ruta)
+            print(f"{ruta or DB_PATH}: auto_vacuum = INCREMENTAL habilitado")
+        n = purga_services.purgar_bajas(args.dias, args.presupuesto, db_path=ruta)
+        print(f"{ruta or DB_PATH}: {n} bajas purgadas")
+
+
+def _cmd_shards(args):
+    # 0 shards = la base única (DB_PATH o --db)
+    def rutas(cantidad):
+        if cantidad == 0:
+            return [args.db or DB_PATH]
+        return particionado_repository.rutas_shards(cantidad)
+
+    n = particionado_repository.rebalancear(rutas(args.desde), rutas(args.hasta))
+    print(f"Contactos movidos: {n}")
+    if args.hasta != SHARD_CANTIDAD:
+        print(f"Recordá fijar SHARD_CANTIDAD = {args.hasta} en config/settings.py")
+
+
+def _repositorio(args):
+    """Repositorio sobre --db si se indicó; si no, el configurado (simple o particionado)."""
+    return ContactoRepository(args.db) if args.db else crear_repositorio()
+
+
+def _rutas(args):
+    """Bases sobre las que operar: --db, los shards configurados o DB_PATH (None)."""
+    if args.db:
+        return [args.db]
+    if SHARD_CANTIDAD > 0:
+        return particionado_repository.rutas_shards()
+    return [None]
+
+
+def _estadisticas(args) -> EstadisticasService:
+    if args.db:
+        return EstadisticasService([args.db])
+    if SHARD_CANTIDAD > 0:
+        return EstadisticasService(particionado_repository.rutas_shards())
+    return EstadisticasService()
+
+
+def _cmd_stats(args):
+    stats = _estadisticas(args)
+    print(f"Contactos activos: {stats.total()}")
+    secciones = (
+        ("Por dominio de email", stats.por_dominio(args.limite)),
+        ("Por prefijo de teléfono", stats.por_prefijo_telefono(limite=args.limite)),
+        ("Por inicial del apellido", stats.por_inicial()),
+        (
+            f"Altas por {'día' if args.periodo == 'dia' else 'mes'} (activos)",
+            stats.por_periodo(args.periodo, args.limite),
+        ),
+    )
+    for titulo, filas in secciones:
+        print(f"\n{titulo}:")
+        for clave, cantidad in filas:
+            print(f"  {clave or '(vacío)':<30} {cantidad:>10}")
+
+
+def _cmd_dominios(args):
+    if args.listar:
+        for c in _repositorio(args).buscar_por_dominio(args.listar, args.limite):
+            print(f"{c.id}\t{c.nombre} {c.apellido}\t{c.email}\t{c.telefono}")
+        return
+
+    stats = _estadisticas(args)
+    total = stats.total()
+    filas = stats.por_dominio(args.limite)
+    ancho = 40
+    maximo = max((cantidad for _, cantidad in filas), default=0)
+    print(f"Dominios de email ({total} contactos activos):")
+    for dominio, cantidad in filas:
+        barra = "█" * round(ancho * cantidad / maximo) if maximo else ""
+        porcentaje = 100 * cantidad / total if total else 0
+        print(f"  {dominio or '(vacío)':<30} {cantidad:>8} {porcentaje:5.1f}% {barra}")
+
+
+def _cmd_listar(args):
+    consulta = Consulta().seleccionar(*args.campos).ordenar_por(args.orden, args.desc)
+    for campo, valor in args.donde:
+        consulta = consulta.filtrar(campo, "=", valor)
+    if args.buscar:
+        consulta = consulta.buscar(args.buscar)
+    if args.bajas:
+        consulta = consulta.con_estado("bajas")
+    if args.invalidos:
+        consulta = consulta.solo_invalidos()
+    consulta = consulta.con_clausulas(args.etiquetas).limitar(args.limite, args.desde)
+    print("\t".join(args.campos))
+    for fila in _repositorio(args).filas(consulta):
+        print("\t".join("" if valor is None else str(valor) for valor in fila))
+
+
+def _cmd_etiquetas(args):
+    repo = _repositorio(args)
+    if args.accion == "listar":
+        for nombre, cantidad in repo.etiquetas():
+            print(f"  {nombre:<30} {cantidad:>10}")
+    elif args.accion == "agregar":
+        print(f"{repo.etiquetar(args.ids, args.nombres)} asignaciones nuevas")
+    elif args.accion == "quitar":
+        print(f"{repo.desetiquetar(args.ids, args.nombres)} asignaciones quitadas")
+    else:
+        for nombre in args.nombres:
+            print(f"{nombre}: quitada de {repo.eliminar_etiqueta(nombre)} contactos")
+
+
+def _etiquetas(texto: str):
+    try:
+        return parsear_etiquetas(texto)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err)) from err
+
+
+def _campos(texto: str):
+    campos = tuple(c.strip() for c in texto.split(",") if c.strip())
+    desconocidos = [c for c in campos if c not in CAMPOS]
+    if not campos or desconocidos:
+        raise argparse.ArgumentTypeError(f"campos válidos: {', '.join(CAMPOS)}")
+    return campos
+
+
+def _igualdad(texto: str):
+    campo, igual, valor = texto.partition("=")
+    if not igual or campo not in CAMPOS:
+        raise argparse.ArgumentTypeError(f"se espera CAMPO=VALOR con CAMPO en {', '.join(CAMPOS)}")
+    return campo, valor
+
+
+def _cmd_backup(args):
+    if args.accion in ("completo", "incremental"):
+        os.makedirs(os.path.dirname(os.path.abspath(args.respaldo)), exist_ok=True)
+    try:
+        if args.accion == "completo":
+            m = backup_services.respaldar(args.respaldo, args.db, args.paginas)
+        elif args.accion == "incremental":
+            if not args.base:
+                raise SystemExit("backup incremental: falta --base (respaldo anterior)")
+            m = backup_services.respaldar_incremental(args.respaldo, args.base, args.db)
+        elif args.accion == "verificar":
+            for archivo in backup_services.verificar_respaldo(args.respaldo):
+                print(f"OK  {archivo}")
+            return
+        else:
+            m = backup_services.restaurar(args.respaldo, args.db, args.paginas)
+            print(f"Base restaurada al respaldo {args.respaldo} (seq {m['seq_hasta']}, {m['momento']} UTC)")
+            return
+    except backup_services.ErrorRespaldo as err:
+        raise SystemExit(f"Error: {err}")
+    print(
+        f"Respaldo {m['tipo']}: {args.respaldo} ({m['bytes']} bytes, "
+        f"seq {m['seq_desde']}..{m['seq_hasta']}, {m['contactos']} contactos)"
+    )
+
+
+def _mezcla(texto: str):
+    """'leer=30,alta=10' -> {'leer': 30, 'alta': 10}"""
+    try:
+        mezcla = {k.strip(): int(v) for k, v in (par.split("=") for par in texto.split(","))}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Mezcla inválida: {texto!r} (ej.: leer=30,alta=10)")
+    desconocidas = set(mezcla) - set(carga_services.OPERACIONES)
+    if desconocidas:
+        raise argparse.ArgumentTypeError(
+            f"Operaciones desconocidas: {', '.join(sorted(desconocidas))} "
+            f"(válidas: {', '.join(carga_services.OPERACIONES)})"
+        )
+    return mezcla
+
+
+def _cmd_carga(args):
+    resultado = carga_services.ejecutar_carga(
+        hilos=args.hilos,
+        procesos=args.procesos,
+        duracion=args.duracion,
+        mezcla=args.mezcla,
+        semilla=args.semilla,
+        shards=args.shards,
+        precarga=args.precarga,
+        fondo=not args.sin_fondo,
+        conservar=args.conservar,
+    )
+    print(resultado.reporte())
+    if not resultado.ok:
+        raise SystemExit(1)
+
+
+def _cmd_conformidad(args):
+    resultado = conformidad_services.verificar_conformidad(
+        tuple(args.motores), args.operaciones, args.semilla
+    )
+    print(resultado.reporte())
+    if not resultado.ok:
+        raise SystemExit(1)
+
+
+def _cmd_cifrado(args):
+    if args.accion == "clave":
+        print(generar_clave())
+    elif args.accion == "medir":
+        print(cifrado_services.medir_cifrado(args.cantidad).reporte())
+    else:
+        cifrador = Cifrador(proveedor_configurado())
+        for ruta in _rutas(args):
+            if args.accion == "cifrar":
+                n = cifrado_services.cifrar_existentes(cifrador, ruta)
+            else:
+                n = cifrado_services.descifrar_existentes(cifrador, ruta)
+            print(f"{ruta or DB_PATH}: {n} contactos {'cifrados' if args.accion == 'cifrar' else 'en claro'}")
+
+
+def _cmd_calidad(args):
+    auditoria = calidad_services.AuditoriaCalidad(_rutas(args))
+    if args.accion == "auditar":
+        r = auditoria.auditar(args.completa)
+        print(
+            f"Auditoría {'completa' if r.completa else 'incremental'}: {r.revisados} revisados, "
+            f"{r.invalidos} inválidos ({r.total_invalidos} en total), seq {r.seq}, {r.segundos:.2f} s"
+        )
+    else:
+        for error, cantidad in auditoria.resumen():
+            print(f"  {error:<60} {cantidad:>10}")
+
+
+def _cmd_memoria(args):
+    if args.cantidad:
+        medicion = memoria_services.medir_memoria_sintetica(args.cantidad)
+    else:
+        medicion = memoria_services.medir_memoria(_repositorio(args))
+    print(medicion.reporte())
+
+
+def _cmd_reporte(args):
+    reporte = reporte_services.generar_reporte(_rutas(args), args.procesos)
+    print(reporte.texto(args.limite))
+    for destino in args.destinos:
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        formato = reporte_services.exportar_reporte(reporte, destino)
+        print(f"Reporte {formato.upper()}: {destino}")
+
+
+def _cmd_vcard(args):
+    repo = _repositorio(args)
+    if args.accion == "importar":
+        r = vcard_services.importar_vcard(repo, args.archivo, args.procesos)
+        print(
+            f"{r.importados} contactos importados ({r.omitidos} tarjetas vacías omitidas) "
+            f"en {r.segundos:.2f} s: {r.trozos} trozos, {r.procesos} proceso(s)"
+        )
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.archivo)), exist_ok=True)
+        n = vcard_services.exportar_vcard(repo, args.archivo, args.version)
+        print(f"{n} contactos exportados a {args.archivo} (vCard {args.version})")
+
+
+def construir_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="ABM de Contactos - herramientas")
+    parser.add_argument("--db", help="Ruta de la base (por defecto DB_PATH)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("snapshot", help="Snapshot columnar para reportes")
+    p.add_argument("accion", choices=("exportar", "actualizar"))
+    p.add_argument("destino", help="Ruta del archivo de snapshot")
+    p.set_defaults(func=_cmd_snapshot)
+
+    p = sub.add_parser("cambios", help="Registro de cambios (CDC)")
+    p.add_argument("accion", choices=("listar", "compactar"))
+    p.add_argument("--desde", type=int, default=0, help="Listar cambios con seq mayor")
+    p.add_argument("--limite", type=int, default=1000)
+    p.add_argument("--hasta", type=int, help="Compactar como máximo hasta este seq")
+    p.set_defaults(func=_cmd_cambios)
+
+    p = sub.add_parser("purga", help="Purga de bajas lógicas antiguas")
+    p.add_argument("--dias", type=float, default=purga_services.PURGA_ANTIGUEDAD_DIAS)
+    p.add_argument("--presupuesto", type=float, default=5.0, help="Segundos máximos")
+    p.add_argument(
+        "--habilitar-vacuum",
+        action="store_true",
+        help="Activar auto_vacuum incremental (VACUUM completo, una sola vez)",
+    )
+    p.set_defaults(func=_cmd_purga)
+
+    p = sub.add_parser("shards", help="Almacén particionado en varios archivos")
+    p.add_argument("accion", choices=("rebalancear",))
+    p.add_argument("--desde", type=int, default=SHARD_CANTIDAD, help="Shards actuales (0 = base única)")
+    p.add_argument("--hasta", type=int, required=True, help="Shards destino (0 = base única)")
+    p.set_defaults(func=_cmd_shards)
+
+    p = sub.add_parser("stats", help="Estadísticas agregadas de contactos")
+    p.add_argument("--limite", type=int, default=10, help="Filas por sección")
+    p.add_argument("--periodo", choices=tuple(PERIODOS), default="mes", help="Crecimiento por día o mes")
+    p.set_defaults(func=_cmd_stats)
+
+    p = sub.add_parser("dominios", help="Histograma de dominios de email / contactos de un dominio")
+    p.add_argument("--limite", type=int, default=20, help="Dominios (o contactos) a mostrar")
+    p.add_argument("--listar", metavar="DOMINIO", help="Listar los contactos de este dominio")
+    p.set_defaults(func=_cmd_dominios)
+
+    p = sub.add_parser("listar", help="Consulta de contactos con filtros, orden y proyección")
+    p.add_argument("--campos", type=_campos, default=("id", "nombre", "apellido", "telefono", "email"),
+                   help="Columnas a mostrar, separadas por comas")
+    p.add_argument("--donde", type=_igualdad, action="append", default=[], metavar="CAMPO=VALOR")
+    p.add_argument("--buscar", help="Texto contenido en nombre, apellido, teléfono o email")
+    p.add_argument("--orden", choices=CAMPOS, default="id")
+    p.add_argument("--desc", action="store_true", help="Orden descendente")
+    p.add_argument("--limite", type=int, default=50)
+    p.add_argument("--desde", type=int, default=0, help="Filas a saltear")
+    p.add_argument("--bajas", action="store_true", help="Listar los dados de baja")
+    p.add_argument("--etiquetas", type=_etiquetas, default=(),
+                   help='Filtro por etiquetas: "a b|c -d" = a y (b o c) y no d')
+    p.add_argument("--invalidos", action="store_true",
+                   help="Solo los inválidos según la última auditoría (ver 'calidad auditar')")
+    p.set_defaults(func=_cmd_listar)
+
+    p = sub.add_parser("etiquetas", help="Etiquetas de contactos")
+    p.add_argument("accion", choices=("listar", "agregar", "quitar", "eliminar"))
+    p.add_argument("nombres", nargs="*", help="Etiquetas a agregar/quitar/eliminar")
+    p.add_argument("--ids", type=int, nargs="+", default=[], help="Contactos a etiquetar")
+    p.set_defaults(func=_cmd_etiquetas)
+
+    p = sub.add_parser("carga", help="Prueba de carga con clientes concurrentes (bases temporales)")
+    p.add_argument("--hilos", type=int, default=4, help="Clientes por proceso")
+    p.add_argument("--procesos", type=int, default=1)
+    p.add_argument("--duracion", type=float, default=5.0, help="Segundos")
+    p.add_argument("--shards", type=int, default=0, help="Probar el almacén particionado")
+    p.add_argument("--precarga", type=int, default=500, help="Contactos iniciales")
+    p.add_argument("--semilla", type=int, help="Para repetir una corrida")
+    p.add_argument(
+        "--mezcla",
+        type=_mezcla,
+        help=f"Pesos por operación (por defecto {','.join(f'{k}={v}' for k, v in carga_services.MEZCLA.items())})",
+    )
+    p.add_argument("--sin-fondo", action="store_true", help="Sin purga/compactación/stats concurrentes")
+    p.add_argument("--conservar", action="store_true", help="No borrar las bases temporales")
+    p.set_defaults(func=_cmd_carga)
+
+    p = sub.add_parser("backup", help="Respaldos en caliente y restauración")
+    p.add_argument("accion", choices=("completo", "incremental", "verificar", "restaurar"))
+    p.add_argument("respaldo", help="Archivo de respaldo (gzip si termina en .gz)")
+    p.add_argument("--base", help="Respaldo anterior (para incremental)")
+    p.add_argument("--paginas", type=int, default=1024, help="Páginas copiadas por paso")
+    p.set_defaults(func=_cmd_backup)
+
+    p = sub.add_parser("cifrado", help="Cifrado de telefono/email (ver CIFRADO_CAMPOS)")
+    p.add_argument("accion", choices=("clave", "cifrar", "descifrar", "medir"))
+    p.add_argument("--cantidad", type=int, default=20_000, help="Contactos para medir")
+    p.set_defaults(func=_cmd_cifrado)
+
+    p = sub.add_parser("calidad", help="Auditoría incremental de calidad de datos")
+    p.add_argument("accion", choices=("auditar", "resumen"))
+    p.add_argument("--completa", action="store_true", help="Revalidar todo, no solo lo modificado")
+    p.set_defaults(func=_cmd_calidad)
+
+    p = sub.add_parser("memoria", help="Memoria de los listados masivos (slots, internado, streaming)")
+    p.add_argument("--cantidad", type=int, help="Medir sobre N contactos al azar en vez de la base")
+    p.set_defaults(func=_cmd_memoria)
+
+    p = sub.add_parser("conformidad", help="Comparar motores de almacenamiento (bases temporales)")
+    p.add_argument("--operaciones", type=int, default=1000)
+    p.add_argument("--semilla", type=int, help="Para repetir una corrida")
+    p.add_argument(
+        "--motores",
+        nargs="+",
+        choices=conformidad_services.MOTORES,
+        default=["sqlite", "memoria"],
+        help="El primero es la referencia",
+    )
+    p.set_defaults(func=_cmd_conformidad)
+
+    p = sub.add_parser("reporte", help="Reporte de calidad de datos en paralelo (HTML/CSV)")
+    p.add_argument("destinos", nargs="*", help="Archivos .html o .csv (si no, solo por pantalla)")
+    p.add_argument("--procesos", type=int, help="Procesos del pool (por defecto REPORTE_PROCESOS o núcleos)")
+    p.add_argument("--limite", type=int, default=15, help="Dominios a mostrar por pantalla")
+    p.set_defaults(func=_cmd_reporte)
+
+    p = sub.add_parser("vcard", help="Importar/exportar contactos en vCard (.vcf)")
+    p.add_argument("accion", choices=("importar", "exportar"))
+    p.add_argument("archivo", help="Archivo .vcf")
+    p.add_argument("--procesos", type=int, help="Procesos que parsean (por defecto VCARD_PROCESOS o núcleos)")
+    p.add_argument("--version", choices=vcard_services.VERSIONES, default="3.0", help="Versión al exportar")
+    p.set_defaults(func=_cmd_vcard)
+
+    return parser
+
+
+def main(argv=None):
+    args = construir_parser().parse_args(argv)
+    # Crea/migra el esquema antes de operar: la base indicada (o DB_PATH) y,
+    # si el almacén está particionado, cada shard
+    for ruta in dict.fromkeys([args.db] + _rutas(args)):
+        init_schema(db_path=ruta)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
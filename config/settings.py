@@ -5,4 +5,75 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 # Ruta ABSOLUTA a la base, para no depender del directorio de ejecución
-DB_PATH = (BASE_DIR / "database" / "contactos.db").as_posix()
\ No newline at end of file
+DB_PATH = (BASE_DIR / "database" / "contactos.db").as_posix()
+
+# Script DDL que aplica init_schema (tablas, índices y triggers)
+SCHEMA_PATH = (BASE_DIR / "database" / "schema.sql").as_posix()
+
+# Baja lógica: "Dar de Baja" marca la columna `baja` en lugar de borrar la fila
+BAJA_LOGICA = True
+
+# Purga en segundo plano de bajas lógicas antiguas
+PURGA_ANTIGUEDAD_DIAS = 30
+PURGA_INTERVALO_SEGUNDOS = 3600
+PURGA_PRESUPUESTO_SEGUNDOS = 0.5
+
+# Motor del repositorio (repository/fabrica.py): "sqlite" (DB_PATH, con las
+# opciones de abajo) o "memoria" (repository/memoria_repository.py: sin
+# archivo, para pruebas y procesos efímeros; se pierde al cerrar)
+REPOSITORIO_MOTOR = "sqlite"
+
+# Particionado (sharding) del almacén en varios archivos SQLite.
+# 0 = un solo archivo (DB_PATH); N > 0 = N shards en SHARD_DIR, ruteados por id % N
+SHARD_CANTIDAD = 0
+SHARD_DIR = (BASE_DIR / "database" / "shards").as_posix()
+
+# País que se asume para teléfonos escritos sin código internacional (ver models/telefono.py)
+TELEFONO_PAIS = "54"
+
+# Acceso concurrente (GUI + scripts sobre la misma base, ver database/conexion.py)
+# WAL: los lectores no bloquean al escritor ni al revés. Se fija en init_schema
+# y queda guardado en el archivo; "DELETE" vuelve al diario clásico.
+DB_MODO_DIARIO = "WAL"
+DB_BUSY_TIMEOUT = 2.0  # segundos que SQLite espera un lock antes de fallar
+DB_REINTENTOS = 5  # reintentos (con backoff exponencial y jitter) tras ese timeout
+DB_REINTENTO_BASE = 0.05  # segundos
+DB_REINTENTO_MAXIMO = 2.0  # segundos
+
+# Cifrado en reposo de telefono y email (repository/cifrado.py). La clave
+# maestra (32 bytes en base64, ver `python cli.py cifrado clave`) se lee del
+# archivo CIFRADO_CLAVE_ARCHIVO o, si es None, de la variable de entorno
+# CIFRADO_CLAVE_VARIABLE. Las bases existentes se migran con
+# `python cli.py cifrado cifrar`.
+CIFRADO_CAMPOS = False
+CIFRADO_CLAVE_ARCHIVO = None
+CIFRADO_CLAVE_VARIABLE = "CONTACTOS_CLAVE"
+CIFRADO_CACHE = 20_000  # valores descifrados que se recuerdan (LRU)
+
+# Reporte de calidad (services/reporte_services.py): procesos del pool
+# (None = uno por núcleo) y rangos de ids por proceso
+REPORTE_PROCESOS = None
+REPORTE_PARTICIONES_POR_PROCESO = 4
+
+# Espejo en memoria para lecturas (repository/espejo_repository.py): las
+# lecturas se sirven desde una copia en RAM y las escrituras van a disco.
+ESPEJO_MEMORIA = False
+ESPEJO_SINCRONIZAR_SEGUNDOS = 1.0  # cada cuánto, como máximo, mirar cambios de otros procesos
+ESPEJO_VERIFICAR_SEGUNDOS = 300.0  # cada cuánto comparar los conteos de espejo y disco
+
+# Refresco automático de la grilla: cada GUI_REFRESCO_SEGUNDOS se pregunta
+# PRAGMA data_version y, si otra conexión escribió, se releen solo los contactos
+# tocados (ver services/notificaciones_services.py).
+GUI_REFRESCO_SEGUNDOS = 1.0
+
+# Eventos de la GUI agrupados con gui/planificador.py: la selección de la
+# grilla actualiza los botones como mucho cada GUI_SELECCION_MS (ms) y el
+# filtro de etiquetas se aplica tras GUI_FILTRO_MS (ms) sin teclear.
+GUI_SELECCION_MS = 100
+GUI_FILTRO_MS = 300
+
+# Importación de vCard (services/vcard_services.py): procesos que parsean
+# (None = uno por núcleo), bytes de archivo por trozo y contactos por transacción
+VCARD_PROCESOS = None
+VCARD_TROZO_BYTES = 4 * 2**20
+VCARD_LOTE = 5000
\ No newline at end of file
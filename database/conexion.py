@@ -1,17 +1,160 @@
+import random
 import sqlite3
-from config.settings import DB_PATH
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
-def obtener_conexion():
-    # abre una conexión SQLlite hacia la ruta DB_PATG
+from config.settings import (
+    DB_BUSY_TIMEOUT,
+    DB_PATH,
+    DB_REINTENTO_BASE,
+    DB_REINTENTO_MAXIMO,
+    DB_REINTENTOS,
+)
+
+
+class ErrorConexion(sqlite3.OperationalError):
+    """No se pudo abrir la base (ruta inválida, permisos, archivo dañado...)."""
+
+
+def obtener_conexion(db_path=None):
+    # abre una conexión SQLite hacia DB_PATH (o hacia db_path si se indica).
+    # `timeout` instala el busy handler: ante un lock de otro proceso SQLite
+    # espera hasta DB_BUSY_TIMEOUT segundos antes de devolver "database is locked".
+    ruta = db_path or DB_PATH
     try:
-        #sqlite3.connect: conexión abierta a la base SQLite.
-        conexion = sqlite3.connect(DB_PATH)
-        return conexion
+        #sqlite3.connect: conexión abierta a la base SQLite. Las rutas "file:..."
+        #son URIs (p. ej. bases en memoria compartidas, ver espejo_repository).
+        return sqlite3.connect(ruta, timeout=DB_BUSY_TIMEOUT, uri=str(ruta).startswith("file:"))
     except sqlite3.Error as err:
-        print(f"Error al conectar a la base de datos: {err}")
-        return None
+        raise ErrorConexion(f"Error al conectar a la base de datos {ruta}: {err}") from err
 
 def cerrar_conexion(conexion):
     #cierra la conexión si está abiera
     if conexion:
-        conexion.close()
\ No newline at end of file
+        conexion.close()
+
+
+# ---------------------------------------------------------------------------
+# Concurrencia entre procesos: reintentos y métricas de espera por locks
+# ---------------------------------------------------------------------------
+def es_reintentable(err: Exception) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED: otro proceso tiene el lock, vale la pena reintentar."""
+    if isinstance(err, ErrorConexion) or not isinstance(err, sqlite3.OperationalError):
+        return False
+    mensaje = str(err).lower()
+    return "locked" in mensaje or "busy" in mensaje
+
+
+def espera_reintento(intento: int) -> float:
+    """Backoff exponencial con jitter completo: uniforme en [0, min(máx, base·2^intento)]."""
+    return random.uniform(0, min(DB_REINTENTO_MAXIMO, DB_REINTENTO_BASE * 2 ** intento))
+
+
+class MetricasBloqueo:
+    """
+    Tiempo esperado por locks de escritura en este proceso: cuántas veces se
+    tomó el lock, cuánto se esperó (total, máximo y percentiles sobre las
+    últimas `ventana` esperas), cuántos reintentos hubo y cuántas escrituras
+    fallaron tras agotarlos.
+    """
+
+    def __init__(self, ventana: int = 1000):
+        self._lock = threading.Lock()
+        self._ventana = ventana
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.adquisiciones = 0
+            self.reintentos = 0
+            self.fallos = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+            self._recientes = deque(maxlen=self._ventana)
+
+    def registrar_espera(self, segundos: float) -> None:
+        with self._lock:
+            self.adquisiciones += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            self._recientes.append(segundos)
+
+    def registrar_reintento(self) -> None:
+        with self._lock:
+            self.reintentos += 1
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+
+    def resumen(self) -> dict:
+        """Foto de las métricas; las esperas en milisegundos."""
+        with self._lock:
+            recientes = sorted(self._recientes)
+            adquisiciones = self.adquisiciones
+            datos = {
+                "adquisiciones": adquisiciones,
+                "reintentos": self.reintentos,
+                "fallos": self.fallos,
+                "espera_total_ms": self.espera_total * 1000,
+                "espera_media_ms": self.espera_total * 1000 / adquisiciones if adquisiciones else 0.0,
+                "espera_maxima_ms": self.espera_maxima * 1000,
+            }
+        for nombre, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            valor = recientes[min(len(recientes) - 1, int(q * len(recientes)))] if recientes else 0.0
+            datos[f"espera_{nombre}_ms"] = valor * 1000
+        return datos
+
+
+# Métricas de todas las escrituras del proceso (ver `transaccion`)
+metricas_bloqueo = MetricasBloqueo()
+
+
+def _con_reintentos(operacion):
+    """Ejecuta `operacion()` reintentando con backoff si la base está bloqueada."""
+    for intento in range(DB_REINTENTOS + 1):
+        try:
+            return operacion()
+        except sqlite3.OperationalError as err:
+            if not es_reintentable(err) or intento == DB_REINTENTOS:
+                if es_reintentable(err):
+                    metricas_bloqueo.registrar_fallo()
+                raise
+            metricas_bloqueo.registrar_reintento()
+            time.sleep(espera_reintento(intento))
+
+
+@contextmanager
+def transaccion(db_path=None):
+    """
+    Conexión dentro de una transacción de escritura:
+
+        with transaccion(self.db_path) as conn:
+            conn.execute("UPDATE ...")
+
+    Abre con BEGIN IMMEDIATE, que toma el lock de escritura al empezar. Así un
+    conflicto con otro proceso aparece ahí (donde se puede esperar y reintentar)
+    y no a mitad de la transacción, al pasar de lectura a escritura, donde
+    SQLite devuelve "database is locked" sin consultar el busy handler. El
+    BEGIN y el COMMIT se reintentan con backoff y el tiempo hasta obtener el
+    lock se registra en `metricas_bloqueo`. Si el bloque lanza una excepción
+    se hace ROLLBACK.
+    """
+    conn = obtener_conexion(db_path)
+    conn.isolation_level = None  # transacciones explícitas
+    try:
+        inicio = time.perf_counter()
+        _con_reintentos(lambda: conn.execute("BEGIN IMMEDIATE"))
+        metricas_bloqueo.registrar_espera(time.perf_counter() - inicio)
+        try:
+            yield conn
+            _con_reintentos(lambda: conn.execute("COMMIT"))
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    finally:
+        cerrar_conexion(conn)
+
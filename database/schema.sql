@@ -3,5 +3,190 @@ CREATE TABLE IF NOT EXISTS contactos (
     nombre TEXT NOT NULL,
     apellido TEXT NOT NULL,
     telefono TEXT NOT NULL,
-    email TEXT NOT NULL
+    email TEXT NOT NULL,
+    baja TEXT,  -- momento de la baja lógica; NULL = contacto activo
+    -- Precalculadas en Python (models/telefono.py) al escribir el teléfono:
+    telefono_canonico TEXT,  -- forma E.164 ('+541112345678'); '' si no se pudo interpretar
+    telefono_invertido TEXT,  -- dígitos del canónico al revés, para buscar por sufijo
+    email_dominio TEXT,  -- lo que sigue a la '@' del email ('' si no tiene)
+    -- Índices ciegos de telefono/email cuando se guardan cifrados (ver
+    -- repository/cifrado.py); NULL sin cifrado
+    telefono_indice TEXT,
+    email_indice TEXT,
+    -- Marcas de tiempo (UTC con milisegundos, como baja) de cada escritura
+    creado TEXT,
+    modificado TEXT  -- última alta, modificación, baja o restauración
 );
+
+-- Índices parciales: los contactos activos y las bajas (tombstones) por separado
+CREATE INDEX IF NOT EXISTS idx_contactos_activos ON contactos (id) WHERE baja IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_bajas ON contactos (baja) WHERE baja IS NOT NULL;
+
+-- Orden de la grilla: ORDER BY <columna>, id sobre contactos activos, con
+-- paginación por clave (keyset) sobre el mismo índice
+CREATE INDEX IF NOT EXISTS idx_contactos_nombre ON contactos (nombre, id) WHERE baja IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_apellido ON contactos (apellido, id) WHERE baja IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_telefono ON contactos (telefono, id) WHERE baja IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_email ON contactos (email, id) WHERE baja IS NULL;
+
+-- Búsqueda por teléfono: exacta sobre el canónico y por sufijo (identificador de
+-- llamadas) como rango sobre los dígitos invertidos
+CREATE INDEX IF NOT EXISTS idx_contactos_tel_canonico ON contactos (telefono_canonico) WHERE baja IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_tel_invertido ON contactos (telefono_invertido) WHERE baja IS NULL;
+
+-- Consultas por cuenta/empresa (todos los contactos de un dominio) e histograma
+-- de dominios, sin recorrer la tabla con LIKE '%@dominio'
+CREATE INDEX IF NOT EXISTS idx_contactos_dominio ON contactos (email_dominio, id) WHERE baja IS NULL;
+
+-- Igualdad sobre telefono/email cifrados. Parciales: sin cifrado quedan vacíos
+CREATE INDEX IF NOT EXISTS idx_contactos_tel_indice ON contactos (telefono_indice)
+WHERE baja IS NULL AND telefono_indice IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_contactos_email_indice ON contactos (email_indice)
+WHERE baja IS NULL AND email_indice IS NOT NULL;
+
+-- Consultas incrementales ("qué cambió desde las 10:00"), bajas incluidas
+CREATE INDEX IF NOT EXISTS idx_contactos_modificado ON contactos (modificado, id);
+
+-- Etiquetas (grupos) de contactos, relación muchos a muchos. `cantidad` la
+-- mantienen los triggers de abajo: el repositorio la usa para elegir por qué
+-- etiqueta empezar una consulta combinada (la más selectiva).
+CREATE TABLE IF NOT EXISTS etiquetas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    cantidad INTEGER NOT NULL DEFAULT 0
+);
+
+-- La clave (etiqueta_id, contacto_id) es el índice "contactos de una etiqueta"
+-- en orden de id, y sin rowid la tabla es ese índice; el inverso sirve para
+-- comprobar si un contacto tiene cierta etiqueta y para "etiquetas de un contacto".
+CREATE TABLE IF NOT EXISTS contactos_etiquetas (
+    etiqueta_id INTEGER NOT NULL,
+    contacto_id INTEGER NOT NULL,
+    PRIMARY KEY (etiqueta_id, contacto_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_contactos_etiquetas_contacto
+ON contactos_etiquetas (contacto_id, etiqueta_id);
+
+-- Auditoría de calidad (services/calidad_services.py): una fila por contacto
+-- que no pasó Contacto.validate en la última revisión, con los errores
+-- separados por '\n'. Los válidos no tienen fila, así que "solo inválidos"
+-- recorre esta tabla (por su clave) y no la de contactos.
+CREATE TABLE IF NOT EXISTS calidad (
+    contacto_id INTEGER PRIMARY KEY,
+    errores TEXT NOT NULL,
+    auditado TEXT NOT NULL
+);
+
+-- Registro de cambios (CDC): una fila por alta/modificación/baja de contactos.
+-- seq es monótono (AUTOINCREMENT nunca reutiliza valores, aun tras compactar).
+CREATE TABLE IF NOT EXISTS contactos_cambios (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    contacto_id INTEGER NOT NULL,
+    operacion TEXT NOT NULL CHECK (operacion IN ('I', 'U', 'D')),
+    momento TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_cambios_contacto ON contactos_cambios (contacto_id, seq);
+
+-- Posición confirmada por cada consumidor del registro de cambios
+CREATE TABLE IF NOT EXISTS cambios_consumidores (
+    nombre TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+
+-- Pares clave/valor internos (p. ej. hasta dónde se compactó el registro)
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+
+DROP TRIGGER IF EXISTS trg_contactos_insert;
+CREATE TRIGGER trg_contactos_insert AFTER INSERT ON contactos WHEN NEW.baja IS NULL
+BEGIN
+    INSERT INTO contactos_cambios (contacto_id, operacion) VALUES (NEW.id, 'I');
+END;
+
+DROP TRIGGER IF EXISTS trg_contactos_update;
+-- Dar de baja (baja pasa a no NULL) se registra como 'D' y restaurar como 'I';
+-- los cambios sobre filas que siguen dadas de baja no se registran. Las columnas
+-- derivadas (telefono_canonico, ...) no cuentan: su relleno no es un cambio.
+CREATE TRIGGER trg_contactos_update
+AFTER UPDATE OF id, nombre, apellido, telefono, email, baja ON contactos
+BEGIN
+    INSERT INTO contactos_cambios (contacto_id, operacion)
+    SELECT OLD.id, 'D' WHERE OLD.id <> NEW.id AND OLD.baja IS NULL;
+    INSERT INTO contactos_cambios (contacto_id, operacion)
+    SELECT NEW.id, CASE
+        WHEN NEW.baja IS NOT NULL THEN 'D'
+        WHEN OLD.baja IS NOT NULL OR OLD.id <> NEW.id THEN 'I'
+        ELSE 'U'
+    END
+    WHERE OLD.baja IS NULL OR NEW.baja IS NULL;
+END;
+
+DROP TRIGGER IF EXISTS trg_contactos_delete;
+-- La purga física de bajas lógicas no se registra (ya se registró la baja)
+CREATE TRIGGER trg_contactos_delete AFTER DELETE ON contactos WHEN OLD.baja IS NULL
+BEGIN
+    INSERT INTO contactos_cambios (contacto_id, operacion) VALUES (OLD.id, 'D');
+END;
+
+-- El repositorio completa creado/modificado en cada escritura; estos triggers
+-- los completan cuando se escribe por fuera de él (scripts, otras herramientas)
+DROP TRIGGER IF EXISTS trg_contactos_creado;
+CREATE TRIGGER trg_contactos_creado AFTER INSERT ON contactos WHEN NEW.modificado IS NULL
+BEGIN
+    UPDATE contactos SET
+        creado = COALESCE(NEW.creado, strftime('%Y-%m-%d %H:%M:%f', 'now')),
+        modificado = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS trg_contactos_modificado;
+CREATE TRIGGER trg_contactos_modificado
+AFTER UPDATE OF nombre, apellido, telefono, email, baja ON contactos
+WHEN NEW.modificado IS OLD.modificado
+BEGIN
+    UPDATE contactos SET modificado = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+DROP TRIGGER IF EXISTS trg_etiquetas_alta;
+CREATE TRIGGER trg_etiquetas_alta AFTER INSERT ON contactos_etiquetas
+BEGIN
+    UPDATE etiquetas SET cantidad = cantidad + 1 WHERE id = NEW.etiqueta_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_etiquetas_baja;
+CREATE TRIGGER trg_etiquetas_baja AFTER DELETE ON contactos_etiquetas
+BEGIN
+    UPDATE etiquetas SET cantidad = cantidad - 1 WHERE id = OLD.etiqueta_id;
+END;
+
+-- Poner o quitar una etiqueta cuenta como cambio del contacto ('U', o 'D' si
+-- está dado de baja, para que su último cambio siga diciendo si está activo):
+-- así los respaldos incrementales y los demás consumidores se enteran. Las
+-- asignaciones que borra la purga no se registran (el contacto ya no existe)
+DROP TRIGGER IF EXISTS trg_etiquetas_cambio_alta;
+CREATE TRIGGER trg_etiquetas_cambio_alta AFTER INSERT ON contactos_etiquetas
+BEGIN
+    INSERT INTO contactos_cambios (contacto_id, operacion)
+    SELECT id, CASE WHEN baja IS NULL THEN 'U' ELSE 'D' END
+    FROM contactos WHERE id = NEW.contacto_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_etiquetas_cambio_baja;
+CREATE TRIGGER trg_etiquetas_cambio_baja AFTER DELETE ON contactos_etiquetas
+BEGIN
+    INSERT INTO contactos_cambios (contacto_id, operacion)
+    SELECT id, CASE WHEN baja IS NULL THEN 'U' ELSE 'D' END
+    FROM contactos WHERE id = OLD.contacto_id;
+END;
+
+-- Un contacto borrado físicamente (purga) deja de estar en sus etiquetas; la
+-- baja lógica las conserva, para que restaurar lo deje como estaba
+DROP TRIGGER IF EXISTS trg_contactos_etiquetas;
+CREATE TRIGGER trg_contactos_etiquetas AFTER DELETE ON contactos
+BEGIN
+    DELETE FROM contactos_etiquetas WHERE contacto_id = OLD.id;
+END;
@@ -1,16 +1,29 @@
 # gui/main_app.py
 import sys
 import os
+from datetime import datetime, timedelta, timezone
 
 # Añadir el directorio raíz del proyecto al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import tkinter as tk
-from tkinter import ttk, messagebox, font
+from tkinter import ttk, messagebox, font, filedialog, simpledialog
 
 # Capa de datos / dominio
-from repository.contacto_repository import ContactoRepository
+from config.settings import GUI_FILTRO_MS, GUI_REFRESCO_SEGUNDOS, GUI_SELECCION_MS
+from gui.planificador import Planificador
+from repository.consulta import Consulta, parsear_etiquetas
+from repository.contacto_repository import clave_orden
+from repository.fabrica import crear_repositorio
+from repository.historial_repository import HistorialRepository
+from repository.interfaz import rutas_de
+from services.calidad_services import AuditoriaCalidad
 from services.db_services import init_schema
+from services.estadisticas_services import EstadisticasService
+from services.exportacion_services import exportar_csv
+from services.vcard_services import escribir_vcard
+from services.notificaciones_services import VigilanteCambios
+from services.purga_services import PurgaPeriodica
 
 
 class ContactosApp(tk.Tk):
@@ -51,11 +64,29 @@ class ContactosApp(tk.Tk):
         self.configure(bg=self.colors["bg"])
 
         # --- Repositorio de datos (CRUD) ---
-        self.repo = ContactoRepository()
+        # (envuelto en el historial para poder deshacer/rehacer las mutaciones)
+        self.repo = HistorialRepository(crear_repositorio())
+        # Bases del repositorio: DB_PATH (None), cada shard si está particionado
+        # o ninguna (motor en memoria: estadísticas y auditoría van por el repo)
+        self.rutas = rutas_de(self.repo)
+        self.stats = EstadisticasService.para_repositorio(self.repo)
+        self.calidad = AuditoriaCalidad.para_repositorio(self.repo)
+
+        # --- Orden y paginación de la grilla (resueltos en SQL) ---
+        self.orden = "id"
+        self.descendente = False
+        self.hay_mas_antes = False
+        self.hay_mas_despues = False
+        self.filas = {}  # iid de la grilla -> Contacto mostrado
+        self.filtro_etiquetas = ()  # cláusulas de parsear_etiquetas (vacío = todos)
+        self.solo_invalidos = False  # solo los marcados por la auditoría de calidad
+        # Debounce/throttle de eventos frecuentes (selección, scroll, filtro, refresco)
+        self.planificador = Planificador(self)
 
         # --- Inicialización de esquema ---
         try:
-            init_schema()
+            for ruta in self.rutas:
+                init_schema(db_path=ruta)
         except Exception as e:
             messagebox.showerror(
                 "❌ Error de base de datos",
@@ -75,14 +106,21 @@ class ContactosApp(tk.Tk):
         self._construir_barra_estado()  # Barra de estado
 
         # Estado inicial de botones
-        self._set_btn_states(False)
+        self._set_btn_states(0)
 
-        # --- Carga inicial de datos ---
+        # --- Carga inicial de datos y aviso de cambios de otras instancias ---
+        self.vigilante = VigilanteCambios.para_repositorio(self.repo)
         self._refrescar_grilla()
+        self._programar_refresco()
 
         # --- Efectos de ventana ---
         self._aplicar_efectos_ventana()
 
+        # --- Purga en segundo plano de bajas lógicas antiguas (en cada base) ---
+        self.purga = PurgaPeriodica(rutas=self.rutas)
+        if self.rutas:
+            self.purga.start()
+
     # ---------------------------------------------------------------------
     # Estilos modernos
     # ---------------------------------------------------------------------
@@ -364,6 +402,16 @@ class ContactosApp(tk.Tk):
         )
         self.contador_label.pack(side=tk.TOP, anchor="e")
 
+        # Crecimiento: altas del mes en curso y del anterior (EstadisticasService)
+        self.crecimiento_label = ttk.Label(
+            metrics_frame,
+            text="",
+            font=("Segoe UI", 10),
+            foreground=self.colors["text_muted"],
+            background=self.colors["card"],
+        )
+        self.crecimiento_label.pack(side=tk.TOP, anchor="e", pady=(2, 0))
+
     def _construir_barra_superior(self):
         """Crea la barra de herramientas moderna con iconos y efectos."""
         toolbar = ttk.Frame(self, style="Toolbar.TFrame", padding=(20, 15))
@@ -377,7 +425,7 @@ class ContactosApp(tk.Tk):
         self.btn_refrescar = ttk.Button(
             left_frame,
             text="🔄 Refrescar",
-            command=self._refrescar_grilla,
+            command=lambda: self.planificador.coalescer("grilla", self._refrescar_grilla),
             style="Modern.TButton",
         )
         self.btn_refrescar.pack(side=tk.LEFT, padx=(0, 10))
@@ -413,6 +461,61 @@ class ContactosApp(tk.Tk):
         )
         self.btn_borrar.pack(side=tk.LEFT, padx=(0, 10))
 
+        # Separador visual
+        separator_lote = ttk.Separator(left_frame, orient="vertical")
+        separator_lote.pack(side=tk.LEFT, fill=tk.Y, padx=10)
+
+        # Operaciones sobre la selección (una o varias filas)
+        self.btn_dominio = ttk.Button(
+            left_frame,
+            text="📧 Cambiar dominio",
+            command=self._cambiar_dominio_seleccionados,
+            style="Modern.TButton",
+        )
+        self.btn_dominio.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.btn_exportar = ttk.Button(
+            left_frame,
+            text="📤 Exportar",
+            command=self._exportar_seleccionados,
+            style="Modern.TButton",
+        )
+        self.btn_exportar.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.btn_etiquetar = ttk.Button(
+            left_frame,
+            text="🏷 Etiquetar",
+            command=self._etiquetar_seleccionados,
+            style="Modern.TButton",
+        )
+        self.btn_etiquetar.pack(side=tk.LEFT, padx=(0, 10))
+
+        # Separador visual
+        separator_historial = ttk.Separator(left_frame, orient="vertical")
+        separator_historial.pack(side=tk.LEFT, fill=tk.Y, padx=10)
+
+        # Deshacer / Rehacer (Ctrl+Z / Ctrl+Y)
+        self.btn_deshacer = ttk.Button(
+            left_frame,
+            text="↩️ Deshacer",
+            command=self._deshacer,
+            style="Modern.TButton",
+        )
+        self.btn_deshacer.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.btn_rehacer = ttk.Button(
+            left_frame,
+            text="↪️ Rehacer",
+            command=self._rehacer,
+            style="Modern.TButton",
+        )
+        self.btn_rehacer.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.bind("<Control-z>", lambda e: self._deshacer())
+        self.bind("<Control-y>", lambda e: self._rehacer())
+        self.bind("<Control-Z>", lambda e: self._rehacer())  # Ctrl+Shift+Z
+        self.bind("<F12>", lambda e: self._mostrar_planificador())
+
         # Frame derecho para información y ayuda
         right_frame = ttk.Frame(toolbar, style="Toolbar.TFrame")
         right_frame.pack(side=tk.RIGHT, fill=tk.Y)
@@ -424,13 +527,41 @@ class ContactosApp(tk.Tk):
         # Información de ayuda
         help_label = ttk.Label(
             help_frame,
-            text="✨ Doble clic para editar",
+            text="✨ Doble clic para editar · Ctrl/Shift para elegir varios · Ctrl+Z deshace",
             font=("Segoe UI", 9, "italic"),
             foreground=self.colors["text_muted"],
             background=self.colors["sidebar"],
         )
         help_label.pack(side=tk.TOP, anchor="e")
 
+        # Filtro por etiquetas: "a b|c -d" = a y (b o c) y no d; Enter aplica
+        filtro_frame = ttk.Frame(help_frame, style="Toolbar.TFrame")
+        filtro_frame.pack(side=tk.TOP, anchor="e", pady=(4, 0))
+        ttk.Label(
+            filtro_frame,
+            text="🏷 Filtrar:",
+            font=("Segoe UI", 9),
+            foreground=self.colors["text_muted"],
+            background=self.colors["sidebar"],
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        self.entry_etiquetas = ttk.Entry(filtro_frame, width=24)
+        self.entry_etiquetas.pack(side=tk.LEFT)
+        self.entry_etiquetas.bind("<Return>", lambda e: self._aplicar_filtro_etiquetas())
+        self.entry_etiquetas.bind(
+            "<KeyRelease>",
+            lambda e: self.planificador.debounce(
+                "filtro", GUI_FILTRO_MS, self._aplicar_filtro_etiquetas, False
+            ),
+        )
+        # Solo los contactos que no pasan la validación (audita lo modificado al activarlo)
+        self.var_invalidos = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            filtro_frame,
+            text="⚠ Solo inválidos",
+            variable=self.var_invalidos,
+            command=self._alternar_invalidos,
+        ).pack(side=tk.LEFT, padx=(8, 0))
+
         # Indicador de modo
         mode_label = ttk.Label(
             help_frame,
@@ -444,6 +575,11 @@ class ContactosApp(tk.Tk):
         # Estados iniciales
         self.btn_editar.state(["disabled"])
         self.btn_borrar.state(["disabled"])
+        self.btn_dominio.state(["disabled"])
+        self.btn_exportar.state(["disabled"])
+        self.btn_etiquetar.state(["disabled"])
+        self.btn_deshacer.state(["disabled"])
+        self.btn_rehacer.state(["disabled"])
 
     # ---------------------------------------------------------------------
     # Contenido principal
@@ -468,16 +604,25 @@ class ContactosApp(tk.Tk):
             self.frame_tree,
             columns=columnas,
             show="headings",
-            selectmode="browse",
+            selectmode="extended",
             style="Modern.Treeview",
         )
 
-        # Encabezados con iconos (alineados con sus columnas)
-        self.tree.heading("id", text="🆔", anchor=tk.CENTER)
-        self.tree.heading("nombre", text="👤 Nombre", anchor=tk.W)
-        self.tree.heading("apellido", text="👨 Apellido", anchor=tk.W)
-        self.tree.heading("telefono", text="📞 Teléfono", anchor=tk.W)
-        self.tree.heading("email", text="📧 Email", anchor=tk.W)
+        # Encabezados con iconos (alineados con sus columnas); clic = ordenar
+        self.titulos_columnas = {
+            "id": "🆔",
+            "nombre": "👤 Nombre",
+            "apellido": "👨 Apellido",
+            "telefono": "📞 Teléfono",
+            "email": "📧 Email",
+        }
+        for col, titulo in self.titulos_columnas.items():
+            self.tree.heading(
+                col,
+                text=titulo,
+                anchor=tk.CENTER if col == "id" else tk.W,
+                command=lambda c=col: self._ordenar_por(c),
+            )
 
         # Configurar columnas con mejor ancho y alineación
         self.tree.column("id", width=90, minwidth=80, anchor=tk.CENTER, stretch=False)
@@ -501,7 +646,8 @@ class ContactosApp(tk.Tk):
             command=self.tree.xview,
             style="Modern.Horizontal.TScrollbar",
         )
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.vsb = vsb
+        self.tree.configure(yscrollcommand=self._on_scroll, xscrollcommand=hsb.set)
 
         # Layout mejorado
         self.tree.grid(row=0, column=0, sticky="nsew")
@@ -513,7 +659,13 @@ class ContactosApp(tk.Tk):
 
         # Eventos
         self.tree.bind("<Double-1>", self._on_doble_click_row)
-        self.tree.bind("<<TreeviewSelect>>", self._on_tree_selection_change)
+        # Con la flecha apretada llegan decenas de selecciones por segundo
+        self.tree.bind(
+            "<<TreeviewSelect>>",
+            lambda e: self.planificador.throttle(
+                "seleccion", GUI_SELECCION_MS, self._on_tree_selection_change
+            ),
+        )
         self.tree.bind(
             "<Button-3>", self._on_right_click
         )  # Click derecho para menú contextual
@@ -579,6 +731,11 @@ class ContactosApp(tk.Tk):
         )
         self.info_label.pack(side=tk.RIGHT)
 
+        # Barra de progreso para operaciones en lote (visible solo mientras corren)
+        self.progreso = ttk.Progressbar(
+            right_panel, orient="horizontal", length=180, mode="determinate"
+        )
+
     # ---------------------------------------------------------------------
     # Efectos de ventana
     # ---------------------------------------------------------------------
@@ -598,6 +755,9 @@ class ContactosApp(tk.Tk):
     def _on_closing(self):
         """Maneja el cierre de la aplicación."""
         if messagebox.askokcancel("Salir", "¿Desea cerrar la aplicación?"):
+            self.purga.detener()
+            self.planificador.cancelar_todo()
+            self.vigilante.cerrar()
             self.destroy()
 
     def _on_right_click(self, event):
@@ -627,6 +787,17 @@ class ContactosApp(tk.Tk):
             color = self.colors["accent"]
 
         self.contador_label.config(text=texto, foreground=color)
+        self._actualizar_crecimiento()
+
+    def _actualizar_crecimiento(self):
+        """Altas (activas) del mes en curso y del anterior, debajo del contador."""
+        hoy = datetime.now(timezone.utc)
+        mes = hoy.strftime("%Y-%m")
+        anterior = (hoy.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+        por_mes = dict(self.stats.por_periodo("mes", 2))
+        self.crecimiento_label.config(
+            text=f"🗓️ +{por_mes.get(mes, 0)} este mes · +{por_mes.get(anterior, 0)} el mes anterior"
+        )
 
     def _actualizar_estado(self, mensaje, tipo="info"):
         """Actualiza la barra de estado con un mensaje."""
@@ -637,35 +808,60 @@ class ContactosApp(tk.Tk):
     # ---------------------------------------------------------------------
     # Helpers de estado de botones
     # ---------------------------------------------------------------------
-    def _set_btn_states(self, hay_sel: bool):
+    def _set_btn_states(self, cantidad: int):
         """
-        Habilita/Deshabilita botones según haya selección.
+        Habilita/Deshabilita botones según cuántas filas haya seleccionadas:
+        editar requiere exactamente una; baja, dominio, exportar y etiquetar,
+        al menos una.
         Usa ttk.state; si falla en algún theme, cae a .configure(state=...).
         """
-        try:
-            if hay_sel:
-                self.btn_editar.state(["!disabled"])
-                self.btn_borrar.state(["!disabled"])
-            else:
-                self.btn_editar.state(["disabled"])
-                self.btn_borrar.state(["disabled"])
-        except Exception:
-            # Fallback por si algún theme no soporta .state()
-            self.btn_editar.configure(state=(tk.NORMAL if hay_sel else tk.DISABLED))
-            self.btn_borrar.configure(state=(tk.NORMAL if hay_sel else tk.DISABLED))
+        estados = (
+            (self.btn_editar, cantidad == 1),
+            (self.btn_borrar, cantidad >= 1),
+            (self.btn_dominio, cantidad >= 1),
+            (self.btn_exportar, cantidad >= 1),
+            (self.btn_etiquetar, cantidad >= 1),
+        )
+        for boton, habilitado in estados:
+            try:
+                boton.state(["!disabled" if habilitado else "disabled"])
+            except Exception:
+                # Fallback por si algún theme no soporta .state()
+                boton.configure(state=(tk.NORMAL if habilitado else tk.DISABLED))
+
+    # ---------------------------------------------------------------------
+    # Progreso de operaciones en lote
+    # ---------------------------------------------------------------------
+    # A partir de cuántas filas se muestra la barra de progreso
+    UMBRAL_PROGRESO = 200
+
+    def _iniciar_progreso(self, total):
+        if total < self.UMBRAL_PROGRESO:
+            return None
+        self.progreso.configure(maximum=total, value=0)
+        self.progreso.pack(side=tk.RIGHT, padx=(0, 15))
+        self.update_idletasks()
+        return self._on_progreso
+
+    def _on_progreso(self, hechos, total):
+        self.progreso.configure(value=hechos)
+        self.update_idletasks()
+
+    def _finalizar_progreso(self):
+        self.progreso.pack_forget()
 
     # ---------------------------------------------------------------------
     # Cargar/Refrescar datos
     # ---------------------------------------------------------------------
-    def _refrescar_grilla(self):
-        """Vuelve a leer desde la base y repinta la grilla completa."""
-        # Limpiar filas actuales
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    # Tamaño de cada página que se pide al repositorio
+    PAGINA = 200
 
+    def _refrescar_grilla(self):
+        """Vuelve a leer la primera página (en el orden actual) y repinta la grilla."""
         try:
-            # obtener_todos()
-            contactos = self.repo.obtener_todos()
+            contactos = self.repo.listar_pagina(
+                self.orden, self.descendente, self.PAGINA, **self._filtros()
+            )
             self._actualizar_estado(f"Contactos cargados correctamente", "success")
         except Exception as e:
             messagebox.showerror(
@@ -674,24 +870,312 @@ class ContactosApp(tk.Tk):
             self._actualizar_estado("Error al cargar contactos", "error")
             return
 
-        # Insertar filas
-        for i, c in enumerate(contactos):
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
+        self._mostrar_filas(contactos)
+        self.hay_mas_antes = False
+        self.hay_mas_despues = len(contactos) == self.PAGINA
+
+        # Actualizar contador (COUNT en SQL, cacheado hasta la próxima escritura)
+        self._actualizar_contador_contactos(self.stats.total())
+
+        # Tras refrescar, no hay selección activa
+        self._set_btn_states(0)
+
+        # Actualizar información
+        self.info_label.config(text=f"Última actualización: {self._get_current_time()}")
+
+    def _programar_refresco(self):
+        self.planificador.debounce(
+            "refresco", int(GUI_REFRESCO_SEGUNDOS * 1000), self._refrescar_cambios
+        )
+
+    def _refrescar_cambios(self):
+        """
+        Refresco automático: si otra conexión escribió (PRAGMA data_version),
+        relee solo los contactos tocados y los aplica sobre la grilla,
+        conservando la selección. Las escrituras propias ya están aplicadas y
+        se saltean al compararlas con lo mostrado.
+        """
+        try:
+            ids = self.vigilante.pendientes()
+            if ids is None:
+                # El registro se compactó: no se sabe qué cambió, se relee todo
+                self._refrescar_grilla()
+            elif ids:
+                self._aplicar_cambios_externos(ids)
+        except Exception as e:
+            self._actualizar_estado(f"No se pudieron leer los cambios: {e}", "warning")
+        self._programar_refresco()
+
+    def _aplicar_cambios_externos(self, ids):
+        sincronizar = getattr(self.repo, "sincronizar", None)
+        if sincronizar:
+            sincronizar()  # espejo en memoria: traer ya lo que escribieron otros
+        actuales = {c.id: c for c in self._filtrar(self.repo.obtener_por_ids(ids))}
+        quitar = [i for i in ids if i not in actuales and str(i) in self.filas]
+        mostrar = [c for c in actuales.values() if self.filas.get(str(c.id)) != c]
+        if not (mostrar or quitar):
+            return
+
+        seleccion = self.tree.selection()
+        visibles = self._parchear(mostrar, quitar)
+        self.tree.selection_set([item for item in seleccion if self.tree.exists(item)])
+        self._actualizar_contador_contactos(self.stats.total())
+        if visibles or quitar:
+            self._actualizar_estado(
+                f"{len(visibles) + len(quitar)} cambio(s) de otra sesión aplicados", "info"
+            )
+            self.info_label.config(text=f"Última actualización: {self._get_current_time()}")
+
+    def _filtros(self):
+        """Filtros activos de la grilla, como argumentos de listar_pagina."""
+        return {"etiquetas": self.filtro_etiquetas, "solo_invalidos": self.solo_invalidos}
+
+    def _filtrar(self, contactos):
+        """
+        Deja solo los contactos que cumplen los filtros activos. "Solo
+        inválidos" se decide con Contacto.revisar_calidad, sin esperar a la próxima
+        auditoría.
+        """
+        contactos = [c for c in contactos if c]
+        if self.solo_invalidos:
+            contactos = [c for c in contactos if c.revisar_calidad()]
+        if not self.filtro_etiquetas or not contactos:
+            return contactos
+        consulta = (
+            Consulta()
+            .seleccionar("id")
+            .filtrar("id", "en", [c.id for c in contactos])
+            .con_clausulas(self.filtro_etiquetas)
+        )
+        cumplen = {fila[0] for fila in self.repo.filas(consulta)}
+        return [c for c in contactos if c.id in cumplen]
+
+    def _aplicar_filtro_etiquetas(self, forzar=True):
+        """
+        Toma el filtro escrito en la barra y vuelve a cargar la grilla. Sin
+        `forzar` (mientras se escribe) no relee si el filtro no cambió.
+        """
+        self.planificador.cancelar("filtro")
+        texto = self.entry_etiquetas.get()
+        try:
+            filtro = parsear_etiquetas(texto)
+        except ValueError as e:
+            self._actualizar_estado(f"Filtro de etiquetas inválido: {e}", "warning")
+            return
+        if filtro == self.filtro_etiquetas and not forzar:
+            return
+        self.filtro_etiquetas = filtro
+        self._refrescar_grilla()
+        if self.filtro_etiquetas:
+            self._actualizar_estado(f"Filtrando por etiquetas: {texto.strip()}", "info")
+
+    def _alternar_invalidos(self):
+        """Activa/desactiva "solo inválidos"; al activarlo audita lo modificado desde la última vez."""
+        self.solo_invalidos = self.var_invalidos.get()
+        if self.solo_invalidos:
+            try:
+                resultado = self.calidad.auditar()
+            except Exception as e:
+                self._actualizar_estado(f"No se pudo auditar la calidad: {e}", "warning")
+                self.var_invalidos.set(False)
+                self.solo_invalidos = False
+                return
+        self._refrescar_grilla()
+        if self.solo_invalidos:
+            self._actualizar_estado(
+                f"{resultado.total_invalidos} contacto(s) inválido(s) "
+                f"({resultado.revisados} revisados en esta auditoría)",
+                "warning" if resultado.total_invalidos else "success",
+            )
+
+    def _mostrar_filas(self, contactos):
+        """Reemplaza el contenido de la grilla (iid de cada fila = id del contacto)."""
+        self.tree.delete(*self.tree.get_children())
+        self.filas.clear()
+        self._insertar_filas(contactos, tk.END)
+
+    def _insertar_filas(self, contactos, indice):
+        """Inserta filas en la posición dada (0 = arriba, tk.END = abajo)."""
+        for offset, c in enumerate(contactos):
             self.tree.insert(
                 "",
-                tk.END,
+                indice if indice == tk.END else indice + offset,
+                iid=str(c.id),
                 values=(c.id, c.nombre, c.apellido, c.telefono, c.email),
-                tags=(tag,),
             )
+            self.filas[str(c.id)] = c
+        self._pintar_cebra()
+
+    def _parchear(self, mostrar=(), quitar=()):
+        """
+        Cambios puntuales sobre la grilla sin releer la base: quita los ids de
+        `quitar` y (re)ubica cada contacto de `mostrar` según el orden actual.
+        Retorna los contactos de `mostrar` que quedaron a la vista.
+        """
+        items = [str(i) for i in quitar] + [str(c.id) for c in mostrar if c]
+        existentes = [item for item in items if self.tree.exists(item)]
+        if existentes:
+            self.tree.delete(*existentes)
+            for item in existentes:
+                self.filas.pop(item, None)
+
+        visibles = [c for c in mostrar if c and self._insertar_ordenado(c)]
+        self._pintar_cebra()
+        return visibles
+
+    def _aplicar_efecto(self, mostrar=(), quitar=()):
+        """Aplica a la grilla el efecto de una operación propia y selecciona lo tocado."""
+        cumplen = self._filtrar(mostrar)
+        ids_cumplen = {c.id for c in cumplen}
+        quitar = list(quitar) + [c.id for c in mostrar if c and c.id not in ids_cumplen]
+        visibles = self._parchear(cumplen, quitar)
+        if visibles:
+            items = [str(c.id) for c in visibles]
+            self.tree.selection_set(items)
+            self.tree.see(items[0])
+
+        self._actualizar_contador_contactos(self.stats.total())
+        self._actualizar_botones_historial()
+
+    def _insertar_ordenado(self, contacto):
+        """
+        Inserta la fila en su posición según el orden actual. Si cae fuera del
+        tramo cargado (antes de la primera o después de la última fila, con más
+        páginas de ese lado) no se inserta: aparecerá al paginar. Retorna si se
+        insertó.
+        """
+        clave = clave_orden(contacto, self.orden)
+        hijos = self.tree.get_children()
+        pos = len(hijos)
+        for i, item in enumerate(hijos):
+            k = clave_orden(self.filas[item], self.orden)
+            if (k > clave) if not self.descendente else (k < clave):
+                pos = i
+                break
+        if (pos == len(hijos) and self.hay_mas_despues) or (pos == 0 and self.hay_mas_antes):
+            return False
 
-        # Actualizar contador
-        self._actualizar_contador_contactos(len(contactos))
+        c = contacto
+        self.tree.insert(
+            "",
+            pos,
+            iid=str(c.id),
+            values=(c.id, c.nombre, c.apellido, c.telefono, c.email),
+        )
+        self.filas[str(c.id)] = c
+        return True
 
-        # Tras refrescar, no hay selección activa
-        self._set_btn_states(False)
+    def _pintar_cebra(self):
+        """Colores alternados según la posición visible de cada fila."""
+        for i, item in enumerate(self.tree.get_children()):
+            self.tree.item(item, tags=("evenrow" if i % 2 == 0 else "oddrow",))
 
-        # Actualizar información
-        self.info_label.config(text=f"Última actualización: {self._get_current_time()}")
+    def _contacto_de_item(self, item_id):
+        """Contacto mostrado en una fila de la grilla.
+
+        Se guarda aparte porque Tk convierte a int los valores que parecen
+        números (p. ej. teléfonos, perdiendo ceros a la izquierda).
+        """
+        return self.filas[item_id]
+
+    # ---------------------------------------------------------------------
+    # Orden y paginación
+    # ---------------------------------------------------------------------
+    def _ordenar_por(self, columna):
+        """
+        Ordena por la columna (un segundo clic invierte el sentido). El orden lo
+        resuelve el repositorio con ORDER BY sobre índices; si hay una fila
+        seleccionada, se carga la página alrededor de ella y sigue seleccionada.
+        """
+        if columna not in self.repo.ordenables:
+            self._actualizar_estado(f"No se puede ordenar por {columna} (campo cifrado)", "warning")
+            return
+        if columna == self.orden:
+            self.descendente = not self.descendente
+        else:
+            self.orden, self.descendente = columna, False
+
+        flecha = " ▼" if self.descendente else " ▲"
+        for col, titulo in self.titulos_columnas.items():
+            self.tree.heading(col, text=titulo + (flecha if col == columna else ""))
+
+        sel = self.tree.selection()
+        if not sel:
+            self._refrescar_grilla()
+            return
+        try:
+            self._cargar_alrededor(self._contacto_de_item(sel[0]))
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudieron ordenar los contactos.\n\n{e}", parent=self
+            )
+
+    def _cargar_alrededor(self, contacto):
+        """Carga media página antes y media después del contacto y lo selecciona."""
+        mitad = self.PAGINA // 2
+        clave = clave_orden(contacto, self.orden)
+        antes = self.repo.listar_pagina(
+            self.orden, self.descendente, mitad, antes_de=clave, **self._filtros()
+        )
+        despues = self.repo.listar_pagina(
+            self.orden, self.descendente, mitad, despues_de=clave, **self._filtros()
+        )
+        self._mostrar_filas(antes + [contacto] + despues)
+        self.hay_mas_antes = len(antes) == mitad
+        self.hay_mas_despues = len(despues) == mitad
+
+        item = str(contacto.id)
+        self.tree.selection_set(item)
+        self.tree.focus(item)
+        self.tree.see(item)
+
+    def _on_scroll(self, first, last):
+        """
+        Actualiza la scrollbar y, una vez que Tk quede ocioso, pide otra página
+        si se está cerca de un extremo (un scroll largo genera muchas llamadas).
+        """
+        self.vsb.set(first, last)
+        self.planificador.coalescer("paginar", self._paginar)
+
+    def _paginar(self):
+        first, last = self.vsb.get()
+        if float(last) >= 0.98 and self.hay_mas_despues:
+            self._cargar_pagina_siguiente()
+        elif float(first) <= 0.02 and self.hay_mas_antes:
+            self._cargar_pagina_anterior()
+
+    def _cargar_pagina_siguiente(self):
+        hijos = self.tree.get_children()
+        if not hijos:
+            return
+        ultimo = self._contacto_de_item(hijos[-1])
+        contactos = self.repo.listar_pagina(
+            self.orden,
+            self.descendente,
+            self.PAGINA,
+            despues_de=clave_orden(ultimo, self.orden),
+            **self._filtros(),
+        )
+        self.hay_mas_despues = len(contactos) == self.PAGINA
+        self._insertar_filas(contactos, tk.END)
+
+    def _cargar_pagina_anterior(self):
+        hijos = self.tree.get_children()
+        if not hijos:
+            return
+        primero = self._contacto_de_item(hijos[0])
+        contactos = self.repo.listar_pagina(
+            self.orden,
+            self.descendente,
+            self.PAGINA,
+            antes_de=clave_orden(primero, self.orden),
+            **self._filtros(),
+        )
+        self.hay_mas_antes = len(contactos) == self.PAGINA
+        if contactos:
+            self._insertar_filas(contactos, 0)
+            # Mantener a la vista la fila que estaba arriba
+            self.tree.see(hijos[0])
 
     def _get_current_time(self):
         """Retorna la hora actual formateada."""
@@ -706,7 +1190,19 @@ class ContactosApp(tk.Tk):
         """Habilita/Deshabilita botones según haya fila seleccionada."""
         sels = self.tree.selection()
         # print("[DEBUG] <<TreeviewSelect>> ->", sels)  # útil para diagnosticar
-        self._set_btn_states(bool(sels))
+        self._set_btn_states(len(sels))
+        if self.solo_invalidos and len(sels) == 1:
+            errores = self._contacto_de_item(sels[0]).revisar_calidad()
+            if errores:
+                self._actualizar_estado("Inválido: " + "; ".join(errores), "warning")
+
+    def _mostrar_planificador(self):
+        """F12: cuántos eventos se atendieron y cuántos se agruparon, por tipo."""
+        partes = [
+            f"{nombre} {c['ejecutadas']}/{c['llamadas']}"
+            for nombre, c in self.planificador.resumen().items()
+        ]
+        self._actualizar_estado("Eventos atendidos/recibidos: " + ", ".join(partes), "info")
 
     def _on_doble_click_row(self, event):
         """Abrir edición con doble click."""
@@ -726,7 +1222,7 @@ class ContactosApp(tk.Tk):
 
         try:
             new_id = self.repo.agregar(dlg.result)
-            self._refrescar_grilla()
+            self._aplicar_efecto(mostrar=[self.repo.obtener_por_id(new_id)])
             msg = (
                 f"Contacto creado exitosamente (ID={new_id})."
                 if new_id is not None
@@ -754,26 +1250,13 @@ class ContactosApp(tk.Tk):
             )
             return
 
-        item_id = sel[0]
-        values = self.tree.item(item_id, "values")
-
+        # Prellenamos desde la grilla
         try:
-            contacto_id = int(values[0])
+            contacto = self._contacto_de_item(sel[0])
         except Exception:
             messagebox.showerror("❌ Error", "ID seleccionado inválido.", parent=self)
             return
 
-        # Prellenamos desde la grilla
-        from models.contacto import Contacto
-
-        contacto = Contacto(
-            id=contacto_id,
-            nombre=values[1],
-            apellido=values[2],
-            telefono=values[3],
-            email=values[4],
-        )
-
         dlg = EditContactDialog(self, contacto)
         self.wait_window(dlg)
         if dlg.result is None:
@@ -782,7 +1265,7 @@ class ContactosApp(tk.Tk):
         try:
             ok = self.repo.actualizar(dlg.result)
             if ok:
-                self._refrescar_grilla()
+                self._aplicar_efecto(mostrar=[self.repo.obtener_por_id(dlg.result.id)])
                 messagebox.showinfo(
                     "✅ Éxito", "Contacto actualizado correctamente.", parent=self
                 )
@@ -814,49 +1297,29 @@ class ContactosApp(tk.Tk):
             )
             return
 
-        item_id = sel[0]
-        values = self.tree.item(item_id, "values")
+        if len(sel) > 1:
+            self._borrar_lote(sel)
+            return
 
         try:
-            contacto_id = int(values[0])
+            contacto = self._contacto_de_item(sel[0])
         except Exception:
             messagebox.showerror("❌ Error", "ID seleccionado inválido.", parent=self)
             return
 
-        nombre, apellido = values[1], values[2]
+        contacto_id, nombre, apellido = contacto.id, contacto.nombre, contacto.apellido
         if not messagebox.askyesno(
             "� Confirmar Baja de Contacto",
-            f"¿Estás seguro de que deseas dar de baja a:\n\n{nombre} {apellido} (ID: {contacto_id})\n\nEsta acción no se puede deshacer.",
+            f"¿Estás seguro de que deseas dar de baja a:\n\n{nombre} {apellido} (ID: {contacto_id})\n\nPodés revertirlo con ↩️ Deshacer (Ctrl+Z).",
             parent=self,
         ):
             return
 
         try:
-            ok = None
-
-            # Intentar diferentes métodos de eliminación según la API del repo
-            if hasattr(self.repo, "eliminar_por_id"):
-                ok = self.repo.eliminar_por_id(contacto_id)
-            else:
-                try:
-                    ok = self.repo.eliminar(contacto_id)
-                except Exception as e:
-                    if "has no attribute 'id'" in str(e):
-                        from models.contacto import Contacto
-
-                        dummy = Contacto(
-                            id=contacto_id,
-                            nombre="",
-                            apellido="",
-                            telefono="",
-                            email="",
-                        )
-                        ok = self.repo.eliminar(dummy)
-                    else:
-                        raise
+            ok = self.repo.eliminar(contacto)
 
             if ok:
-                self._refrescar_grilla()
+                self._aplicar_efecto(quitar=[contacto_id])
                 messagebox.showinfo(
                     "✅ Éxito",
                     f"Contacto {nombre} {apellido} dado de baja correctamente.",
@@ -877,6 +1340,171 @@ class ContactosApp(tk.Tk):
             )
             self._actualizar_estado("Error al dar de baja contacto", "error")
 
+    # ---------------------------------------------------------------------
+    # Deshacer / Rehacer
+    # ---------------------------------------------------------------------
+    def _actualizar_botones_historial(self):
+        """Habilita Deshacer/Rehacer y describe en el botón la próxima operación."""
+        for boton, texto, proxima in (
+            (self.btn_deshacer, "↩️ Deshacer", self.repo.proximo_deshacer()),
+            (self.btn_rehacer, "↪️ Rehacer", self.repo.proximo_rehacer()),
+        ):
+            boton.configure(text=f"{texto} {proxima}" if proxima else texto)
+            boton.state(["!disabled" if proxima else "disabled"])
+
+    def _deshacer(self):
+        self._aplicar_historial(self.repo.deshacer)
+
+    def _rehacer(self):
+        self._aplicar_historial(self.repo.rehacer)
+
+    def _aplicar_historial(self, accion):
+        """Ejecuta deshacer/rehacer y aplica su efecto a la grilla fila por fila."""
+        try:
+            efecto = accion()
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudo completar la operación.\n\n{e}", parent=self
+            )
+            self._actualizar_estado("Error al deshacer/rehacer", "error")
+            return
+        if efecto is None:
+            return
+        self._aplicar_efecto(mostrar=efecto.mostrar, quitar=efecto.quitar)
+        self._actualizar_estado(efecto.descripcion, "success")
+
+    # ---------------------------------------------------------------------
+    # Operaciones en lote (una transacción por operación)
+    # ---------------------------------------------------------------------
+    def _ids_seleccionados(self):
+        return [self.filas[item].id for item in self.tree.selection()]
+
+    def _borrar_lote(self, items):
+        """Da de baja todas las filas seleccionadas con una sola llamada al repositorio."""
+        ids = [self.filas[item].id for item in items]
+        if not messagebox.askyesno(
+            "Confirmar Baja de Contactos",
+            f"¿Dar de baja {len(ids)} contactos seleccionados?\n\nPodés revertirlo con ↩️ Deshacer (Ctrl+Z).",
+            parent=self,
+        ):
+            return
+
+        progreso = self._iniciar_progreso(len(ids))
+        try:
+            n = self.repo.eliminar_lote(ids, progreso=progreso)
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudieron dar de baja los contactos.\n\n{e}", parent=self
+            )
+            self._actualizar_estado("Error al dar de baja contactos", "error")
+            return
+        finally:
+            self._finalizar_progreso()
+
+        self._aplicar_efecto(quitar=ids)
+        self._set_btn_states(0)
+        self._actualizar_estado(f"{n} contactos dados de baja", "success")
+
+    def _cambiar_dominio_seleccionados(self):
+        """Reemplaza el dominio del email de todas las filas seleccionadas."""
+        ids = self._ids_seleccionados()
+        if not ids:
+            return
+        dominio = simpledialog.askstring(
+            "📧 Cambiar dominio",
+            f"Nuevo dominio de email para {len(ids)} contacto(s):\n(p. ej. empresa.com)",
+            parent=self,
+        )
+        if not dominio:
+            return
+
+        progreso = self._iniciar_progreso(len(ids))
+        try:
+            n = self.repo.cambiar_dominio_email(ids, dominio, progreso=progreso)
+            self._aplicar_efecto(mostrar=self.repo.obtener_por_ids(ids))
+        except ValueError as e:
+            messagebox.showwarning("⚠️ Atención", str(e), parent=self)
+            return
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudo cambiar el dominio.\n\n{e}", parent=self
+            )
+            self._actualizar_estado("Error al cambiar dominio", "error")
+            return
+        finally:
+            self._finalizar_progreso()
+
+        self._actualizar_estado(f"Dominio actualizado en {n} contactos", "success")
+
+    def _etiquetar_seleccionados(self):
+        """
+        Agrega etiquetas a las filas seleccionadas; las que empiezan con "-"
+        se quitan (p. ej. "cliente vip -prospecto").
+        """
+        ids = self._ids_seleccionados()
+        if not ids:
+            return
+        texto = simpledialog.askstring(
+            "🏷 Etiquetar",
+            f"Etiquetas para {len(ids)} contacto(s), separadas por espacios:\n"
+            "(anteponé - para quitarla, p. ej. cliente -prospecto)",
+            parent=self,
+        )
+        if not texto:
+            return
+        palabras = texto.split()
+        agregar = [p for p in palabras if not p.startswith("-")]
+        quitar = [p[1:] for p in palabras if p.startswith("-") and len(p) > 1]
+
+        progreso = self._iniciar_progreso(len(ids))
+        try:
+            agregadas = self.repo.etiquetar(ids, agregar, progreso=progreso) if agregar else 0
+            quitadas = self.repo.desetiquetar(ids, quitar, progreso=progreso) if quitar else 0
+            if self.filtro_etiquetas:
+                # Con filtro activo las filas pueden dejar de cumplirlo
+                self._aplicar_efecto(mostrar=self.repo.obtener_por_ids(ids))
+        except ValueError as e:
+            messagebox.showwarning("⚠️ Atención", str(e), parent=self)
+            return
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudieron etiquetar los contactos.\n\n{e}", parent=self
+            )
+            self._actualizar_estado("Error al etiquetar", "error")
+            return
+        finally:
+            self._finalizar_progreso()
+
+        self._actualizar_estado(
+            f"{agregadas} etiqueta(s) agregadas, {quitadas} quitadas", "success"
+        )
+
+    def _exportar_seleccionados(self):
+        """Exporta a CSV o vCard los contactos seleccionados (leídos de la base en lote)."""
+        ids = self._ids_seleccionados()
+        if not ids:
+            return
+        destino = filedialog.asksaveasfilename(
+            parent=self,
+            title="Exportar contactos",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("vCard", "*.vcf")],
+        )
+        if not destino:
+            return
+
+        try:
+            exportar = escribir_vcard if destino.lower().endswith(".vcf") else exportar_csv
+            n = exportar(self.repo.obtener_por_ids(ids), destino)
+        except Exception as e:
+            messagebox.showerror(
+                "❌ Error", f"No se pudieron exportar los contactos.\n\n{e}", parent=self
+            )
+            self._actualizar_estado("Error al exportar", "error")
+            return
+
+        self._actualizar_estado(f"{n} contactos exportados", "success")
+
 
 # =====================================================================
 # Diálogo de ALTA
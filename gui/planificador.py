@@ -0,0 +1,127 @@
+# gui/planificador.py
+"""
+Planificación de callbacks sobre el bucle de eventos de Tk.
+
+Los eventos de la grilla llegan mucho más rápido de lo que vale la pena
+atenderlos: mantener apretada la flecha abajo dispara <<TreeviewSelect>>
+decenas de veces por segundo, y un cuadro de búsqueda consultaría la base en
+cada tecla. El Planificador agrupa esas llamadas por nombre, con tres
+políticas construidas sobre after/after_cancel:
+
+- debounce: ejecuta una sola vez, cuando pasan `espera_ms` sin llamadas
+  nuevas (cada llamada reinicia la espera). Para lo que solo importa al
+  final, como un filtro que se está escribiendo.
+- throttle: ejecuta enseguida y, si siguen llegando llamadas, como mucho una
+  vez cada `intervalo_ms`; la última siempre se ejecuta (al cerrar el
+  intervalo). Para estados que tienen que verse al instante pero no
+  recalcularse en cada repetición de tecla.
+- coalescer: ejecuta una vez en el próximo momento ocioso de Tk (after_idle),
+  junte las llamadas que junte hasta entonces.
+
+En los tres casos la ejecución usa los argumentos de la última llamada. Cada
+nombre lleva contadores de llamadas, ejecuciones y omisiones (llamadas que
+absorbió otra ejecución), consultables con `resumen()`.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+__all__ = ["Contadores", "Planificador"]
+
+
+@dataclass
+class Contadores:
+    llamadas: int = 0
+    ejecutadas: int = 0
+    omitidas: int = 0
+
+
+class Planificador:
+    """
+    Agrupa callbacks por nombre sobre el `after` de un widget de Tk (en
+    general la ventana principal). `cancelar_todo()` antes de destruirlo.
+    """
+
+    def __init__(self, widget, reloj: Callable[[], float] = time.monotonic):
+        self.widget = widget
+        self._reloj = reloj
+        self._pendientes: Dict[str, str] = {}  # nombre -> id de after
+        self._argumentos: Dict[str, tuple] = {}  # nombre -> args de la última llamada
+        self._ultima: Dict[str, float] = {}  # nombre -> momento de la última ejecución
+        self.contadores: Dict[str, Contadores] = {}
+
+    # ------------------------------------------------------------------
+    # Políticas
+    # ------------------------------------------------------------------
+    def debounce(self, nombre: str, espera_ms: int, funcion: Callable, *args: Any) -> None:
+        """Ejecuta `funcion` cuando pasen `espera_ms` sin otra llamada con este nombre."""
+        contador = self._llamada(nombre, args)
+        previo = self._pendientes.pop(nombre, None)
+        if previo is not None:
+            self.widget.after_cancel(previo)
+            contador.omitidas += 1
+        self._agendar(nombre, espera_ms, funcion)
+
+    def throttle(self, nombre: str, intervalo_ms: int, funcion: Callable, *args: Any) -> None:
+        """Ejecuta `funcion` ya o, si se ejecutó hace menos de `intervalo_ms`, al cumplirse."""
+        contador = self._llamada(nombre, args)
+        if nombre in self._pendientes:
+            contador.omitidas += 1
+            return
+        transcurrido_ms = (self._reloj() - self._ultima.get(nombre, float("-inf"))) * 1000
+        if transcurrido_ms >= intervalo_ms:
+            self._ejecutar(nombre, funcion)
+        else:
+            self._agendar(nombre, max(1, int(intervalo_ms - transcurrido_ms)), funcion)
+
+    def coalescer(self, nombre: str, funcion: Callable, *args: Any) -> None:
+        """Ejecuta `funcion` una sola vez cuando Tk quede ocioso."""
+        contador = self._llamada(nombre, args)
+        if nombre in self._pendientes:
+            contador.omitidas += 1
+            return
+        self._agendar(nombre, None, funcion)
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+    def pendiente(self, nombre: str) -> bool:
+        return nombre in self._pendientes
+
+    def cancelar(self, nombre: str) -> None:
+        """Descarta la ejecución pendiente de `nombre`, si la hay."""
+        previo = self._pendientes.pop(nombre, None)
+        if previo is not None:
+            self.widget.after_cancel(previo)
+            self._argumentos.pop(nombre, None)
+
+    def cancelar_todo(self) -> None:
+        for nombre in list(self._pendientes):
+            self.cancelar(nombre)
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        """Contadores por nombre: llamadas, ejecutadas y omitidas."""
+        return {nombre: vars(c).copy() for nombre, c in sorted(self.contadores.items())}
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _llamada(self, nombre: str, args: tuple) -> Contadores:
+        contador = self.contadores.setdefault(nombre, Contadores())
+        contador.llamadas += 1
+        self._argumentos[nombre] = args
+        return contador
+
+    def _agendar(self, nombre: str, espera_ms, funcion: Callable) -> None:
+        ejecutar = lambda: self._ejecutar(nombre, funcion)
+        if espera_ms is None:
+            self._pendientes[nombre] = self.widget.after_idle(ejecutar)
+        else:
+            self._pendientes[nombre] = self.widget.after(espera_ms, ejecutar)
+
+    def _ejecutar(self, nombre: str, funcion: Callable) -> None:
+        self._pendientes.pop(nombre, None)
+        args = self._argumentos.pop(nombre, ())
+        self._ultima[nombre] = self._reloj()
+        self.contadores[nombre].ejecutadas += 1
+        funcion(*args)
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from models.contacto import Contacto
+
+ALTA = "I"
+MODIFICACION = "U"
+BAJA = "D"
+
+@dataclass
+class Cambio:
+  """Entrada del registro de cambios de contactos."""
+  seq: int
+  contacto_id: int
+  operacion: str
+  momento: str
+  contacto: Optional[Contacto] = None  # estado actual (None si ya no existe)
+
+  @property
+  def es_baja(self) -> bool:
+    return self.operacion == BAJA or self.contacto is None
@@ -2,10 +2,18 @@ from dataclasses import dataclass
 from typing import Optional, Tuple, List
 import re
 
+from models.telefono import normalizar_telefono
+
 PATRON_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 PATRON_TELEFONO = re.compile(r"^[\d+\-\(\)\s]{6,20}$")
 
-@dataclass
+def dominio_email(email: str) -> str:
+  """Dominio de un email (lo que sigue a la '@'), en minúsculas; '' si no tiene."""
+  _, arroba, dominio = (email or "").strip().lower().partition("@")
+  return dominio if arroba else ""
+
+# slots: sin __dict__ por instancia (los listados masivos tienen millones)
+@dataclass(slots=True)
 class Contacto:
   id: Optional[int] = None
   nombre: str = ""
@@ -37,6 +45,16 @@ class Contacto:
       errores.append("El email tiene un formato inválido")
     return (len(errores) == 0, errores)
 
+  def revisar_calidad(self) -> List[str]:
+    """
+    Errores de validate más los problemas que no impiden guardar (un teléfono
+    que no se puede normalizar); es lo que marca la auditoría de calidad.
+    """
+    _, errores = self.validate()
+    if PATRON_TELEFONO.match(self.telefono) and normalizar_telefono(self.telefono) is None:
+      errores.append("El número de teléfono no tiene una cantidad de dígitos válida")
+    return errores
+
   def to_tuple(self) -> Tuple[str, str, str, str]:
     """Convierte el contacto a una tupla para operaciones en la BD"""
     return (self.nombre, self.apellido, self.telefono, self.email)
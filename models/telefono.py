@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import re
+
+from config.settings import TELEFONO_PAIS
+
+@dataclass(frozen=True)
+class ReglaPais:
+  """Plan de numeración de un país, lo justo para normalizar sin consultar servicios."""
+  codigo: str                 # código de país (sin '+')
+  troncal: str = ""           # prefijo de larga distancia nacional que se descarta
+  longitudes: Tuple[int, ...] = ()  # dígitos del número nacional sin el troncal
+
+REGLAS: Dict[str, ReglaPais] = {
+  regla.codigo: regla
+  for regla in (
+    ReglaPais("54", "0", (10, 11)),  # Argentina (11 con el 9 de celulares)
+    ReglaPais("598", "0", (8,)),     # Uruguay
+    ReglaPais("595", "0", (9,)),     # Paraguay
+    ReglaPais("591", "0", (8,)),     # Bolivia
+    ReglaPais("56", "", (9,)),       # Chile
+    ReglaPais("55", "0", (10, 11)),  # Brasil
+    ReglaPais("51", "0", (8, 9)),    # Perú
+    ReglaPais("593", "0", (8, 9)),   # Ecuador
+    ReglaPais("57", "", (10,)),      # Colombia
+    ReglaPais("58", "0", (10,)),     # Venezuela
+    ReglaPais("52", "", (10,)),      # México
+    ReglaPais("1", "1", (10,)),      # Estados Unidos / Canadá
+    ReglaPais("34", "", (9,)),       # España
+    ReglaPais("39", "", tuple(range(6, 12))),  # Italia (el 0 inicial es parte del número)
+    ReglaPais("33", "0", (9,)),      # Francia
+    ReglaPais("44", "0", (10,)),     # Reino Unido
+    ReglaPais("49", "0", tuple(range(6, 12))),  # Alemania
+  )
+}
+
+# E.164: hasta 15 dígitos contando el código de país
+MIN_DIGITOS = 6
+MAX_DIGITOS = 15
+
+_NO_DIGITOS = re.compile(r"\D")
+
+def _regla_internacional(digitos: str) -> Optional[ReglaPais]:
+  """Regla cuyo código de país es prefijo de `digitos` (los códigos no se solapan)."""
+  for largo in (1, 2, 3):
+    regla = REGLAS.get(digitos[:largo])
+    if regla:
+      return regla
+  return None
+
+def _sin_troncal(nacional: str, regla: ReglaPais) -> str:
+  if (regla.troncal and nacional.startswith(regla.troncal)
+      and len(nacional) - len(regla.troncal) in regla.longitudes):
+    return nacional[len(regla.troncal):]
+  return nacional
+
+def normalizar_telefono(telefono: str, pais: str = TELEFONO_PAIS) -> Optional[str]:
+  """
+  Forma canónica tipo E.164 ('+' y solo dígitos) de un teléfono escrito a mano.
+  "+54 11 1234-5678", "0054 11 1234 5678", "541112345678" y "011 1234-5678"
+  (con pais="54") dan "+541112345678". Retorna None si no es interpretable.
+  """
+  telefono = (telefono or "").strip()
+  digitos = _NO_DIGITOS.sub("", telefono)
+  internacional = telefono.startswith("+")
+  if not internacional and digitos.startswith("00"):
+    digitos, internacional = digitos[2:], True
+
+  local = REGLAS.get(pais)
+  if not internacional and local and digitos.startswith(local.codigo) \
+      and len(digitos) - len(local.codigo) in local.longitudes:
+    internacional = True  # ya trae el código de país, sin el '+'
+
+  if internacional:
+    regla = _regla_internacional(digitos)
+    if regla:
+      digitos = regla.codigo + _sin_troncal(digitos[len(regla.codigo):], regla)
+  elif local:
+    digitos = local.codigo + _sin_troncal(digitos, local)
+  else:
+    digitos = pais + digitos
+
+  if not MIN_DIGITOS <= len(digitos) <= MAX_DIGITOS:
+    return None
+  return "+" + digitos
+
+def claves_telefono(telefono: str) -> Tuple[str, str]:
+  """
+  Valores precalculados de las columnas telefono_canonico y telefono_invertido
+  (dígitos al revés, para buscar por sufijo con un rango sobre el índice).
+  Un teléfono no interpretable da ("", "").
+  """
+  canonico = normalizar_telefono(telefono) or ""
+  return canonico, canonico[:0:-1]
+
+def sufijo_invertido(digitos: str) -> str:
+  """Los dígitos de un sufijo ("5678", "1234-5678") en el orden de telefono_invertido."""
+  return _NO_DIGITOS.sub("", digitos or "")[::-1]
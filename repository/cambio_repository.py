@@ -0,0 +1,135 @@
+from typing import List, Optional, Tuple
+
+from database.conexion import obtener_conexion, cerrar_conexion, transaccion
+from models.cambio import Cambio
+from models.contacto import Contacto
+from repository.cifrado import cifrador_por_defecto
+
+CLAVE_COMPACTADO = "cambios_compactado_hasta"
+
+
+class CambioRepository:
+    """
+    Consumo del registro de cambios (tabla contactos_cambios, alimentada por
+    triggers). Los consumidores piden los deltas desde su última posición y la
+    confirman; `compactar` descarta lo que ya leyeron todos.
+
+    Tras compactar puede quedar solo el último cambio de cada contacto, por lo
+    que los consumidores deben tratar 'I'/'U' como upsert y 'D' como baja.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+
+    def cambios_desde(self, seq: int, limit: int = 1000) -> List[Cambio]:
+        """
+        Cambios con secuencia mayor a `seq`, en orden, con el estado actual del
+        contacto (teléfono y email descifrados si CIFRADO_CAMPOS está activo).
+        """
+        query = (
+            "SELECT c.seq, c.contacto_id, c.operacion, c.momento, "
+            "k.id, k.nombre, k.apellido, k.telefono, k.email "
+            "FROM contactos_cambios c "
+            "LEFT JOIN contactos k ON k.id = c.contacto_id AND k.baja IS NULL "
+            "WHERE c.seq > ? ORDER BY c.seq LIMIT ?"
+        )
+        conn = obtener_conexion(self.db_path)
+        try:
+            rows = conn.execute(query, (seq, limit)).fetchall()
+        finally:
+            cerrar_conexion(conn)
+        cifrador = cifrador_por_defecto()
+        cambios = []
+        for row in rows:
+            contacto = None
+            if row[4] is not None:
+                contacto_id, nombre, apellido, telefono, email = row[4:]
+                if cifrador:
+                    telefono = cifrador.descifrar(telefono, "telefono")
+                    email = cifrador.descifrar(email, "email")
+                contacto = Contacto(contacto_id, nombre, apellido, telefono, email)
+            cambios.append(
+                Cambio(
+                    seq=row[0],
+                    contacto_id=row[1],
+                    operacion=row[2],
+                    momento=row[3],
+                    contacto=contacto,
+                )
+            )
+        return cambios
+
+    def ultimo_seq(self) -> int:
+        """Última secuencia asignada (0 si todavía no hubo cambios)."""
+        query = "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+        conn = obtener_conexion(self.db_path)
+        try:
+            row = conn.execute(query).fetchone()
+        finally:
+            cerrar_conexion(conn)
+        return row[0] if row else 0
+
+    def compactado_hasta(self) -> int:
+        """Secuencia hasta la cual el registro fue truncado (0 si nunca)."""
+        conn = obtener_conexion(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT valor FROM metadatos WHERE clave = ?", (CLAVE_COMPACTADO,)
+            ).fetchone()
+        finally:
+            cerrar_conexion(conn)
+        return int(row[0]) if row else 0
+
+    def posicion(self, consumidor: str, nuevo: Optional[int] = 0) -> Optional[int]:
+        """Última secuencia confirmada por el consumidor (`nuevo` si nunca confirmó)."""
+        conn = obtener_conexion(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT seq FROM cambios_consumidores WHERE nombre = ?", (consumidor,)
+            ).fetchone()
+        finally:
+            cerrar_conexion(conn)
+        return row[0] if row else nuevo
+
+    def confirmar(self, consumidor: str, seq: int) -> None:
+        """Registra que el consumidor ya procesó hasta `seq` inclusive."""
+        query = (
+            "INSERT INTO cambios_consumidores (nombre, seq) VALUES (?, ?) "
+            "ON CONFLICT(nombre) DO UPDATE SET seq = MAX(seq, excluded.seq)"
+        )
+        with transaccion(self.db_path) as conn:
+            conn.execute(query, (consumidor, seq))
+
+    def compactar(self, hasta_seq: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Compacta el registro en una sola transacción:
+        - trunca lo ya confirmado por todos los consumidores (y <= hasta_seq);
+        - del resto, deja solo el último cambio de cada contacto.
+        Retorna (filas_truncadas, filas_colapsadas).
+        """
+        with transaccion(self.db_path) as conn:
+            cursor = conn.cursor()
+            (corte,) = cursor.execute(
+                "SELECT COALESCE(MIN(seq), 0) FROM cambios_consumidores"
+            ).fetchone()
+            if hasta_seq is not None:
+                corte = min(corte, hasta_seq) if corte else hasta_seq
+
+            truncadas = 0
+            if corte > 0:
+                cursor.execute("DELETE FROM contactos_cambios WHERE seq <= ?", (corte,))
+                truncadas = cursor.rowcount
+                cursor.execute(
+                    "INSERT INTO metadatos (clave, valor) VALUES (?, ?) "
+                    "ON CONFLICT(clave) DO UPDATE SET "
+                    "valor = MAX(CAST(valor AS INTEGER), excluded.valor)",
+                    (CLAVE_COMPACTADO, corte),
+                )
+
+            cursor.execute(
+                "DELETE FROM contactos_cambios WHERE seq < ("
+                "SELECT MAX(c2.seq) FROM contactos_cambios c2 "
+                "WHERE c2.contacto_id = contactos_cambios.contacto_id)"
+            )
+            colapsadas = cursor.rowcount
+            return truncadas, colapsadas
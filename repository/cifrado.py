@@ -0,0 +1,224 @@
+# repository/cifrado.py
+"""
+Cifrado en reposo de campos sensibles (telefono, email).
+
+Con CIFRADO_CAMPOS el repositorio guarda esas columnas cifradas y, al lado,
+un índice ciego de cada una (telefono_indice, email_indice): un HMAC
+determinístico del valor normalizado, con una clave propia. Buscar "el
+contacto con este email" compara índices, así que sigue siendo una búsqueda
+sobre un índice de SQLite; ordenar o buscar por fragmentos de esas columnas
+ya no es posible en SQL.
+
+Esquema (solo biblioteca estándar, sin dependencias):
+
+- De la clave maestra se derivan tres subclaves con BLAKE2b con clave
+  (cifrado, autenticación e índice), así una no revela nada de las otras.
+- Cifrado: flujo BLAKE2b(clave, nonce || contador) XOR texto, con un nonce
+  aleatorio de 16 bytes por valor (dos cifrados del mismo texto difieren).
+- Autenticación: encrypt-then-MAC, BLAKE2b con clave sobre versión, campo,
+  nonce y cifrado. El campo entra al MAC para que un valor no se pueda
+  mover de la columna email a la de teléfono sin que se note.
+- Formato guardado: "c1:" + base64(nonce || cifrado || etiqueta). Un valor
+  sin ese prefijo se considera texto plano todavía no migrado y se lee tal
+  cual (ver services/cifrado_services.py).
+
+Descifrar cuesta un par de microsegundos por valor; igual se recuerdan los
+últimos CIFRADO_CACHE valores (LRU), porque la grilla relee las mismas
+páginas al desplazarse o reordenar.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from config.settings import (
+    CIFRADO_CACHE,
+    CIFRADO_CAMPOS,
+    CIFRADO_CLAVE_ARCHIVO,
+    CIFRADO_CLAVE_VARIABLE,
+)
+from models.telefono import normalizar_telefono
+
+__all__ = [
+    "CAMPOS_CIFRADOS",
+    "ClaveArchivo",
+    "ClaveEntorno",
+    "ClaveFija",
+    "Cifrador",
+    "ErrorCifrado",
+    "ProveedorClaves",
+    "cifrador_por_defecto",
+    "generar_clave",
+    "proveedor_configurado",
+]
+
+# Columnas que se cifran y la columna de índice ciego de cada una
+CAMPOS_CIFRADOS = {"telefono": "telefono_indice", "email": "email_indice"}
+
+PREFIJO = "c1:"
+_NONCE = 16
+_ETIQUETA = 16
+_BLOQUE = 64  # bytes de flujo por llamada a BLAKE2b
+_LARGO_CLAVE = 32
+
+
+class ErrorCifrado(ValueError):
+    """Clave ausente o inválida, o valor cifrado alterado / de otra clave."""
+
+
+# ---------------------------------------------------------------------------
+# Proveedores de la clave maestra
+# ---------------------------------------------------------------------------
+class ProveedorClaves:
+    """
+    Origen de la clave maestra. Para otro almacén (keyring del sistema, un
+    KMS...) alcanza con subclasear e implementar `clave()`.
+    """
+
+    def clave(self) -> bytes:
+        raise NotImplementedError
+
+
+class ClaveFija(ProveedorClaves):
+    """Clave dada en el código (pruebas, herramientas)."""
+
+    def __init__(self, clave: bytes):
+        self._clave = clave
+
+    def clave(self) -> bytes:
+        return self._clave
+
+
+class ClaveEntorno(ProveedorClaves):
+    """Clave en base64 en una variable de entorno."""
+
+    def __init__(self, variable: str = CIFRADO_CLAVE_VARIABLE):
+        self.variable = variable
+
+    def clave(self) -> bytes:
+        valor = os.environ.get(self.variable)
+        if not valor:
+            raise ErrorCifrado(f"Falta la clave de cifrado (variable de entorno {self.variable})")
+        return _decodificar(valor, f"la variable {self.variable}")
+
+
+class ClaveArchivo(ProveedorClaves):
+    """Clave en base64 en un archivo (que solo debería poder leer el usuario)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def clave(self) -> bytes:
+        try:
+            valor = Path(self.ruta).read_text(encoding="ascii")
+        except (OSError, UnicodeDecodeError) as err:
+            raise ErrorCifrado(f"No se pudo leer la clave de cifrado de {self.ruta}: {err}") from err
+        return _decodificar(valor, self.ruta)
+
+
+def _decodificar(valor: str, origen: str) -> bytes:
+    try:
+        return base64.b64decode(valor.strip(), validate=True)
+    except (binascii.Error, ValueError) as err:
+        raise ErrorCifrado(f"La clave de {origen} no es base64 válido") from err
+
+
+def generar_clave() -> str:
+    """Clave maestra nueva (32 bytes aleatorios) en base64."""
+    return base64.b64encode(secrets.token_bytes(_LARGO_CLAVE)).decode("ascii")
+
+
+# ---------------------------------------------------------------------------
+# Cifrador
+# ---------------------------------------------------------------------------
+def _derivar(maestra: bytes, uso: bytes) -> bytes:
+    return hashlib.blake2b(uso, key=maestra, digest_size=_LARGO_CLAVE, person=b"contactos").digest()
+
+
+def _normalizar(campo: str, valor: str) -> str:
+    valor = (valor or "").strip()
+    if campo == "telefono":
+        return normalizar_telefono(valor) or valor
+    return valor.lower()
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    n = len(a)
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b[:n], "little")).to_bytes(n, "little")
+
+
+class Cifrador:
+    """Cifra/descifra valores de CAMPOS_CIFRADOS y calcula sus índices ciegos."""
+
+    def __init__(self, proveedor: ProveedorClaves, cache: int = CIFRADO_CACHE):
+        maestra = proveedor.clave()
+        if len(maestra) < _LARGO_CLAVE:
+            raise ErrorCifrado(f"La clave de cifrado debe tener al menos {_LARGO_CLAVE} bytes")
+        self._clave_flujo = _derivar(maestra, b"cifrado")
+        self._clave_mac = _derivar(maestra, b"autenticacion")
+        self._clave_indice = _derivar(maestra, b"indice")
+        # Caché por (valor guardado, campo); cache_info() da aciertos y fallos
+        self.descifrar = lru_cache(maxsize=cache)(self._descifrar)
+
+    def _flujo(self, nonce: bytes, largo: int) -> bytes:
+        return b"".join(
+            hashlib.blake2b(nonce + i.to_bytes(8, "little"), key=self._clave_flujo).digest()
+            for i in range((largo + _BLOQUE - 1) // _BLOQUE)
+        )
+
+    def _etiqueta(self, campo: str, nonce: bytes, cifrado: bytes) -> bytes:
+        datos = PREFIJO.encode("ascii") + campo.encode("ascii") + b"\0" + nonce + cifrado
+        return hashlib.blake2b(datos, key=self._clave_mac, digest_size=_ETIQUETA).digest()
+
+    def cifrar(self, texto: str, campo: str) -> str:
+        datos = texto.encode("utf-8")
+        nonce = os.urandom(_NONCE)
+        cifrado = _xor(datos, self._flujo(nonce, len(datos)))
+        crudo = nonce + cifrado + self._etiqueta(campo, nonce, cifrado)
+        return PREFIJO + base64.b64encode(crudo).decode("ascii")
+
+    def _descifrar(self, guardado: Optional[str], campo: str) -> Optional[str]:
+        if guardado is None or not guardado.startswith(PREFIJO):
+            return guardado  # texto plano (todavía sin migrar)
+        try:
+            crudo = base64.b64decode(guardado[len(PREFIJO) :], validate=True)
+        except (binascii.Error, ValueError):
+            crudo = b""
+        if len(crudo) < _NONCE + _ETIQUETA:
+            raise ErrorCifrado(f"Valor cifrado de {campo} mal formado")
+        nonce, cifrado, etiqueta = crudo[:_NONCE], crudo[_NONCE:-_ETIQUETA], crudo[-_ETIQUETA:]
+        if not hmac.compare_digest(etiqueta, self._etiqueta(campo, nonce, cifrado)):
+            raise ErrorCifrado(f"Valor cifrado de {campo} alterado o de otra clave")
+        return _xor(cifrado, self._flujo(nonce, len(cifrado))).decode("utf-8")
+
+    def indice(self, campo: str, valor: str) -> str:
+        """
+        Índice ciego del valor: el mismo para todas las formas de escribirlo
+        (el teléfono en su forma canónica, el email en minúsculas). 128 bits
+        en hexadecimal, suficientes para que no choquen.
+        """
+        datos = campo.encode("ascii") + b"\0" + _normalizar(campo, valor).encode("utf-8")
+        return hashlib.blake2b(datos, key=self._clave_indice, digest_size=16).hexdigest()
+
+
+def proveedor_configurado() -> ProveedorClaves:
+    """El archivo CIFRADO_CLAVE_ARCHIVO si está configurado; si no, la variable de entorno."""
+    if CIFRADO_CLAVE_ARCHIVO:
+        return ClaveArchivo(CIFRADO_CLAVE_ARCHIVO)
+    return ClaveEntorno()
+
+
+@lru_cache(maxsize=1)
+def cifrador_por_defecto() -> Optional[Cifrador]:
+    """
+    Cifrador según la configuración (None si CIFRADO_CAMPOS está apagado).
+    Es uno por proceso, así todos los repositorios comparten el caché.
+    """
+    if not CIFRADO_CAMPOS:
+        return None
+    return Cifrador(proveedor_configurado())
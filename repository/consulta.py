@@ -0,0 +1,424 @@
+# repository/consulta.py
+"""
+Consultas de contactos como objetos en lugar de SQL armado a mano.
+
+    consulta = (
+        Consulta()
+        .donde(email_dominio="acme.com")
+        .filtrar("apellido", "empieza", "Ga")
+        .ordenar_por("apellido")
+        .seleccionar("id", "nombre", "email")
+        .limitar(50)
+    )
+    repo.consultar(consulta)   # List[Contacto] (solo con las columnas pedidas)
+    repo.filas(consulta)       # List[tuple] en el orden de seleccionar()
+
+Una Consulta es inmutable: cada método devuelve una copia. `compilar()`
+devuelve SQL parametrizado (los valores nunca se interpolan) y el texto SQL
+se cachea por la *forma* de la consulta (columnas, campos y operadores de los
+filtros, orden, paginación), no por los valores: la grilla pidiendo la
+página siguiente o dos búsquedas de textos distintos reusan el mismo SQL.
+Los nombres de columnas y operadores se validan contra listas fijas, así que
+lo único que llega al SQL desde afuera son parámetros.
+"""
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from models.contacto import Contacto
+from repository.diccionario import Internador
+
+__all__ = [
+    "AHORA_SQL",
+    "CAMPOS",
+    "CAMPOS_CONTACTO",
+    "OPERADORES",
+    "ClausulaEtiquetas",
+    "Consulta",
+    "Filtro",
+    "a_contactos",
+    "clave_fila",
+    "normalizar_etiqueta",
+    "parsear_etiquetas",
+    "sql_actualizacion",
+]
+
+# Columnas que tiene un Contacto (en el orden de Contacto.from_row)
+CAMPOS_CONTACTO = ("id", "nombre", "apellido", "telefono", "email")
+
+# Columnas que se pueden filtrar, ordenar y proyectar
+CAMPOS = CAMPOS_CONTACTO + (
+    "baja",
+    "telefono_canonico",
+    "telefono_invertido",
+    "email_dominio",
+    "creado",
+    "modificado",
+    "telefono_indice",
+    "email_indice",
+)
+
+# Momento actual con milisegundos, en UTC (mismo formato que contactos_cambios)
+AHORA_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Columnas que la búsqueda por texto recorre por defecto (como ContactoRepository.buscar)
+CAMPOS_TEXTO = ("nombre", "apellido", "telefono", "email")
+
+# Operador -> plantilla SQL ({c} = columna). "en" e "rango" llevan varios parámetros.
+OPERADORES = {
+    "=": "{c} = ?",
+    "!=": "{c} <> ?",
+    "<": "{c} < ?",
+    "<=": "{c} <= ?",
+    ">": "{c} > ?",
+    ">=": "{c} >= ?",
+    "contiene": "{c} LIKE ? ESCAPE '\\'",
+    "empieza": "{c} LIKE ? ESCAPE '\\'",
+    "rango": "{c} >= ? AND {c} < ?",  # semiabierto [desde, hasta)
+    "en": "{c} IN ({marcas})",
+    "nulo": "{c} IS NULL",
+    "no_nulo": "{c} IS NOT NULL",
+}
+
+# Bajas: "activos" (baja IS NULL, usa los índices parciales), "bajas" o "todos"
+ESTADOS = ("activos", "bajas", "todos")
+
+# Tamaño del caché de SQL compilado (formas distintas, no consultas)
+CACHE_FORMAS = 256
+
+
+# Nombre de etiqueta: sin espacios, comas ni '|', y sin '-' inicial (ver parsear_etiquetas)
+PATRON_ETIQUETA = re.compile(r"^[^\s,|\-][^\s,|]*$")
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _cubeta(cantidad: int) -> int:
+    """Potencia de dos >= cantidad: los IN (...) de tamaños parecidos comparten SQL."""
+    return 1 << (cantidad - 1).bit_length() if cantidad > 1 else cantidad
+
+
+def _validar_campo(campo: str) -> str:
+    if campo not in CAMPOS:
+        raise ValueError(f"Campo desconocido: {campo!r}")
+    return campo
+
+
+@dataclass(frozen=True)
+class Filtro:
+    campo: str
+    operador: str = "="
+    valor: Any = None
+
+    def forma(self) -> Tuple:
+        # Para "en" la cantidad de valores cambia el SQL (una marca por valor);
+        # se redondea y se completa repitiendo el último valor
+        return (self.campo, self.operador, _cubeta(len(self.valor)) if self.operador == "en" else None)
+
+    def parametros(self) -> List[Any]:
+        if self.operador in ("nulo", "no_nulo"):
+            return []
+        if self.operador == "contiene":
+            return ["%" + _escapar_like(self.valor) + "%"]
+        if self.operador == "empieza":
+            return [_escapar_like(self.valor) + "%"]
+        if self.operador == "en":
+            return list(self.valor) + list(self.valor[-1:]) * (_cubeta(len(self.valor)) - len(self.valor))
+        if self.operador == "rango":
+            return list(self.valor)
+        return [self.valor]
+
+
+def normalizar_etiqueta(nombre: str) -> str:
+    nombre = (nombre or "").strip()
+    if not PATRON_ETIQUETA.match(nombre):
+        raise ValueError(f"Nombre de etiqueta inválido: {nombre!r}")
+    return nombre
+
+
+@dataclass(frozen=True)
+class ClausulaEtiquetas:
+    """
+    Condición sobre las etiquetas de un contacto: tiene alguna de `nombres`
+    (o ninguna, si `negada`). Varias cláusulas se combinan con AND, así que
+    "A y B pero no C" son tres cláusulas: (A), (B) y no (C).
+
+    `impulsora` la decide el repositorio según la cantidad de contactos de
+    cada etiqueta: la cláusula más selectiva se resuelve como conjunto
+    (id IN (...), recorriendo solo sus contactos) y las demás como
+    comprobaciones por fila sobre el índice (contacto_id, etiqueta_id).
+    """
+
+    nombres: Tuple[str, ...]
+    negada: bool = False
+    impulsora: bool = False
+
+    def forma(self) -> Tuple:
+        return (_cubeta(len(self.nombres)), self.negada, self.impulsora)
+
+    def parametros(self) -> List[str]:
+        return list(self.nombres) + list(self.nombres[-1:]) * (
+            _cubeta(len(self.nombres)) - len(self.nombres)
+        )
+
+    def sql(self, cantidad: int) -> str:
+        nombres = f"SELECT id FROM etiquetas WHERE nombre IN ({', '.join('?' * cantidad)})"
+        if self.impulsora:
+            return (
+                "id IN (SELECT contacto_id FROM contactos_etiquetas "
+                f"WHERE etiqueta_id IN ({nombres}))"
+            )
+        return (
+            f"{'NOT ' if self.negada else ''}EXISTS (SELECT 1 FROM contactos_etiquetas e "
+            f"WHERE e.contacto_id = contactos.id AND e.etiqueta_id IN ({nombres}))"
+        )
+
+
+def parsear_etiquetas(texto: str) -> Tuple[ClausulaEtiquetas, ...]:
+    """
+    Filtro de etiquetas escrito a mano: términos separados por espacios o
+    comas, todos obligatorios; "a|b" es a o b y "-c" excluye c.
+    "clientes vip|socio -moroso" = clientes y (vip o socio) y no moroso.
+    """
+    clausulas = []
+    for termino in re.split(r"[\s,]+", (texto or "").strip()):
+        if not termino:
+            continue
+        negada = termino.startswith("-")
+        nombres = tuple(
+            normalizar_etiqueta(nombre) for nombre in termino.lstrip("-").split("|") if nombre
+        )
+        if not nombres:
+            raise ValueError(f"Término de etiquetas vacío: {termino!r}")
+        clausulas.append(ClausulaEtiquetas(nombres, negada))
+    return tuple(clausulas)
+
+
+@dataclass(frozen=True)
+class Consulta:
+    """Especificación de una lectura de contactos; ver el docstring del módulo."""
+
+    filtros: Tuple[Filtro, ...] = ()
+    texto: Optional[str] = None  # contenido en alguna de campos_texto
+    campos_texto: Tuple[str, ...] = CAMPOS_TEXTO
+    columnas: Tuple[str, ...] = CAMPOS_CONTACTO
+    orden: str = "id"
+    descendente: bool = False
+    limite: Optional[int] = None
+    desplazamiento: int = 0
+    despues_de: Optional[Tuple[Any, int]] = None  # clave (valor de orden, id), keyset
+    estado: str = "activos"
+    etiquetas: Tuple[ClausulaEtiquetas, ...] = ()
+    invalidos: bool = False  # solo los que la última auditoría marcó inválidos
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def filtrar(self, campo: str, operador: str = "=", valor: Any = None) -> "Consulta":
+        _validar_campo(campo)
+        if operador not in OPERADORES:
+            raise ValueError(f"Operador desconocido: {operador!r}")
+        if operador == "rango" and len(valor) != 2:
+            raise ValueError("'rango' espera (desde, hasta)")
+        if operador == "en":
+            valor = tuple(valor)
+        return replace(self, filtros=self.filtros + (Filtro(campo, operador, valor),))
+
+    def donde(self, **igualdades: Any) -> "Consulta":
+        """Atajo para varios filtros de igualdad: donde(nombre="Ana", apellido="Gómez")."""
+        consulta = self
+        for campo, valor in igualdades.items():
+            consulta = consulta.filtrar(campo, "=", valor)
+        return consulta
+
+    def con_etiquetas(
+        self,
+        todas: Iterable[str] = (),
+        alguna: Iterable[str] = (),
+        ninguna: Iterable[str] = (),
+    ) -> "Consulta":
+        """Contactos con todas las etiquetas de `todas`, alguna de `alguna` y ninguna de `ninguna`."""
+        clausulas = [ClausulaEtiquetas((normalizar_etiqueta(n),)) for n in todas]
+        alguna = tuple(normalizar_etiqueta(n) for n in alguna)
+        if alguna:
+            clausulas.append(ClausulaEtiquetas(alguna))
+        ninguna = tuple(normalizar_etiqueta(n) for n in ninguna)
+        if ninguna:
+            clausulas.append(ClausulaEtiquetas(ninguna, negada=True))
+        return self.con_clausulas(clausulas)
+
+    def con_clausulas(self, clausulas: Iterable[ClausulaEtiquetas]) -> "Consulta":
+        return replace(self, etiquetas=self.etiquetas + tuple(clausulas))
+
+    def buscar(self, texto: str, campos: Optional[Sequence[str]] = None) -> "Consulta":
+        """Contactos con `texto` en alguno de `campos` (por defecto CAMPOS_TEXTO)."""
+        campos = tuple(_validar_campo(c) for c in campos) if campos is not None else self.campos_texto
+        if not campos:
+            raise ValueError("La búsqueda por texto necesita al menos un campo")
+        return replace(self, texto=texto or None, campos_texto=campos)
+
+    def seleccionar(self, *columnas: str) -> "Consulta":
+        if not columnas:
+            raise ValueError("Hay que seleccionar al menos una columna")
+        return replace(self, columnas=tuple(_validar_campo(c) for c in columnas))
+
+    def ordenar_por(self, campo: str, descendente: bool = False) -> "Consulta":
+        return replace(self, orden=_validar_campo(campo), descendente=descendente)
+
+    def limitar(self, limite: Optional[int], desplazamiento: int = 0) -> "Consulta":
+        return replace(self, limite=limite, desplazamiento=desplazamiento)
+
+    def despues(self, clave: Optional[Tuple[Any, int]]) -> "Consulta":
+        """Paginación por clave: filas posteriores a `clave` (ver clave_orden)."""
+        return replace(self, despues_de=clave)
+
+    def solo_invalidos(self, activar: bool = True) -> "Consulta":
+        """Solo contactos con fila en la tabla calidad (ver services/calidad_services.py)."""
+        return replace(self, invalidos=activar)
+
+    def con_estado(self, estado: str) -> "Consulta":
+        if estado not in ESTADOS:
+            raise ValueError(f"Estado desconocido: {estado!r}")
+        return replace(self, estado=estado)
+
+    # ------------------------------------------------------------------
+    # Compilación
+    # ------------------------------------------------------------------
+    def forma(self) -> Tuple:
+        """Todo lo que determina el texto SQL (clave del caché)."""
+        return (
+            self.columnas,
+            tuple(f.forma() for f in self.filtros),
+            self.campos_texto if self.texto is not None else (),
+            self.orden,
+            self.descendente,
+            self.despues_de is not None,
+            self.limite is not None or self.desplazamiento > 0,
+            self.desplazamiento > 0,
+            self.estado,
+            tuple(c.forma() for c in self.etiquetas),
+            self.invalidos,
+        )
+
+    def parametros(self) -> List[Any]:
+        params: List[Any] = []
+        for filtro in self.filtros:
+            params += filtro.parametros()
+        for clausula in self.etiquetas:
+            params += clausula.parametros()
+        if self.texto is not None:
+            params.append("%" + _escapar_like(self.texto) + "%")
+        if self.despues_de is not None:
+            params += [self.despues_de[1]] if self.orden == "id" else list(self.despues_de)
+        if self.limite is not None or self.desplazamiento > 0:
+            params.append(-1 if self.limite is None else self.limite)
+        if self.desplazamiento > 0:
+            params.append(self.desplazamiento)
+        return params
+
+    def compilar(self) -> Tuple[str, List[Any]]:
+        return _sql(self.forma()), self.parametros()
+
+    @staticmethod
+    def cache() -> Any:
+        """Aciertos/fallos del caché de SQL compilado (functools.lru_cache)."""
+        return _sql.cache_info()
+
+
+def _cantidad_parametros(operador: str, cantidad: Optional[int]) -> int:
+    if operador in ("nulo", "no_nulo"):
+        return 0
+    if operador == "rango":
+        return 2
+    return cantidad if operador == "en" else 1
+
+
+@lru_cache(maxsize=CACHE_FORMAS)
+def _sql(forma: Tuple) -> str:
+    (columnas, filtros, texto, orden, descendente, keyset, limite, desplazamiento, estado,
+     etiquetas, invalidos) = forma
+
+    condiciones = []
+    if estado == "activos":
+        condiciones.append("baja IS NULL")  # condición de los índices parciales
+    elif estado == "bajas":
+        condiciones.append("baja IS NOT NULL")
+    for campo, operador, cantidad in filtros:
+        condiciones.append(
+            OPERADORES[operador].format(c=campo, marcas=", ".join("?" * (cantidad or 0)))
+        )
+    for cantidad, negada, impulsora in etiquetas:
+        condiciones.append(ClausulaEtiquetas((), negada, impulsora).sql(cantidad))
+    if invalidos:
+        condiciones.append("id IN (SELECT contacto_id FROM calidad)")
+    if texto:
+        # Un solo parámetro (?N, el siguiente a los de los filtros) para todas las columnas
+        previos = sum(_cantidad_parametros(op, n) for _, op, n in filtros)
+        previos += sum(cantidad for cantidad, _, _ in etiquetas)
+        marca = f"?{previos + 1}"
+        condiciones.append(
+            "(" + " OR ".join(f"{c} LIKE {marca} ESCAPE '\\'" for c in texto) + ")"
+        )
+    if keyset:
+        comparador = "<" if descendente else ">"
+        condiciones.append(
+            f"id {comparador} ?" if orden == "id" else f"({orden}, id) {comparador} (?, ?)"
+        )
+
+    sentido = "DESC" if descendente else "ASC"
+    sql = f"SELECT {', '.join(columnas)} FROM contactos"
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    sql += f" ORDER BY id {sentido}" if orden == "id" else f" ORDER BY {orden} {sentido}, id {sentido}"
+    if limite:
+        sql += " LIMIT ?"
+    if desplazamiento:
+        sql += " OFFSET ?"
+    return sql
+
+
+@lru_cache(maxsize=64)
+def sql_actualizacion(campos: Tuple[str, ...], condicion: str) -> str:
+    """
+    UPDATE contactos SET campo = ?, ..., modificado = <ahora> WHERE `condicion`,
+    con los nombres de campo validados. `condicion` es SQL fijo del repositorio
+    (puede llevar {marcas} para ContactoRepository._por_lotes).
+    """
+    if not campos:
+        raise ValueError("No hay campos para actualizar")
+    asignaciones = ", ".join(f"{_validar_campo(campo)} = ?" for campo in campos)
+    return f"UPDATE contactos SET {asignaciones}, modificado = {AHORA_SQL} WHERE {condicion}"
+
+
+def clave_fila(consulta: Consulta, fila: Sequence[Any]) -> Tuple:
+    """
+    Clave de orden de una fila de `consulta` (que debe incluir el campo de
+    orden y el id), para combinar resultados de varias bases. Los NULL van
+    primero, como en SQLite.
+    """
+    valor = fila[consulta.columnas.index(consulta.orden)]
+    contacto_id = fila[consulta.columnas.index("id")]
+    return (valor is not None, valor if valor is not None else 0, contacto_id)
+
+
+def a_contactos(
+    consulta: Consulta, filas: Iterable[Sequence[Any]], internador: Optional[Internador] = None
+) -> List[Contacto]:
+    """
+    Contactos a partir de las filas de `consulta`. Los campos no seleccionados
+    quedan con su valor por defecto. Con `internador` los contactos comparten
+    los valores repetidos (ver repository/diccionario.py).
+    """
+    if internador is not None:
+        filas = internador.filas(consulta.columnas, filas)
+    if consulta.columnas == CAMPOS_CONTACTO:
+        return [Contacto.from_row(fila) for fila in filas]
+    ajenas = set(consulta.columnas) - set(CAMPOS_CONTACTO)
+    if ajenas:
+        raise ValueError(
+            f"Columnas que no son de Contacto: {', '.join(sorted(ajenas))} (usar filas())"
+        )
+    return [Contacto(**dict(zip(consulta.columnas, fila))) for fila in filas]
@@ -1,42 +1,260 @@
-from database.conexion import obtener_conexion, cerrar_conexion
-from models.contacto import Contacto
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from config.settings import BAJA_LOGICA
+from database.conexion import obtener_conexion, cerrar_conexion, transaccion
+from models.contacto import Contacto, dominio_email
+from models.telefono import claves_telefono, normalizar_telefono, sufijo_invertido
+from repository.cifrado import CAMPOS_CIFRADOS, Cifrador, cifrador_por_defecto
+from repository.consulta import (
+    AHORA_SQL,
+    Consulta,
+    Filtro,
+    normalizar_etiqueta,
+    sql_actualizacion,
+)
+# Lo común a todos los motores (ver repository/interfaz.py); se sigue
+# importando desde acá
+from repository.interfaz import (
+    EDITABLES,
+    LOTE_LECTURA,
+    ORDENABLES,
+    Modificado,
+    Progreso,
+    RepositorioContactos,
+    a_modificados,
+    clave_orden,
+    consulta_modificados,
+    marca_tiempo,
+)
+
+# Columnas que el repositorio calcula al escribir (ver `_a_guardar`), indexadas
+# para las búsquedas por teléfono y por dominio
+DERIVADAS = ("telefono_canonico", "telefono_invertido", "email_dominio")
+
+# Índices ciegos de los campos cifrados (NULL si el cifrado está apagado)
+INDICES_CIEGOS = tuple(CAMPOS_CIFRADOS.values())
+
+# Marcas de tiempo que el repositorio pone en cada escritura (ver modificados_desde)
+MARCAS_TIEMPO = ("creado", "modificado")
+
+# Columnas que escribe un alta, en este orden (ver ContactoRepository._a_guardar)
+GUARDADAS = EDITABLES + DERIVADAS + INDICES_CIEGOS
+
+# Tamaño de cada lote de ids en un IN (...) (por debajo del límite de parámetros de SQLite)
+LOTE_IDS = 500
+
+# Una cláusula de etiquetas con hasta tantos contactos se resuelve como conjunto
+# (id IN (...)) y guía la consulta; por encima conviene recorrer el orden pedido
+# y comprobar las etiquetas fila por fila (ver ClausulaEtiquetas)
+ETIQUETAS_IMPULSORA_MAXIMO = 50_000
+
+
+class ContactoRepository(RepositorioContactos):
+    """
+    CRUD de contactos. Con baja lógica (por defecto, ver BAJA_LOGICA) `eliminar`
+    marca la columna `baja` y las lecturas ignoran esas filas; `restaurar` las
+    reactiva y la purga en segundo plano las borra físicamente.
+
+    Con un `cifrador` (None = el de CIFRADO_CAMPOS, False = sin cifrar; ver
+    repository/cifrado.py) telefono y email se guardan cifrados: las
+    igualdades sobre ellos usan los índices ciegos, la búsqueda por texto
+    recorre solo nombre y apellido, y no se puede ordenar por ellos ni buscar
+    teléfonos por sufijo.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        baja_logica: Optional[bool] = None,
+        cifrador: Union[Cifrador, bool, None] = None,
+    ):
+        self.db_path = db_path
+        self.baja_logica = BAJA_LOGICA if baja_logica is None else baja_logica
+        self.cifrador = cifrador_por_defecto() if cifrador is None else (cifrador or None)
+        self.ordenables = tuple(
+            c for c in ORDENABLES if not (self.cifrador and c in CAMPOS_CIFRADOS)
+        )
+
+    def _a_guardar(self, campos: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Valores a escribir para `campos` (de EDITABLES): les suma las columnas
+        derivadas y los índices ciegos del teléfono/email y, con cifrado, los
+        cifra. Sin cifrado los índices quedan en NULL; con cifrado, las
+        derivadas del teléfono quedan vacías (revelarían el número) y el
+        dominio del email se conserva en claro para agrupar y filtrar.
+        """
+        guardar = dict(campos)
+        if "telefono" in campos:
+            telefono = campos["telefono"]
+            if self.cifrador:
+                guardar["telefono"] = self.cifrador.cifrar(telefono, "telefono")
+                guardar["telefono_canonico"] = guardar["telefono_invertido"] = ""
+                guardar["telefono_indice"] = self.cifrador.indice("telefono", telefono)
+            else:
+                guardar["telefono_canonico"], guardar["telefono_invertido"] = claves_telefono(telefono)
+                guardar["telefono_indice"] = None
+        if "email" in campos:
+            email = campos["email"]
+            guardar["email_dominio"] = dominio_email(email)
+            if self.cifrador:
+                guardar["email"] = self.cifrador.cifrar(email, "email")
+                guardar["email_indice"] = self.cifrador.indice("email", email)
+            else:
+                guardar["email_indice"] = None
+        return guardar
+
+    def _adaptar_al_cifrado(self, consulta: Consulta) -> Consulta:
+        """
+        Traduce una consulta a lo que se puede resolver sobre columnas
+        cifradas: las igualdades sobre telefono/email pasan a su índice ciego
+        y la búsqueda por texto deja afuera esas columnas.
+        """
+        filtros = []
+        for filtro in consulta.filtros:
+            indice = CAMPOS_CIFRADOS.get(filtro.campo)
+            if indice is None or filtro.operador in ("nulo", "no_nulo"):
+                filtros.append(filtro)
+            elif filtro.operador == "=":
+                filtros.append(Filtro(indice, "=", self.cifrador.indice(filtro.campo, filtro.valor)))
+            elif filtro.operador == "en":
+                valores = tuple(self.cifrador.indice(filtro.campo, v) for v in filtro.valor)
+                filtros.append(Filtro(indice, "en", valores))
+            else:
+                raise ValueError(f"Con los campos cifrados, {filtro.campo} solo admite igualdad")
+        if consulta.orden in CAMPOS_CIFRADOS:
+            raise ValueError(f"No se puede ordenar por {consulta.orden!r} con los campos cifrados")
+        campos_texto = tuple(c for c in consulta.campos_texto if c not in CAMPOS_CIFRADOS)
+        if consulta.texto is not None and not campos_texto:
+            raise ValueError("Con los campos cifrados no se puede buscar texto en telefono/email")
+        return replace(consulta, filtros=tuple(filtros), campos_texto=campos_texto)
+
+    def _descifrar_filas(self, columnas: Tuple[str, ...], filas: List[tuple]) -> List[tuple]:
+        posiciones = [(i, c) for i, c in enumerate(columnas) if c in CAMPOS_CIFRADOS]
+        if not posiciones:
+            return filas
+        descifrar = self.cifrador.descifrar
+        resultado = []
+        for fila in filas:
+            fila = list(fila)
+            for i, campo in posiciones:
+                fila[i] = descifrar(fila[i], campo)
+            resultado.append(tuple(fila))
+        return resultado
 
-class ContactoRepository:
-    
     def agregar(self, contacto: Contacto):
-        """Agrega un nuevo contacto y devuelve el ID."""
-        query = "INSERT INTO contactos (nombre, apellido, telefono, email) VALUES (?, ?, ?, ?)"
-        conn = obtener_conexion()
-        try:
-            cursor = conn.cursor()
-            valores = contacto.to_tuple()  # (nombre, apellido, telefono, email)
-            cursor.execute(query, valores)
-            conn.commit()
+        """Agrega un nuevo contacto y devuelve el ID.
+
+        Si el contacto ya trae id (p. ej. asignado por el repositorio
+        particionado) se inserta con ese id; si no, lo asigna SQLite.
+        """
+        guardar = self._a_guardar(dict(zip(EDITABLES, contacto.to_tuple())))
+        columnas = ", ".join(GUARDADAS)
+        valores = tuple(guardar[c] for c in GUARDADAS)
+        if contacto.id is not None:
+            columnas = "id, " + columnas
+            valores = (contacto.id,) + valores
+        marcas = ", ".join("?" * len(valores))
+        query = (
+            f"INSERT INTO contactos ({columnas}, {', '.join(MARCAS_TIEMPO)}) "
+            f"VALUES ({marcas}, {AHORA_SQL}, {AHORA_SQL})"
+        )
+        with transaccion(self.db_path) as conn:
+            cursor = conn.execute(query, valores)
             return cursor.lastrowid  # ← devolvemos el ID nuevo
+
+    def agregar_lote(self, contactos: Iterable[Contacto]) -> int:
+        """
+        Agrega varios contactos en una sola transacción (importaciones). Los
+        que traen id se insertan con ese id; a los demás se lo asigna SQLite.
+        Retorna cuántos se agregaron.
+        """
+        query = (
+            f"INSERT INTO contactos (id, {', '.join(GUARDADAS + MARCAS_TIEMPO)}) "
+            f"VALUES ({', '.join('?' * (len(GUARDADAS) + 1))}, {AHORA_SQL}, {AHORA_SQL})"
+        )
+        filas = []
+        for c in contactos:
+            guardar = self._a_guardar(dict(zip(EDITABLES, c.to_tuple())))
+            filas.append((c.id,) + tuple(guardar[col] for col in GUARDADAS))
+        with transaccion(self.db_path) as conn:
+            conn.executemany(query, filas)
+        return len(filas)
+
+
+    def filas(self, consulta: Consulta) -> List[tuple]:
+        """Filas (tuplas con las columnas seleccionadas) que cumplen `consulta`."""
+        if self.cifrador:
+            consulta = self._adaptar_al_cifrado(consulta)
+        conn = obtener_conexion(self.db_path)
+        try:
+            if consulta.etiquetas:
+                consulta = self._planificar_etiquetas(conn, consulta)
+            query, params = consulta.compilar()
+            filas = conn.execute(query, params).fetchall()
         finally:
             cerrar_conexion(conn)
+        if self.cifrador:
+            filas = self._descifrar_filas(consulta.columnas, filas)
+        return filas
 
+    @staticmethod
+    def _planificar_etiquetas(conn, consulta: Consulta) -> Consulta:
+        """
+        Marca como impulsora la cláusula positiva de etiquetas con menos
+        contactos (según etiquetas.cantidad), si es lo bastante chica.
+        """
+        positivas = [i for i, c in enumerate(consulta.etiquetas) if not c.negada]
+        if not positivas:
+            return consulta
+        nombres = sorted({n for i in positivas for n in consulta.etiquetas[i].nombres})
+        cantidades = {
+            nombre.lower(): cantidad
+            for nombre, cantidad in conn.execute(
+                f"SELECT nombre, cantidad FROM etiquetas WHERE nombre IN ({', '.join('?' * len(nombres))})",
+                nombres,
+            )
+        }
+
+        def tamano(i: int) -> int:
+            return sum(cantidades.get(n.lower(), 0) for n in consulta.etiquetas[i].nombres)
+
+        elegida = min(positivas, key=tamano)
+        if tamano(elegida) > ETIQUETAS_IMPULSORA_MAXIMO:
+            return consulta
+        clausulas = list(consulta.etiquetas)
+        clausulas[elegida] = replace(clausulas[elegida], impulsora=True)
+        return replace(consulta, etiquetas=tuple(clausulas))
+
+    def buscar_por_telefono(self, telefono: str) -> List[Contacto]:
+        """
+        Contactos cuyo teléfono es el mismo número que `telefono`, escrito de
+        cualquier forma ("+54 11 1234-5678" == "011 1234 5678"). Búsqueda
+        exacta sobre el índice de telefono_canonico (o de telefono_indice,
+        con cifrado).
+        """
+        canonico = normalizar_telefono(telefono)
+        if not canonico:
+            return []
+        if self.cifrador:
+            return self.consultar(Consulta().donde(telefono=canonico))
+        return self.consultar(Consulta().donde(telefono_canonico=canonico))
+
+    def buscar_por_sufijo_telefono(self, digitos: str, limite: Optional[int] = None) -> List[Contacto]:
+        """
+        Contactos cuyo teléfono termina en `digitos` (p. ej. los últimos 8 de
+        un identificador de llamadas), ordenados por id. Se resuelve como un
+        rango sobre el índice de telefono_invertido: [sufijo, sufijo + ':'),
+        ya que ':' es el carácter siguiente a '9'. No disponible con cifrado.
+        """
+        if self.cifrador:
+            raise ValueError("Con los campos cifrados no se puede buscar por sufijo de teléfono")
+        sufijo = sufijo_invertido(digitos)
+        if not sufijo:
+            return []
+        consulta = Consulta().filtrar("telefono_invertido", "rango", (sufijo, sufijo + ":"))
+        return self.consultar(consulta.limitar(limite))
 
-    def obtener_todos(self):
-        """Obtiene todos los contactos de la base de datos."""
-        query = "SELECT * FROM contactos"
-        conn = obtener_conexion()
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        cerrar_conexion(conn)
-        return [Contacto.from_row(row) for row in rows]
-    
-    def obtener_por_id(self, contacto_id: int):
-        """Obtiene un contacto por su ID. Retorna None si no existe."""
-        query = "SELECT * FROM contactos WHERE id = ?"
-        conn = obtener_conexion()
-        cursor = conn.cursor()
-        cursor.execute(query, (contacto_id,))
-        row = cursor.fetchone()
-        cerrar_conexion(conn)
-        return Contacto.from_row(row) if row else None
-    
     def actualizar(self, contacto: Contacto):
         """Actualiza un contacto existente de forma dinámica.
         
@@ -49,59 +267,244 @@ class ContactoRepository:
         if not existente:
             return False
 
-        # Construir dinámicamente la consulta SQL
-        campos_actualizar = []
-        valores = []
-        
         # Solo actualizar campos que son diferentes y no están vacíos
-        if (contacto.nombre is not None and contacto.nombre != "" and 
-            contacto.nombre != existente.nombre):
-            campos_actualizar.append("nombre = ?")
-            valores.append(contacto.nombre)
-        
-        if (contacto.apellido is not None and contacto.apellido != "" and 
-            contacto.apellido != existente.apellido):
-            campos_actualizar.append("apellido = ?")
-            valores.append(contacto.apellido)
-        
-        if (contacto.telefono is not None and contacto.telefono != "" and 
-            contacto.telefono != existente.telefono):
-            campos_actualizar.append("telefono = ?")
-            valores.append(contacto.telefono)
-        
-        if (contacto.email is not None and contacto.email != "" and 
-            contacto.email != existente.email):
-            campos_actualizar.append("email = ?")
-            valores.append(contacto.email)
-
+        cambios: Dict[str, Any] = {
+            campo: getattr(contacto, campo)
+            for campo in EDITABLES
+            if getattr(contacto, campo) not in (None, "")
+            and getattr(contacto, campo) != getattr(existente, campo)
+        }
         # Si no hay campos para actualizar, retornar False
-        if not campos_actualizar:
+        if not cambios:
             return False
+        cambios = self._a_guardar(cambios)
 
-        # Construir la consulta SQL
-        query = f"UPDATE contactos SET {', '.join(campos_actualizar)} WHERE id = ?"
-        valores.append(contacto.id)
-
-        conn = obtener_conexion()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, valores)
-            conn.commit()
+        query = sql_actualizacion(tuple(cambios), "id = ? AND baja IS NULL")
+        with transaccion(self.db_path) as conn:
+            cursor = conn.execute(query, tuple(cambios.values()) + (contacto.id,))
             return cursor.rowcount > 0
-        finally:
-            cerrar_conexion(conn)
             
     def eliminar(self, contacto:Contacto):
-        """Elimina un contacto existente"""
+        """Elimina un contacto existente (baja lógica si está habilitada)"""
         if contacto.id is None:
             raise ValueError("El id del contacto es obligatorio para eliminar")
                 
-        query = "DELETE FROM contactos WHERE id=?"
-        conn = obtener_conexion()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, (contacto.id,))
-            conn.commit()
+        if self.baja_logica:
+            query = (
+                f"UPDATE contactos SET baja = {AHORA_SQL}, modificado = {AHORA_SQL} "
+                "WHERE id=? AND baja IS NULL"
+            )
+        else:
+            query = "DELETE FROM contactos WHERE id=?"
+        with transaccion(self.db_path) as conn:
+            cursor = conn.execute(query, (contacto.id,))
             return cursor.rowcount > 0
+
+    def _por_lotes(
+        self,
+        plantilla: str,
+        ids: Iterable[int],
+        params: tuple = (),
+        progreso: Optional[Progreso] = None,
+    ) -> int:
+        """
+        Ejecuta `plantilla` (con {marcas} para el IN) sobre los ids, de a
+        LOTE_IDS, en una única transacción. Retorna las filas afectadas.
+        """
+        ids = list(ids)
+        afectadas = 0
+        with transaccion(self.db_path) as conn:
+            for i in range(0, len(ids), LOTE_IDS):
+                lote = ids[i : i + LOTE_IDS]
+                marcas = ", ".join("?" * len(lote))
+                cursor = conn.execute(plantilla.format(marcas=marcas), params + tuple(lote))
+                afectadas += cursor.rowcount
+                if progreso:
+                    progreso(min(i + LOTE_IDS, len(ids)), len(ids))
+        return afectadas
+
+    def obtener_por_ids(self, ids: Iterable[int]) -> List[Contacto]:
+        """Contactos activos con esos ids, ordenados por id."""
+        ids = list(ids)
+        contactos: List[Contacto] = []
+        for i in range(0, len(ids), LOTE_IDS):
+            contactos += self.consultar(Consulta().filtrar("id", "en", ids[i : i + LOTE_IDS]))
+        contactos.sort(key=lambda c: c.id)
+        return contactos
+
+    def eliminar_lote(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        """Da de baja (o borra, sin baja lógica) varios contactos en una transacción."""
+        if self.baja_logica:
+            plantilla = (
+                f"UPDATE contactos SET baja = {AHORA_SQL}, modificado = {AHORA_SQL} "
+                "WHERE id IN ({marcas}) AND baja IS NULL"
+            )
+        else:
+            plantilla = "DELETE FROM contactos WHERE id IN ({marcas})"
+        return self._por_lotes(plantilla, ids, progreso=progreso)
+
+    def actualizar_lote(
+        self,
+        ids: Iterable[int],
+        campos: Dict[str, str],
+        progreso: Optional[Progreso] = None,
+    ) -> int:
+        """Asigna los mismos valores (p. ej. {"apellido": "Pérez"}) a varios contactos."""
+        invalidos = set(campos) - set(EDITABLES)
+        if invalidos:
+            raise ValueError(f"Campos no editables en lote: {', '.join(sorted(invalidos))}")
+        if not campos:
+            return 0
+        campos = self._a_guardar(campos)
+        plantilla = sql_actualizacion(tuple(campos), "id IN ({marcas}) AND baja IS NULL")
+        return self._por_lotes(plantilla, ids, tuple(campos.values()), progreso)
+
+    def cambiar_dominio_email(
+        self, ids: Iterable[int], dominio: str, progreso: Optional[Progreso] = None
+    ) -> int:
+        """Reemplaza el dominio del email (lo que sigue a '@') de varios contactos."""
+        dominio = dominio.strip().lstrip("@").lower()
+        if not dominio or "@" in dominio or "." not in dominio:
+            raise ValueError(f"Dominio de email inválido: {dominio!r}")
+        if self.cifrador:
+            return self._cambiar_dominio_cifrado(ids, dominio, progreso)
+        plantilla = (
+            "UPDATE contactos SET email = substr(email, 1, instr(email, '@')) || ?1, "
+            f"email_dominio = ?1, modificado = {AHORA_SQL} "
+            "WHERE id IN ({marcas}) AND baja IS NULL AND instr(email, '@') > 0"
+        )
+        return self._por_lotes(plantilla, ids, (dominio,), progreso)
+
+    def _cambiar_dominio_cifrado(
+        self, ids: Iterable[int], dominio: str, progreso: Optional[Progreso] = None
+    ) -> int:
+        """cambiar_dominio_email con el email cifrado: se descifra, cambia y recifra en Python."""
+        ids = list(ids)
+        afectadas = 0
+        query = sql_actualizacion(("email", "email_dominio", "email_indice"), "id = ?")
+        with transaccion(self.db_path) as conn:
+            for i in range(0, len(ids), LOTE_IDS):
+                lote = ids[i : i + LOTE_IDS]
+                filas = conn.execute(
+                    f"SELECT id, email FROM contactos WHERE id IN ({', '.join('?' * len(lote))}) "
+                    "AND baja IS NULL",
+                    lote,
+                ).fetchall()
+                cambios = []
+                for contacto_id, guardado in filas:
+                    email = self.cifrador.descifrar(guardado, "email")
+                    if "@" not in email:
+                        continue
+                    nuevo = self._a_guardar({"email": email[: email.index("@") + 1] + dominio})
+                    cambios.append(
+                        (nuevo["email"], nuevo["email_dominio"], nuevo["email_indice"], contacto_id)
+                    )
+                conn.executemany(query, cambios)
+                afectadas += len(cambios)
+                if progreso:
+                    progreso(min(i + LOTE_IDS, len(ids)), len(ids))
+        return afectadas
+
+    def restablecer(self, contactos: Iterable[Contacto]) -> int:
+        """
+        Deja cada contacto exactamente como se indica (upsert por id, activo),
+        en una sola transacción. Es la operación que usa el historial para
+        deshacer/rehacer: reescribe imágenes previas o reinserta filas borradas.
+        """
+        columnas = GUARDADAS
+        query = (
+            f"INSERT INTO contactos (id, {', '.join(columnas + MARCAS_TIEMPO)}) "
+            f"VALUES ({', '.join('?' * (len(columnas) + 1))}, {AHORA_SQL}, {AHORA_SQL}) "
+            "ON CONFLICT(id) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in columnas)
+            + ", baja = NULL, modificado = excluded.modificado"
+        )
+        filas = []
+        for c in contactos:
+            guardar = self._a_guardar(dict(zip(EDITABLES, c.to_tuple())))
+            filas.append((c.id,) + tuple(guardar[col] for col in columnas))
+        with transaccion(self.db_path) as conn:
+            conn.executemany(query, filas)
+        return len(filas)
+
+    def restaurar(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        """Reactiva en una sola transacción los contactos dados de baja. Retorna cuántos."""
+        plantilla = (
+            f"UPDATE contactos SET baja = NULL, modificado = {AHORA_SQL} "
+            "WHERE id IN ({marcas}) AND baja IS NOT NULL"
+        )
+        return self._por_lotes(plantilla, ids, progreso=progreso)
+
+    # ------------------------------------------------------------------
+    # Etiquetas
+    # ------------------------------------------------------------------
+    def etiquetas(self) -> List[Tuple[str, int]]:
+        """Etiquetas existentes y cuántos contactos tiene cada una (bajas incluidas), por nombre."""
+        conn = obtener_conexion(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT nombre, cantidad FROM etiquetas ORDER BY nombre COLLATE NOCASE"
+            ).fetchall()
         finally:
-            cerrar_conexion(conn)
\ No newline at end of file
+            cerrar_conexion(conn)
+
+    def etiquetas_de(self, contacto_id: int) -> List[str]:
+        """Etiquetas de un contacto, por nombre."""
+        conn = obtener_conexion(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT t.nombre FROM contactos_etiquetas e JOIN etiquetas t ON t.id = e.etiqueta_id "
+                "WHERE e.contacto_id = ? ORDER BY t.nombre COLLATE NOCASE",
+                (contacto_id,),
+            ).fetchall()
+        finally:
+            cerrar_conexion(conn)
+        return [row[0] for row in rows]
+
+    def etiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        """
+        Agrega las etiquetas (creándolas si no existen) a los contactos activos
+        con esos ids. Retorna cuántas asignaciones nuevas hubo.
+        """
+        nombres = tuple(dict.fromkeys(normalizar_etiqueta(n) for n in nombres))
+        if not nombres:
+            return 0
+        with transaccion(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO etiquetas (nombre) VALUES (?)", [(n,) for n in nombres]
+            )
+        plantilla = (
+            "INSERT OR IGNORE INTO contactos_etiquetas (etiqueta_id, contacto_id) "
+            "SELECT t.id, c.id FROM etiquetas t, contactos c "
+            f"WHERE t.nombre IN ({', '.join('?' * len(nombres))}) "
+            "AND c.id IN ({marcas}) AND c.baja IS NULL"
+        )
+        return self._por_lotes(plantilla, ids, nombres, progreso)
+
+    def desetiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        """Quita las etiquetas a esos contactos. Retorna cuántas asignaciones se quitaron."""
+        nombres = tuple(dict.fromkeys(normalizar_etiqueta(n) for n in nombres))
+        if not nombres:
+            return 0
+        plantilla = (
+            "DELETE FROM contactos_etiquetas WHERE etiqueta_id IN "
+            f"(SELECT id FROM etiquetas WHERE nombre IN ({', '.join('?' * len(nombres))})) "
+            "AND contacto_id IN ({marcas})"
+        )
+        return self._por_lotes(plantilla, ids, nombres, progreso)
+
+    def eliminar_etiqueta(self, nombre: str) -> int:
+        """Borra la etiqueta y sus asignaciones. Retorna a cuántos contactos se les quitó."""
+        nombre = normalizar_etiqueta(nombre)
+        with transaccion(self.db_path) as conn:
+            cursor = conn.execute(
+                "DELETE FROM contactos_etiquetas WHERE etiqueta_id = "
+                "(SELECT id FROM etiquetas WHERE nombre = ?)",
+                (nombre,),
+            )
+            conn.execute("DELETE FROM etiquetas WHERE nombre = ?", (nombre,))
+            return cursor.rowcount
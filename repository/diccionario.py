@@ -0,0 +1,81 @@
+# repository/diccionario.py
+"""
+Codificación por diccionario (interning) de los campos repetidos en las
+lecturas masivas.
+
+sqlite3 crea un str nuevo por cada valor leído: un listado de un millón de
+contactos con unos pocos miles de nombres distintos guarda un millón de
+copias de "María". El Internador recuerda el primer str de cada valor y
+devuelve ese mismo objeto para los siguientes, así los Contacto de una
+lectura comparten los valores de los campos de baja cardinalidad (nombre,
+apellido y, si se proyecta, email_dominio). Los valores son iguales a los
+de siempre; solo cambia cuántas copias hay en memoria.
+
+El teléfono y el email casi nunca se repiten: internarlos solo agregaría
+entradas al diccionario, así que no se tocan. Un Internador vive lo que una
+lectura (obtener_todos, iterar): al terminar se descarta el diccionario y
+quedan los valores compartidos.
+"""
+import sys
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+__all__ = ["CAMPOS_INTERNADOS", "Internador"]
+
+# Campos de baja cardinalidad que se comparten entre contactos
+CAMPOS_INTERNADOS = ("nombre", "apellido", "email_dominio")
+
+
+class Internador:
+    """
+    Un diccionario valor -> str compartido por campo, con contadores para el
+    reporte de memoria. Se puede compartir entre hilos (los shards de
+    ContactoRepositoryParticionado leen en paralelo): dict.setdefault es
+    atómico y los contadores van con lock.
+    """
+
+    def __init__(self, campos: Iterable[str] = CAMPOS_INTERNADOS):
+        self.tablas: Dict[str, Dict[str, str]] = {campo: {} for campo in campos}
+        self.referencias: Dict[str, int] = dict.fromkeys(self.tablas, 0)
+        self._lock = threading.Lock()
+
+    def posiciones(self, columnas: Sequence[str]) -> List[Tuple[int, Dict[str, str]]]:
+        """(posición en la fila, diccionario) de las columnas de `columnas` que se internan."""
+        return [(i, self.tablas[c]) for i, c in enumerate(columnas) if c in self.tablas]
+
+    def filas(self, columnas: Sequence[str], filas: Iterable[tuple]) -> List[tuple]:
+        """Las filas con los valores de los campos internados reemplazados por los compartidos."""
+        posiciones = self.posiciones(columnas)
+        if not posiciones:
+            return list(filas)
+        resultado = []
+        for fila in filas:
+            fila = list(fila)
+            for i, tabla in posiciones:
+                valor = fila[i]
+                if valor is not None:
+                    fila[i] = tabla.setdefault(valor, valor)
+            resultado.append(tuple(fila))
+        with self._lock:
+            for i, _ in posiciones:
+                self.referencias[columnas[i]] += len(resultado)
+        return resultado
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        """
+        Por campo: valores leídos, distintos y bytes de str que se evitaron
+        (las copias que el listado ya no retiene, estimadas con sys.getsizeof).
+        """
+        resumen = {}
+        for campo, tabla in self.tablas.items():
+            referencias = self.referencias[campo]
+            if not referencias:
+                continue
+            unicos = sum(sys.getsizeof(v) for v in tabla.values())
+            promedio = unicos / len(tabla) if tabla else 0
+            resumen[campo] = {
+                "valores": referencias,
+                "distintos": len(tabla),
+                "bytes_evitados": int((referencias - len(tabla)) * promedio),
+            }
+        return resumen
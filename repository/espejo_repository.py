@@ -0,0 +1,339 @@
+import hashlib
+import itertools
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from config.settings import ESPEJO_SINCRONIZAR_SEGUNDOS, ESPEJO_VERIFICAR_SEGUNDOS
+from database.conexion import cerrar_conexion, obtener_conexion
+from models.contacto import Contacto
+from repository.cambio_repository import CambioRepository
+from repository.consulta import Consulta
+from repository.contacto_repository import (
+    DERIVADAS,
+    INDICES_CIEGOS,
+    LOTE_IDS,
+    LOTE_LECTURA,
+    MARCAS_TIEMPO,
+    ContactoRepository,
+)
+from repository.interfaz import RepositorioContactos
+
+# Todas las columnas de contactos, en el orden en que se copian al espejo
+_COLUMNAS = (
+    ("id", "nombre", "apellido", "telefono", "email", "baja")
+    + DERIVADAS
+    + MARCAS_TIEMPO
+    + INDICES_CIEGOS
+)
+
+_SQL_VERSION = "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+
+_contador = itertools.count()
+
+
+class ContactoRepositoryEspejo(RepositorioContactos):
+    """
+    Repositorio con la interfaz de ContactoRepository que sirve las lecturas
+    desde una copia de la base en memoria y manda las escrituras a disco.
+
+    - Al crearse copia la base completa a una base SQLite en memoria
+      (URI compartida "file:...?mode=memory&cache=shared") con la API de
+      backup, así el espejo tiene los mismos índices y las mismas consultas
+      (es un ContactoRepository apuntando a esa URI).
+    - Después de cada escritura, y antes de una lectura si pasaron más de
+      ESPEJO_SINCRONIZAR_SEGUNDOS (para ver lo que escribieron otros
+      procesos), aplica al espejo las filas tocadas según el registro de
+      cambios. Si el registro fue compactado más allá de lo aplicado, recarga.
+    - `verificar` compara espejo y disco (conteos o fila por fila). Ante una
+      diferencia las lecturas pasan a disco, se recarga el espejo y se vuelve
+      a usar solo si la nueva copia coincide. Un error al leer del espejo
+      también cae a disco.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, baja_logica: Optional[bool] = None):
+        self.db_path = db_path
+        self.disco = ContactoRepository(db_path, baja_logica)
+        self.baja_logica = self.disco.baja_logica
+        self.ordenables = self.disco.ordenables
+
+        self._uri = f"file:espejo_contactos_{next(_contador)}?mode=memory&cache=shared"
+        # La base en memoria vive mientras haya una conexión abierta a la URI
+        self._ancla = obtener_conexion(self._uri)
+        self._ancla.isolation_level = None
+        self.memoria = ContactoRepository(self._uri, baja_logica)
+
+        self._lock = threading.RLock()  # una sola operación sobre el espejo a la vez
+        self.seq = 0  # último cambio del disco aplicado al espejo
+        self.divergente = False
+        self.fallos = 0  # lecturas que tuvieron que ir a disco
+        self._ultima_sincronizacion = 0.0
+        self._ultima_verificacion = time.monotonic()
+        self.cargar()
+
+    def cerrar(self) -> None:
+        cerrar_conexion(self._ancla)
+
+    # ------------------------------------------------------------------
+    # Carga y sincronización
+    # ------------------------------------------------------------------
+    def cargar(self) -> None:
+        """Copia completa disco -> memoria (una foto consistente de la base)."""
+        with self._lock:
+            disco = obtener_conexion(self.db_path)
+            disco.isolation_level = None
+            try:
+                disco.execute("BEGIN")
+                (self.seq,) = disco.execute(_SQL_VERSION).fetchone() or (0,)
+                disco.backup(self._ancla)
+                disco.execute("COMMIT")
+            finally:
+                cerrar_conexion(disco)
+            # El espejo no necesita su propio registro de cambios ni poner marcas
+            # de tiempo: las filas llegan de disco tal cual
+            for trigger in ("insert", "update", "delete", "creado", "modificado"):
+                self._ancla.execute(f"DROP TRIGGER IF EXISTS trg_contactos_{trigger}")
+            self._ancla.execute("DELETE FROM contactos_cambios")
+            self._ultima_sincronizacion = time.monotonic()
+
+    def sincronizar(self) -> int:
+        """Aplica al espejo lo cambiado en disco desde `seq`. Retorna los contactos tocados."""
+        with self._lock:
+            if CambioRepository(self.db_path).compactado_hasta() > self.seq:
+                self.cargar()  # faltan cambios en el registro: copia completa
+                return -1
+
+            disco = obtener_conexion(self.db_path)
+            disco.isolation_level = None
+            try:
+                disco.execute("BEGIN")  # ids, filas y seq de la misma foto
+                (hasta,) = disco.execute(_SQL_VERSION).fetchone() or (0,)
+                if hasta == self.seq:
+                    disco.execute("COMMIT")
+                    self._ultima_sincronizacion = time.monotonic()
+                    return 0
+                tocados = [
+                    row[0]
+                    for row in disco.execute(
+                        "SELECT DISTINCT contacto_id FROM contactos_cambios "
+                        "WHERE seq > ? AND seq <= ?",
+                        (self.seq, hasta),
+                    )
+                ]
+                lotes = []
+                for i in range(0, len(tocados), LOTE_IDS):
+                    lote = tocados[i : i + LOTE_IDS]
+                    marcas = ", ".join("?" * len(lote))
+                    filas = disco.execute(
+                        f"SELECT {', '.join(_COLUMNAS)} FROM contactos WHERE id IN ({marcas})",
+                        lote,
+                    ).fetchall()
+                    lotes.append((lote, filas))
+                disco.execute("COMMIT")
+            finally:
+                cerrar_conexion(disco)
+
+            upsert = (
+                f"INSERT INTO contactos ({', '.join(_COLUMNAS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNAS))}) ON CONFLICT(id) DO UPDATE SET "
+                + ", ".join(f"{c} = excluded.{c}" for c in _COLUMNAS[1:])
+            )
+            self._ancla.execute("BEGIN")
+            try:
+                for lote, filas in lotes:
+                    self._ancla.executemany(upsert, filas)
+                    presentes = {fila[0] for fila in filas}
+                    self._ancla.executemany(
+                        "DELETE FROM contactos WHERE id = ?",
+                        [(i,) for i in lote if i not in presentes],
+                    )
+                self._ancla.execute("COMMIT")
+            except Exception:
+                self._ancla.execute("ROLLBACK")
+                raise
+            self.seq = hasta
+            self._ultima_sincronizacion = time.monotonic()
+            return len(tocados)
+
+    # ------------------------------------------------------------------
+    # Consistencia
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _huella(db_path: str, completa: bool) -> tuple:
+        """Conteos (y, si `completa`, un hash de todas las filas) de una base."""
+        conn = obtener_conexion(db_path)
+        try:
+            conteos = conn.execute(
+                "SELECT COUNT(*), COUNT(baja), COALESCE(MAX(id), 0) FROM contactos"
+            ).fetchone()
+            if not completa:
+                return conteos
+            h = hashlib.sha256()
+            cursor = conn.execute(f"SELECT {', '.join(_COLUMNAS)} FROM contactos ORDER BY id")
+            for filas in iter(lambda: cursor.fetchmany(5000), []):
+                h.update(repr(filas).encode("utf-8"))
+            return conteos + (h.hexdigest(),)
+        finally:
+            cerrar_conexion(conn)
+
+    def verificar(self, completa: bool = True) -> bool:
+        """
+        Sincroniza y compara espejo y disco. Si difieren pasa las lecturas a
+        disco y recarga el espejo; lo vuelve a usar solo si la copia nueva
+        coincide. Retorna si el espejo quedó consistente.
+        """
+        with self._lock:
+            self._ultima_verificacion = time.monotonic()
+            try:
+                self.sincronizar()
+                coincide = self._huella(self.db_path, completa) == self._huella(self._uri, completa)
+            except Exception as err:
+                print(f"Error al verificar el espejo en memoria: {err}")
+                coincide = False
+            if coincide:
+                self.divergente = False
+                return True
+
+            print("El espejo en memoria difiere de la base: se recarga y se lee de disco")
+            self.divergente = True
+            try:
+                self.cargar()
+                self.divergente = self._huella(self.db_path, completa) != self._huella(self._uri, completa)
+            except Exception as err:
+                print(f"Error al recargar el espejo en memoria: {err}")
+            return not self.divergente
+
+    # ------------------------------------------------------------------
+    # Lecturas (desde memoria) y escrituras (a disco + espejo)
+    # ------------------------------------------------------------------
+    def _leer(self, metodo: str, *args):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora - self._ultima_verificacion >= ESPEJO_VERIFICAR_SEGUNDOS:
+                self.verificar(completa=False)
+            elif ahora - self._ultima_sincronizacion >= ESPEJO_SINCRONIZAR_SEGUNDOS:
+                try:
+                    self.sincronizar()
+                except Exception as err:
+                    print(f"Error al sincronizar el espejo en memoria: {err}")
+                    self.divergente = True
+            if not self.divergente:
+                try:
+                    return getattr(self.memoria, metodo)(*args)
+                except Exception as err:
+                    print(f"Error al leer del espejo en memoria ({metodo}): {err}")
+            self.fallos += 1
+        return getattr(self.disco, metodo)(*args)
+
+    def _escribir(self, metodo: str, *args, **kwargs):
+        resultado = getattr(self.disco, metodo)(*args, **kwargs)
+        try:
+            self.sincronizar()
+        except Exception as err:
+            print(f"Error al actualizar el espejo en memoria: {err}")
+            self.divergente = True
+        return resultado
+
+    # Las etiquetas y la tabla de calidad no se replican en el espejo: lo que
+    # las involucra va a disco
+    def filas(self, consulta: Consulta) -> List[tuple]:
+        if consulta.etiquetas or consulta.invalidos:
+            return self.disco.filas(consulta)
+        return self._leer("filas", consulta)
+
+    def consultar(self, consulta: Consulta) -> List[Contacto]:
+        if consulta.etiquetas or consulta.invalidos:
+            return self.disco.consultar(consulta)
+        return self._leer("consultar", consulta)
+
+    def obtener_todos(self, internador=None):
+        return self._leer("obtener_todos", internador)
+
+    def iterar(self, consulta=None, lote=LOTE_LECTURA, internador=None):
+        # Streaming desde disco: recorrer el espejo retendría su lock entre páginas
+        return self.disco.iterar(consulta, lote, internador)
+
+    def buscar(self, texto: str, limite: Optional[int] = None) -> List[Contacto]:
+        return self._leer("buscar", texto, limite)
+
+    def listar_pagina(
+        self,
+        orden="id",
+        descendente=False,
+        limite=200,
+        despues_de=None,
+        antes_de=None,
+        etiquetas=(),
+        solo_invalidos=False,
+    ):
+        if etiquetas or solo_invalidos:
+            return self.disco.listar_pagina(
+                orden, descendente, limite, despues_de, antes_de, etiquetas, solo_invalidos
+            )
+        return self._leer("listar_pagina", orden, descendente, limite, despues_de, antes_de)
+
+    def buscar_por_telefono(self, telefono: str) -> List[Contacto]:
+        return self._leer("buscar_por_telefono", telefono)
+
+    def buscar_por_sufijo_telefono(self, digitos: str, limite: Optional[int] = None) -> List[Contacto]:
+        return self._leer("buscar_por_sufijo_telefono", digitos, limite)
+
+    def buscar_por_dominio(self, dominio: str, limite: Optional[int] = None) -> List[Contacto]:
+        return self._leer("buscar_por_dominio", dominio, limite)
+
+    def modificados_desde(self, desde, limite: Optional[int] = None):
+        return self._leer("modificados_desde", desde, limite)
+
+    def obtener_por_id(self, contacto_id: int):
+        return self._leer("obtener_por_id", contacto_id)
+
+    def obtener_por_ids(self, ids: Iterable[int]) -> List[Contacto]:
+        return self._leer("obtener_por_ids", list(ids))
+
+    def obtener_bajas(self) -> List[Contacto]:
+        return self._leer("obtener_bajas")
+
+    def agregar(self, contacto: Contacto):
+        return self._escribir("agregar", contacto)
+
+    def agregar_lote(self, contactos: Iterable[Contacto]) -> int:
+        return self._escribir("agregar_lote", contactos)
+
+    def actualizar(self, contacto: Contacto):
+        return self._escribir("actualizar", contacto)
+
+    def eliminar(self, contacto: Contacto):
+        return self._escribir("eliminar", contacto)
+
+    def eliminar_lote(self, ids: Iterable[int], progreso=None) -> int:
+        return self._escribir("eliminar_lote", ids, progreso=progreso)
+
+    def actualizar_lote(self, ids: Iterable[int], campos, progreso=None) -> int:
+        return self._escribir("actualizar_lote", ids, campos, progreso=progreso)
+
+    def cambiar_dominio_email(self, ids: Iterable[int], dominio: str, progreso=None) -> int:
+        return self._escribir("cambiar_dominio_email", ids, dominio, progreso=progreso)
+
+    def restablecer(self, contactos: Iterable[Contacto]) -> int:
+        return self._escribir("restablecer", contactos)
+
+    def restaurar(self, ids: Iterable[int], progreso=None) -> int:
+        return self._escribir("restaurar", ids, progreso=progreso)
+
+    def etiquetas(self):
+        return self.disco.etiquetas()
+
+    def etiquetas_de(self, contacto_id: int) -> List[str]:
+        return self.disco.etiquetas_de(contacto_id)
+
+    def buscar_por_etiquetas(self, todas=(), alguna=(), ninguna=(), limite: Optional[int] = None):
+        return self.disco.buscar_por_etiquetas(todas, alguna, ninguna, limite)
+
+    def etiquetar(self, ids: Iterable[int], nombres, progreso=None) -> int:
+        return self.disco.etiquetar(ids, nombres, progreso=progreso)
+
+    def desetiquetar(self, ids: Iterable[int], nombres, progreso=None) -> int:
+        return self.disco.desetiquetar(ids, nombres, progreso=progreso)
+
+    def eliminar_etiqueta(self, nombre: str) -> int:
+        return self.disco.eliminar_etiqueta(nombre)
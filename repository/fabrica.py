@@ -0,0 +1,36 @@
+from config.settings import ESPEJO_MEMORIA, REPOSITORIO_MOTOR, SHARD_CANTIDAD
+
+MOTORES = ("sqlite", "memoria")
+
+
+def crear_repositorio():
+    """
+    Devuelve el repositorio de contactos según la configuración: con
+    REPOSITORIO_MOTOR = "memoria", uno en la memoria del proceso; si no, la
+    base única (DB_PATH) o el almacén particionado si SHARD_CANTIDAD > 0; con
+    la base única y ESPEJO_MEMORIA, las lecturas se sirven desde un espejo en
+    memoria. Todos implementan RepositorioContactos (repository/interfaz.py),
+    así que la GUI y los scripts no necesitan distinguirlos.
+    """
+    if REPOSITORIO_MOTOR not in MOTORES:
+        raise ValueError(
+            f"REPOSITORIO_MOTOR desconocido: {REPOSITORIO_MOTOR!r} (usar {', '.join(MOTORES)})"
+        )
+    if REPOSITORIO_MOTOR == "memoria":
+        from repository.memoria_repository import ContactoRepositoryMemoria
+
+        return ContactoRepositoryMemoria()
+
+    if SHARD_CANTIDAD > 0:
+        from repository.particionado_repository import ContactoRepositoryParticionado
+
+        return ContactoRepositoryParticionado()
+
+    if ESPEJO_MEMORIA:
+        from repository.espejo_repository import ContactoRepositoryEspejo
+
+        return ContactoRepositoryEspejo()
+
+    from repository.contacto_repository import ContactoRepository
+
+    return ContactoRepository()
@@ -0,0 +1,192 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from models.contacto import Contacto
+
+# Imagen compacta de un contacto: (id, nombre, apellido, telefono, email)
+Imagen = Tuple[int, str, str, str, str]
+
+
+def _imagen(c: Contacto) -> Imagen:
+    return (c.id, c.nombre, c.apellido, c.telefono, c.email)
+
+
+def _contacto(imagen: Imagen) -> Contacto:
+    return Contacto.from_row(imagen)
+
+
+@dataclass
+class Operacion:
+    """
+    Mutación registrada en el historial. `antes` vacío = alta; `despues`
+    vacío = baja; ambos = modificación.
+    """
+    descripcion: str
+    antes: List[Imagen] = field(default_factory=list)
+    despues: List[Imagen] = field(default_factory=list)
+
+    @property
+    def tamano(self) -> int:
+        return len(self.antes) + len(self.despues)
+
+
+@dataclass
+class Efecto:
+    """Qué filas cambiar en la grilla tras deshacer/rehacer (sin releer todo)."""
+    descripcion: str
+    mostrar: List[Contacto] = field(default_factory=list)  # insertar o actualizar
+    quitar: List[int] = field(default_factory=list)  # ids a sacar de la grilla
+
+
+class HistorialRepository:
+    """
+    Envuelve un repositorio de contactos y registra, para cada alta,
+    modificación o baja, las imágenes previas y posteriores de las filas
+    tocadas. Deshacer/rehacer reaplica esas imágenes con una sola llamada en
+    lote (restablecer / eliminar_lote) y devuelve el Efecto para la grilla.
+
+    Las pilas son buffers acotados (deque): se descartan las operaciones más
+    viejas al superar `capacidad` operaciones o `max_imagenes` filas en total.
+    Las lecturas y demás métodos se delegan tal cual al repositorio envuelto.
+    """
+
+    def __init__(self, repo, capacidad: int = 100, max_imagenes: int = 100_000):
+        self.repo = repo
+        self.max_imagenes = max_imagenes
+        self._deshacer: deque = deque(maxlen=capacidad)
+        self._rehacer: deque = deque(maxlen=capacidad)
+        self._imagenes = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self.repo, nombre)
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+    def _apilar(self, pila: deque, op: Operacion) -> None:
+        """Apila contando imágenes; el deque descarta la más vieja si está lleno."""
+        if len(pila) == pila.maxlen:
+            self._imagenes -= pila[0].tamano
+        pila.append(op)
+        self._imagenes += op.tamano
+
+    def _registrar(self, op: Operacion) -> None:
+        if not op.tamano:
+            return
+        self._imagenes -= sum(o.tamano for o in self._rehacer)
+        self._rehacer.clear()
+        self._apilar(self._deshacer, op)
+        while self._imagenes > self.max_imagenes and len(self._deshacer) > 1:
+            self._imagenes -= self._deshacer.popleft().tamano
+
+    def puede_deshacer(self) -> bool:
+        return bool(self._deshacer)
+
+    def puede_rehacer(self) -> bool:
+        return bool(self._rehacer)
+
+    def proximo_deshacer(self) -> Optional[str]:
+        return self._deshacer[-1].descripcion if self._deshacer else None
+
+    def proximo_rehacer(self) -> Optional[str]:
+        return self._rehacer[-1].descripcion if self._rehacer else None
+
+    # ------------------------------------------------------------------
+    # Mutaciones registradas
+    # ------------------------------------------------------------------
+    def agregar(self, contacto: Contacto):
+        nuevo_id = self.repo.agregar(contacto)
+        creado = self.repo.obtener_por_id(nuevo_id)
+        if creado:
+            self._registrar(Operacion("alta", despues=[_imagen(creado)]))
+        return nuevo_id
+
+    def actualizar(self, contacto: Contacto):
+        antes = self.repo.obtener_por_id(contacto.id) if contacto.id is not None else None
+        ok = self.repo.actualizar(contacto)
+        if ok and antes:
+            despues = self.repo.obtener_por_id(contacto.id)
+            self._registrar(
+                Operacion("modificación", antes=[_imagen(antes)], despues=[_imagen(despues)])
+            )
+        return ok
+
+    def eliminar(self, contacto: Contacto):
+        antes = self.repo.obtener_por_id(contacto.id) if contacto.id is not None else None
+        ok = self.repo.eliminar(contacto)
+        if ok and antes:
+            self._registrar(Operacion("baja", antes=[_imagen(antes)]))
+        return ok
+
+    def eliminar_lote(self, ids: Iterable[int], progreso=None) -> int:
+        antes = self.repo.obtener_por_ids(ids)
+        n = self.repo.eliminar_lote([c.id for c in antes], progreso=progreso)
+        self._registrar(Operacion(f"baja de {len(antes)}", antes=[_imagen(c) for c in antes]))
+        return n
+
+    def _modificar_lote(self, descripcion: str, ids, aplicar) -> int:
+        antes = self.repo.obtener_por_ids(ids)
+        n = aplicar([c.id for c in antes])
+        despues = self.repo.obtener_por_ids([c.id for c in antes])
+        self._registrar(
+            Operacion(
+                descripcion,
+                antes=[_imagen(c) for c in antes],
+                despues=[_imagen(c) for c in despues],
+            )
+        )
+        return n
+
+    def actualizar_lote(self, ids: Iterable[int], campos, progreso=None) -> int:
+        return self._modificar_lote(
+            "edición en lote",
+            ids,
+            lambda lote: self.repo.actualizar_lote(lote, campos, progreso=progreso),
+        )
+
+    def cambiar_dominio_email(self, ids: Iterable[int], dominio: str, progreso=None) -> int:
+        return self._modificar_lote(
+            "cambio de dominio",
+            ids,
+            lambda lote: self.repo.cambiar_dominio_email(lote, dominio, progreso=progreso),
+        )
+
+    # ------------------------------------------------------------------
+    # Deshacer / Rehacer
+    # ------------------------------------------------------------------
+    def _aplicar(self, descripcion: str, imagenes: List[Imagen], ausentes: List[Imagen]) -> Efecto:
+        """Deja las filas como en `imagenes`; si no hay, da de baja las de `ausentes`."""
+        if imagenes:
+            contactos = [_contacto(img) for img in imagenes]
+            self.repo.restablecer(contactos)
+            return Efecto(descripcion, mostrar=contactos)
+        ids = [img[0] for img in ausentes]
+        self.repo.eliminar_lote(ids)
+        return Efecto(descripcion, quitar=ids)
+
+    def deshacer(self) -> Optional[Efecto]:
+        if not self._deshacer:
+            return None
+        op = self._deshacer.pop()
+        try:
+            efecto = self._aplicar(f"Deshacer {op.descripcion}", op.antes, op.despues)
+        except Exception:
+            self._deshacer.append(op)  # queda disponible para reintentar
+            raise
+        self._imagenes -= op.tamano
+        self._apilar(self._rehacer, op)
+        return efecto
+
+    def rehacer(self) -> Optional[Efecto]:
+        if not self._rehacer:
+            return None
+        op = self._rehacer.pop()
+        try:
+            efecto = self._aplicar(f"Rehacer {op.descripcion}", op.despues, op.antes)
+        except Exception:
+            self._rehacer.append(op)
+            raise
+        self._imagenes -= op.tamano
+        self._apilar(self._deshacer, op)
+        return efecto
@@ -0,0 +1,324 @@
+# repository/interfaz.py
+"""
+Interfaz común de los repositorios de contactos.
+
+RepositorioContactos declara lo que la GUI, la CLI y los servicios esperan
+de un repositorio, sea cual sea el motor: SQLite (ContactoRepository y sus
+variantes particionada y con espejo) o la memoria del proceso
+(ContactoRepositoryMemoria). Cada motor implementa los métodos abstractos
+(las lecturas con `filas` y las escrituras); las lecturas que son solo una
+Consulta armada de cierta forma (páginas, búsquedas, modificados_desde...)
+están acá una vez para todos.
+
+services/conformidad_services.py comprueba que dos motores respondan lo
+mismo a las mismas operaciones.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union,
+)
+
+from models.contacto import Contacto, dominio_email
+from repository.consulta import CAMPOS_CONTACTO, ClausulaEtiquetas, Consulta, a_contactos
+from repository.diccionario import Internador
+
+__all__ = [
+    "EDITABLES",
+    "LOTE_LECTURA",
+    "ORDENABLES",
+    "Modificado",
+    "Progreso",
+    "RepositorioContactos",
+    "a_modificados",
+    "clave_orden",
+    "consulta_modificados",
+    "marca_tiempo",
+    "rutas_de",
+]
+
+# Columnas por las que se puede ordenar la grilla (todas indexadas como (col, id))
+ORDENABLES = ("id", "nombre", "apellido", "telefono", "email")
+
+# Columnas editables en lote
+EDITABLES = ("nombre", "apellido", "telefono", "email")
+
+# Filas por página de las lecturas en streaming (RepositorioContactos.iterar)
+LOTE_LECTURA = 2000
+
+# Callback de progreso para operaciones en lote: (procesados, total)
+Progreso = Callable[[int, int], None]
+
+
+def clave_orden(contacto: Contacto, orden: str) -> Tuple[Any, int]:
+    """Clave (valor, id) de un contacto para el orden dado; es la que usa el keyset."""
+    return (getattr(contacto, orden), contacto.id)
+
+
+def rutas_de(repo) -> List[Optional[str]]:
+    """
+    Bases SQLite de un repositorio, para los servicios que las leen directo
+    (estadísticas, auditoría, aviso de cambios, purga): la suya (None =
+    DB_PATH), la de cada shard, o ninguna si el motor no usa archivos.
+    """
+    rutas = getattr(repo, "rutas", None)
+    return list(rutas) if rutas is not None else [getattr(repo, "db_path", None)]
+
+
+def marca_tiempo(momento: Union[str, datetime]) -> str:
+    """
+    Momento en el formato de las columnas creado/modificado ('2025-03-01
+    13:05:09.120', UTC). Un datetime sin zona se toma como hora local.
+    """
+    if isinstance(momento, str):
+        return momento
+    return momento.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+class Modificado(NamedTuple):
+    """Un contacto escrito desde cierto momento (ver modificados_desde)."""
+    contacto: Contacto
+    baja: Optional[str]  # momento de la baja lógica; None si sigue activo
+    modificado: str
+
+
+def consulta_modificados(desde: Union[str, datetime], limite: Optional[int] = None) -> Consulta:
+    """Consulta de modificados_desde; sirve igual para una base o para varias."""
+    return (
+        Consulta()
+        .con_estado("todos")
+        .filtrar("modificado", ">=", marca_tiempo(desde))
+        .seleccionar(*CAMPOS_CONTACTO, "baja", "modificado")
+        .ordenar_por("modificado")
+        .limitar(limite)
+    )
+
+
+def a_modificados(filas: Iterable[tuple]) -> List[Modificado]:
+    n = len(CAMPOS_CONTACTO)
+    return [Modificado(Contacto.from_row(fila[:n]), fila[n], fila[n + 1]) for fila in filas]
+
+
+class RepositorioContactos(ABC):
+    """
+    CRUD, búsquedas, paginación y etiquetas de contactos. `baja_logica` dice
+    si eliminar marca la baja (y las lecturas la ignoran) o borra; los
+    métodos con `progreso` lo llaman a medida que avanzan los lotes.
+    """
+
+    baja_logica: bool
+    ordenables: Tuple[str, ...] = ORDENABLES
+
+    # ------------------------------------------------------------------
+    # Lecturas
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def filas(self, consulta: Consulta) -> List[tuple]:
+        """Filas (tuplas con las columnas seleccionadas) que cumplen `consulta`."""
+
+    @abstractmethod
+    def obtener_por_ids(self, ids: Iterable[int]) -> List[Contacto]:
+        """Contactos activos con esos ids, ordenados por id."""
+
+    @abstractmethod
+    def buscar_por_telefono(self, telefono: str) -> List[Contacto]:
+        """Contactos cuyo teléfono es el mismo número que `telefono`, escrito de cualquier forma."""
+
+    @abstractmethod
+    def buscar_por_sufijo_telefono(self, digitos: str, limite: Optional[int] = None) -> List[Contacto]:
+        """Contactos cuyo teléfono termina en `digitos`, ordenados por id."""
+
+    def consultar(self, consulta: Consulta) -> List[Contacto]:
+        """Contactos que cumplen `consulta` (ver repository/consulta.py)."""
+        return a_contactos(consulta, self.filas(consulta))
+
+    def obtener_todos(self, internador: Optional[Internador] = None):
+        """
+        Obtiene todos los contactos de la base de datos, ordenados por id. Los
+        nombres, apellidos y demás valores repetidos se comparten entre los
+        contactos (un Internador nuevo si no se pasa uno).
+        """
+        consulta = Consulta()
+        return a_contactos(consulta, self.filas(consulta), internador or Internador())
+
+    def iterar(
+        self,
+        consulta: Optional[Consulta] = None,
+        lote: int = LOTE_LECTURA,
+        internador: Optional[Internador] = None,
+    ) -> Iterator[Contacto]:
+        """
+        Los contactos de `consulta` (por defecto todos, por id) de a uno, leídos
+        en páginas de `lote` por clave (orden, id): nunca hay más de una página
+        en memoria ni una transacción de lectura abierta entre páginas. La
+        consulta no lleva límite y tiene que seleccionar su campo de orden.
+        """
+        consulta = consulta or Consulta()
+        if consulta.limite is not None or consulta.desplazamiento:
+            raise ValueError("iterar pagina por su cuenta: la consulta no lleva límite")
+        if consulta.orden not in consulta.columnas or "id" not in consulta.columnas:
+            raise ValueError("iterar necesita el campo de orden y el id entre las columnas")
+        internador = internador or Internador()
+        orden = consulta.columnas.index(consulta.orden)
+        ident = consulta.columnas.index("id")
+        clave = consulta.despues_de
+        while True:
+            filas = self.filas(consulta.despues(clave).limitar(lote))
+            yield from a_contactos(consulta, filas, internador)
+            if len(filas) < lote:
+                return
+            clave = (filas[-1][orden], filas[-1][ident])
+
+    def buscar(self, texto: str, limite: Optional[int] = None) -> List[Contacto]:
+        """Contactos cuyo nombre, apellido, teléfono o email contienen `texto`, por id."""
+        return self.consultar(Consulta().buscar(texto).limitar(limite))
+
+    def listar_pagina(
+        self,
+        orden: str = "id",
+        descendente: bool = False,
+        limite: int = 200,
+        despues_de: Optional[Tuple[Any, int]] = None,
+        antes_de: Optional[Tuple[Any, int]] = None,
+        etiquetas: Tuple[ClausulaEtiquetas, ...] = (),
+        solo_invalidos: bool = False,
+    ) -> List[Contacto]:
+        """
+        Página de contactos ordenada por `orden` (desempate por id) usando
+        paginación por clave: `despues_de`/`antes_de` son la clave_orden del
+        último/primer contacto ya mostrado. El ORDER BY y el filtro se resuelven
+        sobre el índice (orden, id), así que el costo no depende de la posición.
+        `etiquetas` restringe la página a los contactos que cumplen esas
+        cláusulas (ver parsear_etiquetas) y `solo_invalidos` a los que la
+        última auditoría de calidad marcó inválidos.
+        """
+        if orden not in self.ordenables:
+            raise ValueError(f"No se puede ordenar por {orden!r}")
+
+        hacia_atras = antes_de is not None
+        # Hacia atrás se recorre el índice en sentido inverso y luego se da vuelta
+        consulta = (
+            Consulta()
+            .ordenar_por(orden, descendente != hacia_atras)
+            .despues(antes_de if hacia_atras else despues_de)
+            .con_clausulas(etiquetas)
+            .solo_invalidos(solo_invalidos)
+            .limitar(limite)
+        )
+        contactos = self.consultar(consulta)
+        if hacia_atras:
+            contactos.reverse()
+        return contactos
+
+    def buscar_por_dominio(self, dominio: str, limite: Optional[int] = None) -> List[Contacto]:
+        """
+        Contactos con email en `dominio` ("acme.com" o "@acme.com"), por id.
+        Recorre solo el tramo del dominio en el índice (email_dominio, id).
+        """
+        dominio = dominio_email("@" + dominio.strip().lstrip("@"))
+        return self.consultar(Consulta().donde(email_dominio=dominio).limitar(limite))
+
+    def modificados_desde(
+        self, desde: Union[str, datetime], limite: Optional[int] = None
+    ) -> List[Modificado]:
+        """
+        Contactos dados de alta, modificados, dados de baja o restaurados desde
+        `desde` (inclusive), en orden de modificación, sobre el índice
+        (modificado, id). Para consultar de nuevo, pasar el último `modificado`
+        recibido: las filas de ese mismo momento se repiten. Los borrados
+        físicos no aparecen (para eso está el registro de cambios).
+        """
+        return a_modificados(self.filas(consulta_modificados(desde, limite)))
+
+    def obtener_por_id(self, contacto_id: int):
+        """Obtiene un contacto por su ID. Retorna None si no existe."""
+        contactos = self.consultar(Consulta().donde(id=contacto_id))
+        return contactos[0] if contactos else None
+
+    def obtener_bajas(self) -> List[Contacto]:
+        """Contactos dados de baja (lógica) pendientes de purga, más recientes primero."""
+        return self.consultar(Consulta().con_estado("bajas").ordenar_por("baja", descendente=True))
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def agregar(self, contacto: Contacto):
+        """Agrega un nuevo contacto y devuelve el ID."""
+
+    @abstractmethod
+    def agregar_lote(self, contactos: Iterable[Contacto]) -> int:
+        """Agrega varios contactos de una vez. Retorna cuántos se agregaron."""
+
+    @abstractmethod
+    def actualizar(self, contacto: Contacto):
+        """Actualiza los campos no vacíos que cambiaron; False si no había nada que cambiar."""
+
+    @abstractmethod
+    def eliminar(self, contacto: Contacto):
+        """Elimina un contacto existente (baja lógica si está habilitada)."""
+
+    @abstractmethod
+    def eliminar_lote(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        """Da de baja (o borra, sin baja lógica) varios contactos. Retorna cuántos."""
+
+    @abstractmethod
+    def actualizar_lote(
+        self, ids: Iterable[int], campos: Dict[str, str], progreso: Optional[Progreso] = None
+    ) -> int:
+        """Asigna los mismos valores (p. ej. {"apellido": "Pérez"}) a varios contactos."""
+
+    @abstractmethod
+    def cambiar_dominio_email(
+        self, ids: Iterable[int], dominio: str, progreso: Optional[Progreso] = None
+    ) -> int:
+        """Reemplaza el dominio del email (lo que sigue a '@') de varios contactos."""
+
+    @abstractmethod
+    def restablecer(self, contactos: Iterable[Contacto]) -> int:
+        """Deja cada contacto exactamente como se indica (upsert por id, activo)."""
+
+    @abstractmethod
+    def restaurar(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        """Reactiva los contactos dados de baja. Retorna cuántos."""
+
+    # ------------------------------------------------------------------
+    # Etiquetas
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def etiquetas(self) -> List[Tuple[str, int]]:
+        """Etiquetas existentes y cuántos contactos tiene cada una (bajas incluidas), por nombre."""
+
+    @abstractmethod
+    def etiquetas_de(self, contacto_id: int) -> List[str]:
+        """Etiquetas de un contacto, por nombre."""
+
+    @abstractmethod
+    def etiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        """Agrega las etiquetas a los contactos activos. Retorna cuántas asignaciones nuevas hubo."""
+
+    @abstractmethod
+    def desetiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        """Quita las etiquetas a esos contactos. Retorna cuántas asignaciones se quitaron."""
+
+    @abstractmethod
+    def eliminar_etiqueta(self, nombre: str) -> int:
+        """Borra la etiqueta y sus asignaciones. Retorna a cuántos contactos se les quitó."""
+
+    def buscar_por_etiquetas(
+        self,
+        todas: Iterable[str] = (),
+        alguna: Iterable[str] = (),
+        ninguna: Iterable[str] = (),
+        limite: Optional[int] = None,
+    ) -> List[Contacto]:
+        """
+        Contactos activos con todas las etiquetas de `todas`, alguna de
+        `alguna` y ninguna de `ninguna`, por id (ver ClausulaEtiquetas).
+        """
+        consulta = Consulta().con_etiquetas(todas, alguna, ninguna)
+        return self.consultar(consulta.limitar(limite))
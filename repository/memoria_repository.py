@@ -0,0 +1,488 @@
+# repository/memoria_repository.py
+"""
+Motor de contactos en la memoria del proceso, sin SQLite.
+
+Pensado para pruebas y procesos efímeros (workers, scripts que arman datos
+para descartarlos): no hay archivo, conexiones, transacciones ni registro de
+cambios, así que cada operación cuesta lo que cuesta en Python. Responde como
+ContactoRepository a las mismas consultas (services/conformidad_services.py
+lo comprueba):
+
+- Las filas son dicts con todas las columnas de la tabla (CAMPOS), incluidas
+  las derivadas del teléfono y del email y las marcas de tiempo, así que las
+  Consulta con filtros sobre ellas funcionan igual.
+- Índices ordenados (valor, id) sobre id, apellido y email, mantenidos con
+  bisect: ordenar por ellos recorre el índice desde la clave (keyset) y corta
+  al completar la página. Los demás órdenes ordenan los candidatos.
+- Mismas reglas que SQLite para comparar: NULL primero, números antes que
+  texto, texto por código de carácter (BINARY), LIKE y los nombres de
+  etiqueta sin distinguir mayúsculas solo en ASCII.
+
+Diferencias: no cifra (no hay nada en reposo que proteger) y
+`solo_invalidos` valida los contactos en el momento en lugar de leer la tabla
+de la última auditoría. Estadísticas y auditoría de calidad lo consultan
+por la interfaz (no tiene `rutas`); los que solo leen archivos (reportes,
+snapshot, respaldos) no ven este motor.
+"""
+import bisect
+import itertools
+import string
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config.settings import BAJA_LOGICA
+from models.contacto import Contacto, dominio_email
+from models.telefono import claves_telefono, normalizar_telefono, sufijo_invertido
+from repository.consulta import CAMPOS, CAMPOS_CONTACTO, Consulta, Filtro, normalizar_etiqueta
+from repository.interfaz import EDITABLES, Progreso, RepositorioContactos, marca_tiempo
+
+__all__ = ["ContactoRepositoryMemoria"]
+
+# Columnas con índice ordenado (valor, id), además del id
+INDEXADAS = ("apellido", "email")
+
+# Ids por llamada al callback de progreso de las operaciones en lote
+LOTE_PROGRESO = 500
+
+Fila = Dict[str, Any]
+
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _sin_mayusculas(valor: Any) -> str:
+    """Como compara LIKE (y COLLATE NOCASE): A-Z = a-z, el resto tal cual."""
+    return str(valor).translate(_MINUSCULAS_ASCII)
+
+
+def _sqlite(valor: Any) -> Tuple[int, Any]:
+    """Clave de comparación con el orden de tipos de SQLite: NULL < números < texto < blobs."""
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    if isinstance(valor, str):
+        return (2, valor)
+    return (3, valor)
+
+
+def _ahora() -> str:
+    return marca_tiempo(datetime.now(timezone.utc))
+
+
+def _comparar(comparacion: Callable[[Tuple, Tuple], bool]) -> Callable[[Any, Any], bool]:
+    return lambda v, valor: comparacion(_sqlite(v), _sqlite(valor))
+
+
+# Operador -> predicado (valor de la fila, valor del filtro); NULL no cumple ninguno
+# salvo "nulo" (ver OPERADORES en repository/consulta.py)
+_PREDICADOS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": _comparar(lambda a, b: a == b),
+    "!=": _comparar(lambda a, b: a != b),
+    "<": _comparar(lambda a, b: a < b),
+    "<=": _comparar(lambda a, b: a <= b),
+    ">": _comparar(lambda a, b: a > b),
+    ">=": _comparar(lambda a, b: a >= b),
+    "contiene": lambda v, valor: _sin_mayusculas(valor) in _sin_mayusculas(v),
+    "empieza": lambda v, valor: _sin_mayusculas(v).startswith(_sin_mayusculas(valor)),
+    "rango": lambda v, valor: _sqlite(valor[0]) <= _sqlite(v) < _sqlite(valor[1]),
+    "en": lambda v, valor: any(_sqlite(v) == _sqlite(x) for x in valor),
+}
+
+
+def _cumple_filtro(fila: Fila, filtro: Filtro) -> bool:
+    valor = fila[filtro.campo]
+    if filtro.operador == "nulo":
+        return valor is None
+    if filtro.operador == "no_nulo":
+        return valor is not None
+    return valor is not None and _PREDICADOS[filtro.operador](valor, filtro.valor)
+
+
+def _clave(orden: str) -> Callable[[Fila], Tuple]:
+    """Clave (valor, id) de una fila para ORDER BY `orden`, id."""
+    return lambda fila: (_sqlite(fila[orden]), fila["id"])
+
+
+class ContactoRepositoryMemoria(RepositorioContactos):
+    """
+    RepositorioContactos en memoria; ver el docstring del módulo. Se puede
+    usar desde varios hilos (un lock para todo). `contactos` carga datos
+    iniciales, como si se hubieran agregado en ese orden.
+    """
+
+    rutas: Tuple[str, ...] = ()  # sin archivos (ver interfaz.rutas_de)
+
+    def __init__(
+        self, contactos: Iterable[Contacto] = (), baja_logica: Optional[bool] = None
+    ):
+        self.baja_logica = BAJA_LOGICA if baja_logica is None else baja_logica
+        self._filas: Dict[int, Fila] = {}
+        self._ids: List[int] = []  # índice por id, ordenado
+        self._indices: Dict[str, List[Tuple[Any, int]]] = {c: [] for c in INDEXADAS}
+        self._etiquetas: Dict[str, Tuple[str, Set[int]]] = {}  # nombre sin mayúsculas -> (nombre, ids)
+        self._ultimo_id = 0  # como AUTOINCREMENT: los ids no se reusan
+        self._lock = threading.RLock()
+        self.agregar_lote(contactos)
+
+    # ------------------------------------------------------------------
+    # Filas e índices
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _a_guardar(campos: Dict[str, Any]) -> Dict[str, Any]:
+        """`campos` (de EDITABLES) más las columnas derivadas, como ContactoRepository sin cifrado."""
+        guardar = dict(campos)
+        if "telefono" in campos:
+            guardar["telefono_canonico"], guardar["telefono_invertido"] = claves_telefono(
+                campos["telefono"]
+            )
+        if "email" in campos:
+            guardar["email_dominio"] = dominio_email(campos["email"])
+        return guardar
+
+    def _indexar(self, fila: Fila) -> None:
+        bisect.insort(self._ids, fila["id"])
+        for campo, indice in self._indices.items():
+            bisect.insort(indice, (fila[campo], fila["id"]))
+
+    def _desindexar(self, fila: Fila, campos: Iterable[str] = ("id",) + INDEXADAS) -> None:
+        for campo in campos:
+            if campo == "id":
+                del self._ids[bisect.bisect_left(self._ids, fila["id"])]
+            else:
+                indice = self._indices[campo]
+                del indice[bisect.bisect_left(indice, (fila[campo], fila["id"]))]
+
+    def _insertar(self, contacto: Contacto) -> int:
+        contacto_id = contacto.id
+        if contacto_id is None:
+            contacto_id = self._ultimo_id + 1
+        elif contacto_id in self._filas:
+            raise ValueError(f"Ya existe un contacto con id {contacto_id}")
+        self._ultimo_id = max(self._ultimo_id, contacto_id)
+        ahora = _ahora()
+        fila: Fila = dict.fromkeys(CAMPOS)
+        fila.update(self._a_guardar(dict(zip(EDITABLES, contacto.to_tuple()))))
+        fila.update(id=contacto_id, creado=ahora, modificado=ahora)
+        self._filas[contacto_id] = fila
+        self._indexar(fila)
+        return contacto_id
+
+    def _modificar(self, fila: Fila, cambios: Dict[str, Any]) -> None:
+        """Aplica `cambios` (ya con las derivadas) a una fila, manteniendo los índices."""
+        tocadas = [c for c in INDEXADAS if c in cambios and cambios[c] != fila[c]]
+        for campo in tocadas:
+            self._desindexar(fila, (campo,))
+        fila.update(cambios, modificado=_ahora())
+        for campo in tocadas:
+            bisect.insort(self._indices[campo], (fila[campo], fila["id"]))
+
+    def _borrar(self, fila: Fila) -> None:
+        self._desindexar(fila)
+        del self._filas[fila["id"]]
+        for _, ids in self._etiquetas.values():
+            ids.discard(fila["id"])
+
+    def _activas(self, ids: Iterable[int]) -> List[Fila]:
+        filas = (self._filas.get(i) for i in dict.fromkeys(ids))
+        return [f for f in filas if f is not None and f["baja"] is None]
+
+    def _en_lotes(
+        self, ids: Iterable[int], aplicar: Callable[[List[int]], int], progreso: Optional[Progreso]
+    ) -> int:
+        ids = list(ids)
+        afectadas = 0
+        with self._lock:
+            for i in range(0, len(ids), LOTE_PROGRESO):
+                afectadas += aplicar(ids[i : i + LOTE_PROGRESO])
+                if progreso:
+                    progreso(min(i + LOTE_PROGRESO, len(ids)), len(ids))
+        return afectadas
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _recorrido(self, consulta: Consulta) -> Iterator[Fila]:
+        """
+        Filas candidatas en el orden pedido: las de un filtro por id, el índice
+        de la columna de orden desde la clave del keyset o, sin índice, todas
+        ordenadas.
+        """
+        orden, descendente, clave = consulta.orden, consulta.descendente, consulta.despues_de
+        for filtro in consulta.filtros:
+            if filtro.campo == "id" and filtro.operador in ("=", "en"):
+                ids = (filtro.valor,) if filtro.operador == "=" else filtro.valor
+                filas = [self._filas[i] for i in set(ids) if i in self._filas]
+                return iter(sorted(filas, key=_clave(orden), reverse=descendente))
+
+        if clave is not None and (clave[1] is None if orden == "id" else clave[0] is None):
+            return iter(())  # id > NULL, (apellido, id) > (NULL, ?): no son verdaderos en SQL
+        if clave is not None and clave[1] is None:
+            clave = None  # (apellido, id) > (?, NULL): lo resuelve _cumple sobre todo el índice
+        if orden == "id":
+            indice: List[Any] = self._ids
+            referencia = None if clave is None else clave[1]
+        elif orden in self._indices:
+            indice = self._indices[orden]
+            referencia = None if clave is None else (clave[0], clave[1])
+        else:
+            return iter(sorted(self._filas.values(), key=_clave(orden), reverse=descendente))
+
+        if descendente:
+            hasta = len(indice) if clave is None else bisect.bisect_left(indice, referencia)
+            posiciones = range(hasta - 1, -1, -1)
+        else:
+            desde = 0 if clave is None else bisect.bisect_right(indice, referencia)
+            posiciones = range(desde, len(indice))
+        if orden == "id":
+            return (self._filas[indice[i]] for i in posiciones)
+        return (self._filas[indice[i][1]] for i in posiciones)
+
+    def _tiene_etiquetas(self, contacto_id: int, nombres: Iterable[str]) -> bool:
+        for nombre in nombres:
+            etiqueta = self._etiquetas.get(_sin_mayusculas(nombre))
+            if etiqueta and contacto_id in etiqueta[1]:
+                return True
+        return False
+
+    def _cumple(self, fila: Fila, consulta: Consulta) -> bool:
+        if consulta.estado == "activos" and fila["baja"] is not None:
+            return False
+        if consulta.estado == "bajas" and fila["baja"] is None:
+            return False
+        if not all(_cumple_filtro(fila, filtro) for filtro in consulta.filtros):
+            return False
+        for clausula in consulta.etiquetas:
+            if self._tiene_etiquetas(fila["id"], clausula.nombres) == clausula.negada:
+                return False
+        if consulta.texto is not None:
+            texto = _sin_mayusculas(consulta.texto)
+            if not any(
+                fila[c] is not None and texto in _sin_mayusculas(fila[c])
+                for c in consulta.campos_texto
+            ):
+                return False
+        if consulta.despues_de is not None:
+            valor, contacto_id = consulta.despues_de
+            if consulta.orden == "id":
+                actual, referencia = fila["id"], contacto_id
+            elif fila[consulta.orden] is None or valor is None:
+                return False  # (NULL, id) > (?, ?) no es verdadero en SQL
+            elif _sqlite(fila[consulta.orden]) != _sqlite(valor):
+                actual, referencia = _sqlite(fila[consulta.orden]), _sqlite(valor)
+            else:
+                actual, referencia = fila["id"], contacto_id
+            if referencia is None:
+                return False
+            if not (actual < referencia if consulta.descendente else actual > referencia):
+                return False
+        if consulta.invalidos:
+            contacto = Contacto.from_row(tuple(fila[c] for c in CAMPOS_CONTACTO))
+            if not contacto.revisar_calidad():
+                return False
+        return True
+
+    def filas(self, consulta: Consulta) -> List[tuple]:
+        """Filas (tuplas con las columnas seleccionadas) que cumplen `consulta`."""
+        hasta = None if consulta.limite is None else consulta.desplazamiento + consulta.limite
+        with self._lock:
+            coinciden = (f for f in self._recorrido(consulta) if self._cumple(f, consulta))
+            return [
+                tuple(fila[c] for c in consulta.columnas)
+                for fila in itertools.islice(coinciden, consulta.desplazamiento, hasta)
+            ]
+
+    def obtener_por_ids(self, ids: Iterable[int]) -> List[Contacto]:
+        """Contactos activos con esos ids, ordenados por id."""
+        with self._lock:
+            filas = sorted(self._activas(ids), key=lambda f: f["id"])
+            return [Contacto.from_row(tuple(f[c] for c in CAMPOS_CONTACTO)) for f in filas]
+
+    def buscar_por_telefono(self, telefono: str) -> List[Contacto]:
+        """Contactos con el mismo teléfono canónico que `telefono` (ver normalizar_telefono)."""
+        canonico = normalizar_telefono(telefono)
+        if not canonico:
+            return []
+        return self.consultar(Consulta().donde(telefono_canonico=canonico))
+
+    def buscar_por_sufijo_telefono(self, digitos: str, limite: Optional[int] = None) -> List[Contacto]:
+        """Contactos cuyo teléfono termina en `digitos`, por id (rango sobre telefono_invertido)."""
+        sufijo = sufijo_invertido(digitos)
+        if not sufijo:
+            return []
+        consulta = Consulta().filtrar("telefono_invertido", "rango", (sufijo, sufijo + ":"))
+        return self.consultar(consulta.limitar(limite))
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+    def agregar(self, contacto: Contacto):
+        """Agrega un nuevo contacto (con su id, si lo trae) y devuelve el ID."""
+        with self._lock:
+            return self._insertar(contacto)
+
+    def agregar_lote(self, contactos: Iterable[Contacto]) -> int:
+        n = 0
+        with self._lock:
+            for c in contactos:
+                self._insertar(c)
+                n += 1
+        return n
+
+    def actualizar(self, contacto: Contacto):
+        """Actualiza los campos no vacíos que cambiaron (como ContactoRepository.actualizar)."""
+        if contacto.id is None:
+            raise ValueError("El id del contacto es obligatorio para actualizar")
+        with self._lock:
+            fila = self._filas.get(contacto.id)
+            if fila is None or fila["baja"] is not None:
+                return False
+            cambios = {
+                campo: getattr(contacto, campo)
+                for campo in EDITABLES
+                if getattr(contacto, campo) not in (None, "") and getattr(contacto, campo) != fila[campo]
+            }
+            if not cambios:
+                return False
+            self._modificar(fila, self._a_guardar(cambios))
+            return True
+
+    def eliminar(self, contacto: Contacto):
+        """Elimina un contacto existente (baja lógica si está habilitada)"""
+        if contacto.id is None:
+            raise ValueError("El id del contacto es obligatorio para eliminar")
+        return self.eliminar_lote([contacto.id]) > 0
+
+    def eliminar_lote(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        def aplicar(lote: List[int]) -> int:
+            if self.baja_logica:
+                filas = self._activas(lote)
+                ahora = _ahora()
+                for fila in filas:
+                    fila.update(baja=ahora, modificado=ahora)
+            else:
+                filas = [self._filas[i] for i in dict.fromkeys(lote) if i in self._filas]
+                for fila in filas:
+                    self._borrar(fila)
+            return len(filas)
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    def actualizar_lote(
+        self, ids: Iterable[int], campos: Dict[str, str], progreso: Optional[Progreso] = None
+    ) -> int:
+        invalidos = set(campos) - set(EDITABLES)
+        if invalidos:
+            raise ValueError(f"Campos no editables en lote: {', '.join(sorted(invalidos))}")
+        if not campos:
+            return 0
+        guardar = self._a_guardar(campos)
+
+        def aplicar(lote: List[int]) -> int:
+            filas = self._activas(lote)
+            for fila in filas:
+                self._modificar(fila, guardar)
+            return len(filas)
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    def cambiar_dominio_email(
+        self, ids: Iterable[int], dominio: str, progreso: Optional[Progreso] = None
+    ) -> int:
+        dominio = dominio.strip().lstrip("@").lower()
+        if not dominio or "@" in dominio or "." not in dominio:
+            raise ValueError(f"Dominio de email inválido: {dominio!r}")
+
+        def aplicar(lote: List[int]) -> int:
+            filas = [f for f in self._activas(lote) if "@" in f["email"]]
+            for fila in filas:
+                email = fila["email"][: fila["email"].index("@") + 1] + dominio
+                self._modificar(fila, {"email": email, "email_dominio": dominio})
+            return len(filas)
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    def restablecer(self, contactos: Iterable[Contacto]) -> int:
+        """Deja cada contacto exactamente como se indica (upsert por id, activo)."""
+        n = 0
+        with self._lock:
+            for c in contactos:
+                fila = self._filas.get(c.id) if c.id is not None else None
+                if fila is None:
+                    self._insertar(c)
+                else:
+                    cambios = self._a_guardar(dict(zip(EDITABLES, c.to_tuple())))
+                    self._modificar(fila, dict(cambios, baja=None))
+                n += 1
+        return n
+
+    def restaurar(self, ids: Iterable[int], progreso: Optional[Progreso] = None) -> int:
+        def aplicar(lote: List[int]) -> int:
+            filas = [self._filas[i] for i in dict.fromkeys(lote) if i in self._filas]
+            filas = [f for f in filas if f["baja"] is not None]
+            for fila in filas:
+                fila.update(baja=None, modificado=_ahora())
+            return len(filas)
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    # ------------------------------------------------------------------
+    # Etiquetas
+    # ------------------------------------------------------------------
+    def etiquetas(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [(nombre, len(ids)) for _, (nombre, ids) in sorted(self._etiquetas.items())]
+
+    def etiquetas_de(self, contacto_id: int) -> List[str]:
+        with self._lock:
+            return [
+                nombre for _, (nombre, ids) in sorted(self._etiquetas.items()) if contacto_id in ids
+            ]
+
+    def etiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        nombres = tuple(dict.fromkeys(normalizar_etiqueta(n) for n in nombres))
+        if not nombres:
+            return 0
+        with self._lock:
+            # Como INSERT OR IGNORE: una etiqueta existente conserva cómo se escribió
+            asignadas = [
+                self._etiquetas.setdefault(_sin_mayusculas(n), (n, set()))[1] for n in nombres
+            ]
+
+        def aplicar(lote: List[int]) -> int:
+            nuevas = 0
+            for fila in self._activas(lote):
+                for ids in asignadas:
+                    if fila["id"] not in ids:
+                        ids.add(fila["id"])
+                        nuevas += 1
+            return nuevas
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    def desetiquetar(
+        self, ids: Iterable[int], nombres: Iterable[str], progreso: Optional[Progreso] = None
+    ) -> int:
+        nombres = tuple(dict.fromkeys(normalizar_etiqueta(n) for n in nombres))
+        if not nombres:
+            return 0
+
+        def aplicar(lote: List[int]) -> int:
+            quitadas = 0
+            for nombre in nombres:
+                _, asignados = self._etiquetas.get(_sin_mayusculas(nombre), ("", set()))
+                for contacto_id in dict.fromkeys(lote):
+                    if contacto_id in asignados:
+                        asignados.discard(contacto_id)
+                        quitadas += 1
+            return quitadas
+
+        return self._en_lotes(ids, aplicar, progreso)
+
+    def eliminar_etiqueta(self, nombre: str) -> int:
+        nombre = normalizar_etiqueta(nombre)
+        with self._lock:
+            etiqueta = self._etiquetas.pop(_sin_mayusculas(nombre), None)
+            return len(etiqueta[1]) if etiqueta else 0
@@ -0,0 +1,415 @@
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import SHARD_CANTIDAD, SHARD_DIR
+from database.conexion import obtener_conexion, cerrar_conexion, transaccion
+from models.contacto import Contacto
+from repository.diccionario import Internador
+from repository.consulta import Consulta, a_contactos, clave_fila
+from repository.contacto_repository import (
+    LOTE_IDS,
+    LOTE_LECTURA,
+    ContactoRepository,
+    a_modificados,
+    clave_orden,
+    consulta_modificados,
+)
+from repository.interfaz import RepositorioContactos
+from services.db_services import init_schema
+
+# Cantidad de ids que cada proceso reserva de una vez en el directorio
+ID_BLOQUE = 100
+
+
+def rutas_shards(cantidad: int = SHARD_CANTIDAD, directorio: str = SHARD_DIR) -> List[str]:
+    """Rutas de los archivos de cada shard (contactos_0.db ... contactos_{N-1}.db)."""
+    return [f"{directorio}/contactos_{k}.db" for k in range(cantidad)]
+
+
+def ruta_directorio(directorio: str = SHARD_DIR) -> str:
+    """Base chica con la secuencia global de ids."""
+    return f"{directorio}/directorio.db"
+
+
+def _init_directorio(ruta: str) -> None:
+    with transaccion(ruta) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS secuencia (nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO secuencia (nombre, valor) VALUES ('contactos', 0)")
+
+
+def _avanzar_secuencia(ruta: str, cantidad: int = 0, minimo: int = 0) -> int:
+    """
+    Reserva `cantidad` ids en la secuencia global (dejándola en al menos
+    `minimo`) y retorna el primer id reservado.
+    """
+    with transaccion(ruta) as conn:
+        (valor,) = conn.execute(
+            "SELECT valor FROM secuencia WHERE nombre = 'contactos'"
+        ).fetchone()
+        valor = max(valor, minimo)
+        conn.execute(
+            "UPDATE secuencia SET valor = ? WHERE nombre = 'contactos'",
+            (valor + cantidad,),
+        )
+    return valor + 1
+
+
+class ContactoRepositoryParticionado(RepositorioContactos):
+    """
+    Repositorio con la misma interfaz que ContactoRepository, pero repartido
+    en N archivos SQLite (shards) para que los escritores no compitan por un
+    único lock de archivo.
+
+    - Los ids los asigna una secuencia global (directorio.db), reservada en
+      bloques de ID_BLOQUE por proceso; el shard de un contacto es id % N.
+    - obtener_por_id/actualizar/eliminar van directo al shard del id.
+    - obtener_todos/buscar consultan todos los shards en paralelo y combinan
+      los resultados ordenados por id (heapq.merge).
+    """
+
+    def __init__(
+        self,
+        rutas: Optional[List[str]] = None,
+        directorio: Optional[str] = None,
+        baja_logica: Optional[bool] = None,
+    ):
+        rutas = rutas or rutas_shards()
+        if not rutas:
+            raise ValueError("Se necesita al menos un shard (ver SHARD_CANTIDAD)")
+        self.rutas = list(rutas)
+        self.directorio = directorio or ruta_directorio(os.path.dirname(self.rutas[0]) or ".")
+
+        for ruta in self.rutas + [self.directorio]:
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        for ruta in self.rutas:
+            init_schema(db_path=ruta)
+        _init_directorio(self.directorio)
+
+        self.shards = [ContactoRepository(ruta, baja_logica) for ruta in self.rutas]
+        self.baja_logica = self.shards[0].baja_logica
+        self.ordenables = self.shards[0].ordenables
+        self._pool = ThreadPoolExecutor(
+            max_workers=len(self.shards), thread_name_prefix="shard"
+        )
+        self._lock_ids = threading.Lock()
+        self._proximo_id = 0
+        self._fin_bloque = 0
+
+    # ------------------------------------------------------------------
+    # Ruteo
+    # ------------------------------------------------------------------
+    def _shard(self, contacto_id: int) -> ContactoRepository:
+        return self.shards[contacto_id % len(self.shards)]
+
+    def _nuevo_id(self) -> int:
+        with self._lock_ids:
+            if self._proximo_id >= self._fin_bloque:
+                self._proximo_id = _avanzar_secuencia(self.directorio, ID_BLOQUE)
+                self._fin_bloque = self._proximo_id + ID_BLOQUE
+            contacto_id = self._proximo_id
+            self._proximo_id += 1
+            return contacto_id
+
+    def _en_todos(self, metodo: str, *args) -> List[list]:
+        """Ejecuta el método en todos los shards en paralelo."""
+        futuros = [
+            self._pool.submit(getattr(shard, metodo), *args) for shard in self.shards
+        ]
+        return [f.result() for f in futuros]
+
+    def _por_shard(self, ids: Iterable[int]) -> Dict[int, List[int]]:
+        grupos: Dict[int, List[int]] = {}
+        for contacto_id in ids:
+            grupos.setdefault(contacto_id % len(self.shards), []).append(contacto_id)
+        return grupos
+
+    # ------------------------------------------------------------------
+    # Interfaz de ContactoRepository
+    # ------------------------------------------------------------------
+    def agregar(self, contacto: Contacto):
+        """Agrega un nuevo contacto en su shard y devuelve el ID."""
+        nuevo = replace(contacto, id=self._nuevo_id())
+        self._shard(nuevo.id).agregar(nuevo)
+        return nuevo.id
+
+    def agregar_lote(self, contactos: Iterable[Contacto]) -> int:
+        """Agrega varios contactos con ids nuevos, una transacción por shard."""
+        grupos: Dict[int, List[Contacto]] = {}
+        for c in contactos:
+            nuevo = replace(c, id=self._nuevo_id())
+            grupos.setdefault(nuevo.id % len(self.shards), []).append(nuevo)
+        return sum(self.shards[k].agregar_lote(lote) for k, lote in grupos.items())
+
+    def obtener_todos(self, internador: Optional[Internador] = None):
+        """Obtiene todos los contactos de todos los shards, ordenados por id."""
+        internador = internador or Internador()  # uno para todos los shards
+        return list(heapq.merge(*self._en_todos("obtener_todos", internador), key=lambda c: c.id))
+
+    def iterar(
+        self,
+        consulta: Optional[Consulta] = None,
+        lote: int = LOTE_LECTURA,
+        internador: Optional[Internador] = None,
+    ) -> Iterator[Contacto]:
+        """Streaming de cada shard (ver ContactoRepository.iterar), combinado por (orden, id)."""
+        consulta = consulta or Consulta()
+        internador = internador or Internador()
+        return heapq.merge(
+            *(shard.iterar(consulta, lote, internador) for shard in self.shards),
+            key=lambda c: clave_orden(c, consulta.orden),
+            reverse=consulta.descendente,
+        )
+
+    def buscar(self, texto: str, limite: Optional[int] = None) -> List[Contacto]:
+        """Busca en todos los shards en paralelo y combina por id."""
+        combinados = heapq.merge(*self._en_todos("buscar", texto, limite), key=lambda c: c.id)
+        return list(combinados)[:limite] if limite is not None else list(combinados)
+
+    def listar_pagina(
+        self,
+        orden: str = "id",
+        descendente: bool = False,
+        limite: int = 200,
+        despues_de=None,
+        antes_de=None,
+        etiquetas=(),
+        solo_invalidos: bool = False,
+    ) -> List[Contacto]:
+        """Pide la misma página a cada shard y combina por (orden, id)."""
+        parciales = self._en_todos(
+            "listar_pagina", orden, descendente, limite, despues_de, antes_de, etiquetas, solo_invalidos
+        )
+        combinados = list(
+            heapq.merge(
+                *parciales, key=lambda c: clave_orden(c, orden), reverse=descendente
+            )
+        )
+        # Hacia atrás interesan los `limite` más cercanos a la clave (los últimos)
+        return combinados[-limite:] if antes_de is not None else combinados[:limite]
+
+    def buscar_por_telefono(self, telefono: str) -> List[Contacto]:
+        return list(
+            heapq.merge(*self._en_todos("buscar_por_telefono", telefono), key=lambda c: c.id)
+        )
+
+    def buscar_por_sufijo_telefono(self, digitos: str, limite: Optional[int] = None) -> List[Contacto]:
+        combinados = heapq.merge(
+            *self._en_todos("buscar_por_sufijo_telefono", digitos, limite), key=lambda c: c.id
+        )
+        return list(combinados)[:limite] if limite is not None else list(combinados)
+
+    def buscar_por_dominio(self, dominio: str, limite: Optional[int] = None) -> List[Contacto]:
+        combinados = heapq.merge(
+            *self._en_todos("buscar_por_dominio", dominio, limite), key=lambda c: c.id
+        )
+        return list(combinados)[:limite] if limite is not None else list(combinados)
+
+    def modificados_desde(self, desde, limite: Optional[int] = None):
+        return a_modificados(self.filas(consulta_modificados(desde, limite)))
+
+    def obtener_por_id(self, contacto_id: int):
+        return self._shard(contacto_id).obtener_por_id(contacto_id)
+
+    def actualizar(self, contacto: Contacto):
+        if contacto.id is None:
+            raise ValueError("El id del contacto es obligatorio para actualizar")
+        return self._shard(contacto.id).actualizar(contacto)
+
+    def eliminar(self, contacto: Contacto):
+        if contacto.id is None:
+            raise ValueError("El id del contacto es obligatorio para eliminar")
+        return self._shard(contacto.id).eliminar(contacto)
+
+    def filas(self, consulta: Consulta) -> List[tuple]:
+        """
+        La misma consulta en todos los shards, combinada por (orden, id). Cada
+        shard devuelve hasta limite + desplazamiento filas y el desplazamiento
+        se aplica al combinar. Si la proyección no trae el campo de orden o el
+        id se piden igual y se recortan al final.
+        """
+        faltantes = [c for c in dict.fromkeys((consulta.orden, "id")) if c not in consulta.columnas]
+        pedido = consulta.seleccionar(*consulta.columnas, *faltantes)
+        tope = None if consulta.limite is None else consulta.desplazamiento + consulta.limite
+        pedido = pedido.limitar(tope)
+        combinados = heapq.merge(
+            *self._en_todos("filas", pedido),
+            key=lambda fila: clave_fila(pedido, fila),
+            reverse=consulta.descendente,
+        )
+        filas = itertools.islice(combinados, consulta.desplazamiento, tope)
+        if not faltantes:
+            return list(filas)
+        return [fila[: len(consulta.columnas)] for fila in filas]
+
+    def consultar(self, consulta: Consulta) -> List[Contacto]:
+        return a_contactos(consulta, self.filas(consulta))
+
+    def obtener_bajas(self) -> List[Contacto]:
+        return self.consultar(Consulta().con_estado("bajas").ordenar_por("baja", descendente=True))
+
+    def _lote_por_shard(self, metodo: str, ids: Iterable[int], *args, progreso=None) -> int:
+        """
+        Aplica una operación en lote shard por shard (una transacción por
+        shard). Se ejecuta en el hilo llamador para que el callback de
+        progreso pueda tocar la GUI.
+        """
+        grupos = self._por_shard(ids)
+        total = sum(len(lote) for lote in grupos.values())
+        hechos = 0
+        afectadas = 0
+        for k, lote in grupos.items():
+            parcial = None
+            if progreso:
+                parcial = lambda n, _t, base=hechos: progreso(base + n, total)
+            afectadas += getattr(self.shards[k], metodo)(lote, *args, progreso=parcial)
+            hechos += len(lote)
+        return afectadas
+
+    def obtener_por_ids(self, ids: Iterable[int]) -> List[Contacto]:
+        grupos = self._por_shard(ids)
+        futuros = [
+            self._pool.submit(self.shards[k].obtener_por_ids, lote)
+            for k, lote in grupos.items()
+        ]
+        return list(heapq.merge(*(f.result() for f in futuros), key=lambda c: c.id))
+
+    def eliminar_lote(self, ids: Iterable[int], progreso=None) -> int:
+        return self._lote_por_shard("eliminar_lote", ids, progreso=progreso)
+
+    def actualizar_lote(self, ids: Iterable[int], campos, progreso=None) -> int:
+        return self._lote_por_shard("actualizar_lote", ids, campos, progreso=progreso)
+
+    def cambiar_dominio_email(self, ids: Iterable[int], dominio: str, progreso=None) -> int:
+        return self._lote_por_shard("cambiar_dominio_email", ids, dominio, progreso=progreso)
+
+    def restablecer(self, contactos: Iterable[Contacto]) -> int:
+        grupos: Dict[int, List[Contacto]] = {}
+        for c in contactos:
+            grupos.setdefault(c.id % len(self.shards), []).append(c)
+        return sum(self.shards[k].restablecer(lote) for k, lote in grupos.items())
+
+    def restaurar(self, ids: Iterable[int], progreso=None) -> int:
+        return self._lote_por_shard("restaurar", ids, progreso=progreso)
+
+    # Etiquetas: cada shard guarda las de sus contactos, así que una misma
+    # etiqueta puede tener ids distintos en cada uno (se opera por nombre)
+    def etiquetas(self) -> List[Tuple[str, int]]:
+        totales: Dict[str, Tuple[str, int]] = {}
+        for parcial in self._en_todos("etiquetas"):
+            for nombre, cantidad in parcial:
+                previo = totales.get(nombre.lower(), (nombre, 0))
+                totales[nombre.lower()] = (previo[0], previo[1] + cantidad)
+        return sorted(totales.values(), key=lambda t: t[0].lower())
+
+    def etiquetas_de(self, contacto_id: int) -> List[str]:
+        return self._shard(contacto_id).etiquetas_de(contacto_id)
+
+    def buscar_por_etiquetas(self, todas=(), alguna=(), ninguna=(), limite: Optional[int] = None):
+        return self.consultar(Consulta().con_etiquetas(todas, alguna, ninguna).limitar(limite))
+
+    def etiquetar(self, ids: Iterable[int], nombres, progreso=None) -> int:
+        # Una etiqueta que ya existe en algún shard se crea en los demás con el
+        # mismo nombre (mayúsculas incluidas), como en una sola base
+        existentes = {nombre.lower(): nombre for nombre, _ in self.etiquetas()}
+        nombres = tuple(existentes.get(n.strip().lower(), n) for n in nombres)
+        return self._lote_por_shard("etiquetar", ids, nombres, progreso=progreso)
+
+    def desetiquetar(self, ids: Iterable[int], nombres, progreso=None) -> int:
+        return self._lote_por_shard("desetiquetar", ids, tuple(nombres), progreso=progreso)
+
+    def eliminar_etiqueta(self, nombre: str) -> int:
+        return sum(self._en_todos("eliminar_etiqueta", nombre))
+
+
+def rebalancear(origen: List[str], destino: List[str], lote: int = 1000) -> int:
+    """
+    Redistribuye los contactos de los shards `origen` en los shards `destino`
+    según id % len(destino). Sirve también para migrar una base única:
+    rebalancear([DB_PATH], rutas_shards(4)).
+
+    Cada lote se copia al destino (INSERT OR REPLACE, con su estado de baja)
+    antes de borrarse del origen, así que si se interrumpe basta con volver a
+    ejecutarlo. Ajusta la secuencia global por encima del mayor id movido.
+    Retorna la cantidad de contactos movidos.
+    """
+    for ruta in destino:
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        init_schema(db_path=ruta)
+    directorio = ruta_directorio(os.path.dirname(destino[0]) or ".")
+    _init_directorio(directorio)
+    destino_norm = [os.path.abspath(r) for r in destino]
+
+    movidos = 0
+    max_id = 0
+    for ruta in origen:
+        init_schema(db_path=ruta)
+        propio = os.path.abspath(ruta)
+        conn = obtener_conexion(ruta)
+        try:
+            ultimo = 0
+            while True:
+                filas = conn.execute(
+                    "SELECT id, nombre, apellido, telefono, email, baja, "
+                    "telefono_canonico, telefono_invertido, email_dominio, creado, modificado, "
+                    "telefono_indice, email_indice FROM contactos "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo, lote),
+                ).fetchall()
+                if not filas:
+                    break
+                ultimo = filas[-1][0]
+                max_id = max(max_id, ultimo)
+
+                grupos: Dict[int, list] = {}
+                for fila in filas:
+                    k = fila[0] % len(destino)
+                    if destino_norm[k] != propio:
+                        grupos.setdefault(k, []).append(fila)
+
+                for k, filas_k in grupos.items():
+                    # Las etiquetas viajan por nombre (los ids de etiqueta son de cada shard)
+                    ids_k = [f[0] for f in filas_k]
+                    asignaciones = []
+                    for i in range(0, len(ids_k), LOTE_IDS):
+                        tramo = ids_k[i : i + LOTE_IDS]
+                        asignaciones += conn.execute(
+                            "SELECT e.contacto_id, t.nombre FROM contactos_etiquetas e "
+                            "JOIN etiquetas t ON t.id = e.etiqueta_id "
+                            f"WHERE e.contacto_id IN ({', '.join('?' * len(tramo))})",
+                            tramo,
+                        ).fetchall()
+                    with transaccion(destino[k]) as dest:
+                        dest.executemany(
+                            "INSERT OR REPLACE INTO contactos "
+                            "(id, nombre, apellido, telefono, email, baja, "
+                            "telefono_canonico, telefono_invertido, email_dominio, creado, modificado, "
+                            "telefono_indice, email_indice) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            filas_k,
+                        )
+                        dest.executemany(
+                            "INSERT OR IGNORE INTO etiquetas (nombre) VALUES (?)",
+                            {(nombre,) for _, nombre in asignaciones},
+                        )
+                        dest.executemany(
+                            "INSERT OR IGNORE INTO contactos_etiquetas (etiqueta_id, contacto_id) "
+                            "SELECT id, ? FROM etiquetas WHERE nombre = ?",
+                            asignaciones,
+                        )
+                    with transaccion(ruta) as borrar:
+                        borrar.executemany(
+                            "DELETE FROM contactos WHERE id = ?", [(f[0],) for f in filas_k]
+                        )
+                    movidos += len(filas_k)
+        finally:
+            cerrar_conexion(conn)
+
+    _avanzar_secuencia(directorio, 0, max_id)
+    return movidos
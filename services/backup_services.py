@@ -0,0 +1,420 @@
+# services/backup_services.py
+"""
+Copias de seguridad en caliente de la base de contactos y restauración.
+
+- Completa: API de backup en línea de SQLite (`Connection.backup`) copiando
+  de a `paginas_por_paso` páginas con una pausa entre pasos. Con la base en
+  WAL se mantiene una transacción de lectura sobre el origen durante la copia:
+  el respaldo es una foto consistente y los escritores de otros procesos no se
+  bloquean (ni obligan a reiniciar la copia, como pasaría en modo DELETE).
+- Incremental: solo los contactos tocados desde el respaldo anterior según el
+  registro de cambios (contactos_cambios), con sus etiquetas, guardados en una
+  base SQLite chica junto con la lista completa de etiquetas.
+  El consumidor "backup" del registro evita que la compactación descarte
+  cambios que todavía no entraron en un respaldo.
+- Compresión opcional con gzip (destino terminado en ".gz").
+
+Cada respaldo lleva al lado un manifiesto JSON (`<archivo>.json`) con su tipo,
+el respaldo base, el rango de seq que cubre y el SHA-256 del archivo.
+Restaurar recorre la cadena completo -> incrementales hasta el respaldo
+elegido (restauración a ese punto), verifica hashes, `PRAGMA
+integrity_check` y que las etiquetas (y cuántos contactos tiene cada una)
+coincidan con las que anotó el manifiesto, y recién entonces vuelca el
+resultado sobre la base destino.
+
+Las bajas purgadas no pasan por el registro de cambios, así que un
+incremental no las borra: la base restaurada conserva esas bajas lógicas
+hasta la próxima purga.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from config.settings import DB_PATH
+from database.conexion import cerrar_conexion, obtener_conexion
+from repository.cambio_repository import CambioRepository
+from repository.contacto_repository import LOTE_IDS
+
+__all__ = [
+    "ErrorRespaldo",
+    "respaldar",
+    "respaldar_incremental",
+    "verificar_respaldo",
+    "restaurar",
+    "leer_manifiesto",
+]
+
+FORMATO = 1
+CONSUMIDOR = "backup"
+
+# Columnas de contactos que guarda un incremental (todas, baja incluida)
+_COLUMNAS = (
+    "id, nombre, apellido, telefono, email, baja, "
+    "telefono_canonico, telefono_invertido, email_dominio, creado, modificado, "
+    "telefono_indice, email_indice"
+)
+
+# Progreso de la copia: (páginas copiadas, páginas totales)
+Progreso = Callable[[int, int], None]
+
+
+class ErrorRespaldo(Exception):
+    """Respaldo inexistente, dañado o incompatible con la operación pedida."""
+
+
+# ---------------------------------------------------------------------------
+# Archivos y manifiestos
+# ---------------------------------------------------------------------------
+def _ruta_manifiesto(respaldo: str) -> str:
+    return f"{respaldo}.json"
+
+
+def leer_manifiesto(respaldo: str) -> dict:
+    try:
+        return json.loads(Path(_ruta_manifiesto(respaldo)).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as err:
+        raise ErrorRespaldo(f"Manifiesto ilegible para {respaldo}: {err}") from err
+
+
+def _sha256(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _publicar(temporal: str, destino: str, manifiesto: dict) -> dict:
+    """Comprime si corresponde, calcula el hash y publica archivo + manifiesto."""
+    tmp = f"{destino}.tmp{os.getpid()}"
+    if destino.endswith(".gz"):
+        with open(temporal, "rb") as origen, gzip.open(tmp, "wb", compresslevel=6) as gz:
+            shutil.copyfileobj(origen, gz, 1 << 20)
+    else:
+        shutil.copyfile(temporal, tmp)
+    manifiesto.update(
+        formato=FORMATO,
+        archivo=os.path.basename(destino),
+        comprimido=destino.endswith(".gz"),
+        bytes=os.path.getsize(tmp),
+        sha256=_sha256(tmp),
+        momento=time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+    )
+    os.replace(tmp, destino)
+    tmp_manifiesto = f"{_ruta_manifiesto(destino)}.tmp{os.getpid()}"
+    Path(tmp_manifiesto).write_text(json.dumps(manifiesto, indent=2), encoding="utf-8")
+    os.replace(tmp_manifiesto, _ruta_manifiesto(destino))
+    return manifiesto
+
+
+def _extraer(respaldo: str, directorio: str) -> str:
+    """Copia (descomprimiendo si hace falta) el respaldo a `directorio`."""
+    salida = os.path.join(directorio, os.path.basename(respaldo).removesuffix(".gz"))
+    if respaldo.endswith(".gz"):
+        with gzip.open(respaldo, "rb") as gz, open(salida, "wb") as f:
+            shutil.copyfileobj(gz, f, 1 << 20)
+    else:
+        shutil.copyfile(respaldo, salida)
+    return salida
+
+
+def _etiquetas(conn) -> List[List]:
+    """[nombre, cantidad] de cada etiqueta, para anotar y comprobar en el manifiesto."""
+    return [
+        list(row)
+        for row in conn.execute(
+            "SELECT nombre, cantidad FROM etiquetas ORDER BY nombre COLLATE NOCASE"
+        )
+    ]
+
+
+def _seq_actual(conn) -> int:
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+# ---------------------------------------------------------------------------
+# Respaldo completo
+# ---------------------------------------------------------------------------
+def respaldar(
+    destino: str,
+    db_path: Optional[str] = None,
+    paginas_por_paso: int = 1024,
+    pausa: float = 0.005,
+    progreso: Optional[Progreso] = None,
+) -> dict:
+    """
+    Respaldo completo de la base en `destino` (gzip si termina en ".gz").
+    Copia de a `paginas_por_paso` páginas y duerme `pausa` segundos entre
+    pasos para dejar pasar a la GUI y a otros escritores. Retorna el manifiesto.
+    """
+    origen = obtener_conexion(db_path)
+    origen.isolation_level = None
+    with tempfile.TemporaryDirectory(prefix="respaldo_") as directorio:
+        copia_ruta = os.path.join(directorio, "copia.db")
+        copia = obtener_conexion(copia_ruta)
+        try:
+            (modo,) = origen.execute("PRAGMA journal_mode").fetchone()
+            if modo == "wal":
+                # Foto fija: la copia no ve (ni se reinicia por) escrituras ajenas
+                origen.execute("BEGIN")
+            seq = _seq_actual(origen)
+
+            def paso(_estado, restantes, total):
+                if progreso:
+                    progreso(total - restantes, total)
+                if restantes and pausa:
+                    time.sleep(pausa)
+
+            origen.backup(copia, pages=paginas_por_paso, progress=paso)
+            if origen.in_transaction:
+                origen.execute("COMMIT")
+
+            # Archivo autocontenido (sin -wal) y sano antes de publicarlo
+            copia.execute("PRAGMA journal_mode = DELETE").fetchone()
+            (estado,) = copia.execute("PRAGMA quick_check").fetchone()
+            if estado != "ok":
+                raise ErrorRespaldo(f"La copia no pasó quick_check: {estado}")
+            (contactos,) = copia.execute(
+                "SELECT COUNT(*) FROM contactos WHERE baja IS NULL"
+            ).fetchone()
+            etiquetas = _etiquetas(copia)
+        finally:
+            cerrar_conexion(copia)
+            cerrar_conexion(origen)
+
+        manifiesto = _publicar(
+            copia_ruta,
+            destino,
+            {"tipo": "completo", "base": None, "seq_desde": 0, "seq_hasta": seq,
+             "contactos": contactos, "etiquetas": etiquetas},
+        )
+    # Retener el registro de cambios desde acá para el próximo incremental
+    CambioRepository(db_path).confirmar(CONSUMIDOR, seq)
+    return manifiesto
+
+
+# ---------------------------------------------------------------------------
+# Respaldo incremental
+# ---------------------------------------------------------------------------
+def respaldar_incremental(destino: str, base: str, db_path: Optional[str] = None) -> dict:
+    """
+    Respaldo de lo que cambió desde el respaldo `base` (completo o incremental):
+    el estado actual de cada contacto tocado (etiquetas incluidas: ponerlas o
+    quitarlas queda en el registro de cambios), o su borrado si ya no existe.
+    Falla con ErrorRespaldo si el registro de cambios ya fue compactado más
+    allá de `base`; en ese caso hace falta un respaldo completo.
+    """
+    anterior = leer_manifiesto(base)
+    desde = anterior["seq_hasta"]
+    if CambioRepository(db_path).compactado_hasta() > desde:
+        raise ErrorRespaldo(
+            "El registro de cambios fue compactado después del respaldo base; "
+            "hacé un respaldo completo"
+        )
+
+    origen = obtener_conexion(db_path)
+    origen.isolation_level = None
+    with tempfile.TemporaryDirectory(prefix="respaldo_") as directorio:
+        delta_ruta = os.path.join(directorio, "delta.db")
+        delta = obtener_conexion(delta_ruta)
+        try:
+            delta.execute(
+                "CREATE TABLE contactos (id INTEGER PRIMARY KEY, nombre TEXT, apellido TEXT, "
+                "telefono TEXT, email TEXT, baja TEXT, telefono_canonico TEXT, "
+                "telefono_invertido TEXT, email_dominio TEXT, creado TEXT, modificado TEXT, "
+                "telefono_indice TEXT, email_indice TEXT)"
+            )
+            delta.execute("CREATE TABLE borrados (id INTEGER PRIMARY KEY)")
+            # Todas las etiquetas (son pocas) y las asignaciones de los tocados
+            delta.execute("CREATE TABLE etiquetas (nombre TEXT PRIMARY KEY)")
+            delta.execute(
+                "CREATE TABLE contactos_etiquetas "
+                "(contacto_id INTEGER NOT NULL, nombre TEXT NOT NULL)"
+            )
+
+            origen.execute("BEGIN")  # misma foto para los ids, las filas y el seq
+            hasta = _seq_actual(origen)
+            tocados = [
+                row[0]
+                for row in origen.execute(
+                    "SELECT DISTINCT contacto_id FROM contactos_cambios "
+                    "WHERE seq > ? AND seq <= ? ORDER BY contacto_id",
+                    (desde, hasta),
+                )
+            ]
+            presentes = set()
+            for i in range(0, len(tocados), LOTE_IDS):
+                lote = tocados[i : i + LOTE_IDS]
+                marcas = ", ".join("?" * len(lote))
+                filas = origen.execute(
+                    f"SELECT {_COLUMNAS} FROM contactos WHERE id IN ({marcas})", lote
+                ).fetchall()
+                delta.executemany(
+                    f"INSERT INTO contactos ({_COLUMNAS}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNAS.split(',')))})",
+                    filas,
+                )
+                presentes.update(fila[0] for fila in filas)
+                delta.executemany(
+                    "INSERT INTO contactos_etiquetas (contacto_id, nombre) VALUES (?, ?)",
+                    origen.execute(
+                        "SELECT e.contacto_id, t.nombre FROM contactos_etiquetas e "
+                        "JOIN etiquetas t ON t.id = e.etiqueta_id "
+                        f"WHERE e.contacto_id IN ({marcas})",
+                        lote,
+                    ),
+                )
+            etiquetas = _etiquetas(origen)
+            origen.execute("COMMIT")
+            delta.executemany(
+                "INSERT INTO etiquetas (nombre) VALUES (?)", [(n,) for n, _ in etiquetas]
+            )
+
+            delta.executemany(
+                "INSERT INTO borrados (id) VALUES (?)",
+                [(i,) for i in tocados if i not in presentes],
+            )
+            delta.commit()
+        finally:
+            cerrar_conexion(delta)
+            cerrar_conexion(origen)
+
+        manifiesto = _publicar(
+            delta_ruta,
+            destino,
+            {"tipo": "incremental", "base": os.path.abspath(base), "seq_desde": desde,
+             "seq_hasta": hasta, "contactos": len(tocados), "etiquetas": etiquetas},
+        )
+    CambioRepository(db_path).confirmar(CONSUMIDOR, hasta)
+    return manifiesto
+
+
+# ---------------------------------------------------------------------------
+# Verificación y restauración
+# ---------------------------------------------------------------------------
+def _cadena(respaldo: str) -> List[str]:
+    """Respaldos a aplicar, del completo al pedido, validando que encadenen."""
+    cadena = [respaldo]
+    vistos = {os.path.abspath(respaldo)}
+    while True:
+        manifiesto = leer_manifiesto(cadena[0])
+        if manifiesto.get("formato") != FORMATO:
+            raise ErrorRespaldo(f"Formato de respaldo desconocido en {cadena[0]}")
+        if manifiesto["tipo"] == "completo":
+            return cadena
+        base = manifiesto["base"]
+        if not os.path.exists(base):
+            # Respaldos movidos juntos a otra carpeta
+            base = os.path.join(os.path.dirname(cadena[0]), os.path.basename(base))
+        if os.path.abspath(base) in vistos:
+            raise ErrorRespaldo(f"Cadena de respaldos circular en {base}")
+        if leer_manifiesto(base)["seq_hasta"] != manifiesto["seq_desde"]:
+            raise ErrorRespaldo(f"{cadena[0]} no continúa a {base}")
+        vistos.add(os.path.abspath(base))
+        cadena.insert(0, base)
+
+
+def verificar_respaldo(respaldo: str) -> List[str]:
+    """Verifica hashes de toda la cadena. Retorna los archivos verificados."""
+    cadena = _cadena(respaldo)
+    for archivo in cadena:
+        if not os.path.exists(archivo):
+            raise ErrorRespaldo(f"Falta el respaldo {archivo}")
+        if _sha256(archivo) != leer_manifiesto(archivo)["sha256"]:
+            raise ErrorRespaldo(f"{archivo} está dañado (SHA-256 no coincide)")
+    return cadena
+
+
+def _aplicar_incremental(conn, delta_ruta: str) -> None:
+    conn.execute("ATTACH DATABASE ? AS delta", (delta_ruta,))
+    try:
+        conn.execute("BEGIN")
+        # Los incrementales anteriores a creado/modificado (o a los índices
+        # ciegos) no traen esas columnas
+        en_delta = {row[1] for row in conn.execute("PRAGMA delta.table_info(contactos)")}
+        columnas = [c.strip() for c in _COLUMNAS.split(",") if c.strip() in en_delta]
+        lista = ", ".join(columnas)
+        conn.execute(
+            f"INSERT INTO contactos ({lista}) SELECT {lista} FROM delta.contactos "
+            "WHERE true ON CONFLICT(id) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in columnas[1:])
+        )
+        conn.execute("DELETE FROM contactos WHERE id IN (SELECT id FROM delta.borrados)")
+        # Los incrementales anteriores al registro de etiquetas no las traen
+        if conn.execute("PRAGMA delta.table_info(etiquetas)").fetchone():
+            conn.execute(
+                "DELETE FROM etiquetas WHERE nombre NOT IN (SELECT nombre FROM delta.etiquetas)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO etiquetas (nombre) SELECT nombre FROM delta.etiquetas"
+            )
+            conn.execute(
+                "DELETE FROM contactos_etiquetas "
+                "WHERE contacto_id IN (SELECT id FROM delta.contactos) "
+                "OR etiqueta_id NOT IN (SELECT id FROM etiquetas)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO contactos_etiquetas (etiqueta_id, contacto_id) "
+                "SELECT t.id, d.contacto_id FROM delta.contactos_etiquetas d "
+                "JOIN etiquetas t ON t.nombre = d.nombre"
+            )
+        conn.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.execute("DETACH DATABASE delta")
+
+
+def restaurar(
+    respaldo: str,
+    destino: Optional[str] = None,
+    paginas_por_paso: int = 1024,
+    progreso: Optional[Progreso] = None,
+) -> dict:
+    """
+    Reconstruye la base al momento de `respaldo` (completo + incrementales
+    hasta él) en un temporal, la valida con integrity_check y la vuelca sobre
+    `destino` (por defecto DB_PATH) con la API de backup, que toma el lock de
+    la base destino mientras escribe. Retorna el manifiesto del respaldo.
+    """
+    cadena = verificar_respaldo(respaldo)
+    destino = destino or DB_PATH
+    with tempfile.TemporaryDirectory(prefix="restauracion_") as directorio:
+        base = _extraer(cadena[0], directorio)
+        conn = obtener_conexion(base)
+        conn.isolation_level = None
+        try:
+            for incremental in cadena[1:]:
+                _aplicar_incremental(conn, _extraer(incremental, directorio))
+            resultado = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            if resultado != ["ok"]:
+                raise ErrorRespaldo(f"La base restaurada no es íntegra: {'; '.join(resultado[:5])}")
+            esperadas = leer_manifiesto(respaldo).get("etiquetas")
+            if esperadas is not None and _etiquetas(conn) != esperadas:
+                raise ErrorRespaldo("Las etiquetas restauradas no coinciden con las del respaldo")
+
+            os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+            final = obtener_conexion(destino)
+            try:
+                conn.backup(
+                    final,
+                    pages=paginas_por_paso,
+                    progress=(lambda _e, r, t: progreso(t - r, t)) if progreso else None,
+                )
+                (estado,) = final.execute("PRAGMA quick_check").fetchone()
+                if estado != "ok":
+                    raise ErrorRespaldo(f"La base destino no pasó quick_check: {estado}")
+            finally:
+                cerrar_conexion(final)
+        finally:
+            cerrar_conexion(conn)
+    return leer_manifiesto(respaldo)
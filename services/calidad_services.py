@@ -0,0 +1,216 @@
+# services/calidad_services.py
+"""
+Auditoría de calidad de los contactos guardados.
+
+La validación (Contacto.validate) solo corre en los diálogos de la GUI: lo
+que entra por importaciones, scripts o versiones viejas puede estar mal sin
+que nadie lo sepa. La auditoría vuelve a revisar los contactos activos
+(Contacto.revisar_calidad: la validación más lo que no impide guardar, como un
+teléfono que no se puede normalizar) y deja en la tabla `calidad` los que no
+pasan, con sus errores; la GUI y `listar` filtran por esa tabla
+(Consulta.solo_invalidos).
+
+Es incremental: la marca de agua es la posición del consumidor "calidad" en
+el registro de cambios (contactos_cambios), así que cada corrida revisa solo
+los contactos tocados desde la anterior, cuesten lo que cuesten los demás.
+Como consumidor registrado, además, la compactación no descarta cambios que
+la auditoría todavía no vio. La primera corrida, o una posterior a que el
+registro se haya compactado más allá de la marca, recorre la tabla entera.
+
+Un motor sin archivos (REPOSITORIO_MOTOR = "memoria") no tiene tabla
+`calidad`: su solo_invalidos ya valida en el momento, así que la auditoría
+solo cuenta y agrupa lo que devuelve el repositorio.
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database.conexion import cerrar_conexion, obtener_conexion, transaccion
+from models.contacto import Contacto
+from repository.cambio_repository import CambioRepository
+from repository.cifrado import cifrador_por_defecto
+from repository.consulta import AHORA_SQL, Consulta
+from repository.contacto_repository import LOTE_IDS
+from repository.interfaz import rutas_de
+
+__all__ = ["AuditoriaCalidad", "ResultadoAuditoria", "auditar"]
+
+CONSUMIDOR = "calidad"
+
+# Contactos por transacción al recorrer la tabla entera
+LOTE_AUDITORIA = 1000
+
+_COLUMNAS = "id, nombre, apellido, telefono, email"
+_INSERTAR = f"INSERT INTO calidad (contacto_id, errores, auditado) VALUES (?, ?, {AHORA_SQL})"
+
+
+@dataclass
+class ResultadoAuditoria:
+    revisados: int  # contactos validados en esta corrida
+    invalidos: int  # de esos, los que no pasaron
+    total_invalidos: int  # filas en la tabla calidad al terminar
+    seq: int  # marca de agua nueva
+    completa: bool  # se recorrió la tabla entera
+    segundos: float
+
+    def sumar(self, otro: "ResultadoAuditoria") -> "ResultadoAuditoria":
+        return ResultadoAuditoria(
+            self.revisados + otro.revisados,
+            self.invalidos + otro.invalidos,
+            self.total_invalidos + otro.total_invalidos,
+            max(self.seq, otro.seq),
+            self.completa or otro.completa,
+            self.segundos + otro.segundos,
+        )
+
+
+def _validar(filas: Iterable[tuple]) -> List[Tuple[int, str]]:
+    """(id, errores) de las filas con problemas según Contacto.revisar_calidad."""
+    cifrador = cifrador_por_defecto()
+    invalidos = []
+    for contacto_id, nombre, apellido, telefono, email in filas:
+        if cifrador:
+            telefono = cifrador.descifrar(telefono, "telefono")
+            email = cifrador.descifrar(email, "email")
+        errores = Contacto(contacto_id, nombre, apellido, telefono, email).revisar_calidad()
+        if errores:
+            invalidos.append((contacto_id, "\n".join(errores)))
+    return invalidos
+
+
+def _auditar_completa(db_path: Optional[str], lote: int) -> Tuple[int, int]:
+    """
+    Recorre los contactos activos por id, de a `lote` por transacción, y
+    reemplaza las filas de calidad de cada tramo (así también desaparecen las
+    de contactos borrados o dados de baja). Retorna (revisados, inválidos).
+    """
+    revisados = invalidos = 0
+    ultimo = 0
+    while True:
+        with transaccion(db_path) as conn:
+            filas = conn.execute(
+                f"SELECT {_COLUMNAS} FROM contactos WHERE baja IS NULL AND id > ? ORDER BY id LIMIT ?",
+                (ultimo, lote),
+            ).fetchall()
+            if not filas:
+                conn.execute("DELETE FROM calidad WHERE contacto_id > ?", (ultimo,))
+                return revisados, invalidos
+            hasta = filas[-1][0]
+            conn.execute(
+                "DELETE FROM calidad WHERE contacto_id > ? AND contacto_id <= ?", (ultimo, hasta)
+            )
+            malos = _validar(filas)
+            conn.executemany(_INSERTAR, malos)
+        revisados += len(filas)
+        invalidos += len(malos)
+        ultimo = hasta
+
+
+def _auditar_delta(db_path: Optional[str], desde: int, hasta: int) -> Tuple[int, int]:
+    """Revalida los contactos con cambios en (desde, hasta]. Retorna (revisados, inválidos)."""
+    conn = obtener_conexion(db_path)
+    try:
+        tocados = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT contacto_id FROM contactos_cambios "
+                "WHERE seq > ? AND seq <= ? ORDER BY contacto_id",
+                (desde, hasta),
+            )
+        ]
+    finally:
+        cerrar_conexion(conn)
+
+    revisados = invalidos = 0
+    for i in range(0, len(tocados), LOTE_IDS):
+        lote = tocados[i : i + LOTE_IDS]
+        marcas = ", ".join("?" * len(lote))
+        with transaccion(db_path) as conn:
+            filas = conn.execute(
+                f"SELECT {_COLUMNAS} FROM contactos WHERE baja IS NULL AND id IN ({marcas})", lote
+            ).fetchall()
+            # Los que ya no están activos solo pierden su fila
+            conn.execute(f"DELETE FROM calidad WHERE contacto_id IN ({marcas})", lote)
+            malos = _validar(filas)
+            conn.executemany(_INSERTAR, malos)
+        revisados += len(filas)
+        invalidos += len(malos)
+    return revisados, invalidos
+
+
+def auditar(
+    db_path: Optional[str] = None, completa: bool = False, lote: int = LOTE_AUDITORIA
+) -> ResultadoAuditoria:
+    """
+    Audita una base: los contactos tocados desde la marca de agua o, con
+    `completa` (o si no hay marca utilizable), todos. La marca se toma antes
+    de leer: un cambio concurrente se vuelve a revisar en la próxima corrida.
+    """
+    inicio = time.perf_counter()
+    cambios = CambioRepository(db_path)
+    hasta = cambios.ultimo_seq()
+    desde = cambios.posicion(CONSUMIDOR, nuevo=None)
+    completa = completa or desde is None or cambios.compactado_hasta() > desde
+    if completa:
+        revisados, invalidos = _auditar_completa(db_path, lote)
+    elif hasta > desde:
+        revisados, invalidos = _auditar_delta(db_path, desde, hasta)
+    else:
+        revisados = invalidos = 0
+    cambios.confirmar(CONSUMIDOR, hasta)
+
+    conn = obtener_conexion(db_path)
+    try:
+        (total,) = conn.execute("SELECT COUNT(*) FROM calidad").fetchone()
+    finally:
+        cerrar_conexion(conn)
+    return ResultadoAuditoria(
+        revisados, invalidos, total, hasta, completa, time.perf_counter() - inicio
+    )
+
+
+class AuditoriaCalidad:
+    """Auditoría sobre una o varias bases (shards), como EstadisticasService."""
+
+    def __init__(self, rutas: Optional[List[str]] = None, repo=None):
+        # None = la base por defecto (DB_PATH); sin bases, se consulta `repo`
+        self.rutas = [None] if rutas is None else list(rutas)
+        self.repo = repo
+
+    @classmethod
+    def para_repositorio(cls, repo) -> "AuditoriaCalidad":
+        """Auditoría sobre las mismas bases que usa el repositorio (o sobre él, si no tiene)."""
+        rutas = rutas_de(repo)
+        return cls(rutas) if rutas else cls([], repo)
+
+    def auditar(self, completa: bool = False) -> ResultadoAuditoria:
+        if not self.rutas:
+            # Sin tabla calidad ni marca de agua: cada corrida es completa
+            inicio = time.perf_counter()
+            revisados = len(self.repo.filas(Consulta().seleccionar("id")))
+            invalidos = len(self.repo.filas(Consulta().solo_invalidos().seleccionar("id")))
+            return ResultadoAuditoria(
+                revisados, invalidos, invalidos, 0, True, time.perf_counter() - inicio
+            )
+        resultado = None
+        for ruta in self.rutas:
+            parcial = auditar(ruta, completa)
+            resultado = parcial if resultado is None else resultado.sumar(parcial)
+        return resultado
+
+    def resumen(self) -> List[Tuple[str, int]]:
+        """Cantidad de contactos inválidos por error, de más a menos frecuente."""
+        conteo: Dict[str, int] = {}
+        if not self.rutas:
+            for contacto in self.repo.iterar(Consulta().solo_invalidos()):
+                for error in contacto.revisar_calidad():
+                    conteo[error] = conteo.get(error, 0) + 1
+        for ruta in self.rutas:
+            conn = obtener_conexion(ruta)
+            try:
+                for (errores,) in conn.execute("SELECT errores FROM calidad"):
+                    for error in errores.split("\n"):
+                        conteo[error] = conteo.get(error, 0) + 1
+            finally:
+                cerrar_conexion(conn)
+        return sorted(conteo.items(), key=lambda par: (-par[1], par[0]))
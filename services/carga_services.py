@@ -0,0 +1,456 @@
+# services/carga_services.py
+"""
+Generador de carga y verificación de propiedades sobre el almacén de contactos.
+
+Simula N clientes tipo GUI (hilos, opcionalmente repartidos en varios
+procesos) que ejecutan una mezcla configurable de lecturas, listados,
+búsquedas, altas, modificaciones y bajas, más los trabajos de fondo (purga,
+compactación del registro de cambios, estadísticas), siempre sobre bases
+temporales. Informa throughput, latencias p50/p95/p99 y errores por
+operación, y al final verifica invariantes de los datos.
+
+Los datos son aleatorios pero reproducibles (semilla). Cada cliente solo
+modifica los contactos que él mismo creó y lleva su propio modelo de lo que
+debería haber en la base, así que cada respuesta se puede comprobar aun con
+otros clientes escribiendo al mismo tiempo.
+"""
+import multiprocessing
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from database.conexion import cerrar_conexion, metricas_bloqueo, obtener_conexion
+from models.contacto import Contacto, dominio_email
+from models.telefono import claves_telefono
+from repository.cambio_repository import CambioRepository
+from repository.cifrado import cifrador_por_defecto
+from repository.contacto_repository import ContactoRepository, clave_orden
+from repository.particionado_repository import ContactoRepositoryParticionado, rutas_shards
+from services.db_services import init_schema
+from services.estadisticas_services import EstadisticasService
+from services.purga_services import purgar_bajas
+
+__all__ = ["MEZCLA", "ResultadoCarga", "ejecutar_carga"]
+
+OPERACIONES = ("leer", "listar", "buscar", "alta", "modificar", "baja")
+
+# Peso relativo de cada operación de los clientes
+MEZCLA = {"leer": 30, "listar": 10, "buscar": 20, "alta": 20, "modificar": 15, "baja": 5}
+
+# Caracteres de los textos generados: incluye acentos, espacios y los
+# comodines de LIKE, que la búsqueda debe tratar como literales
+_LETRAS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZáéíóúñÑü '%_\\"
+_DOMINIOS = ("gmail.com", "hotmail.com", "acme.com", "empresa.com.ar", "mail.org")
+_FORMATOS_TELEFONO = (
+    "+54 11 {a}-{b}",
+    "011 {a} {b}",
+    "54 9 351 {a}{b}",
+    "(0351) 15-{a}-{b}",
+    "+1 415 {a} {b}",
+    "{a}{b}",
+)
+
+
+def _texto(rnd: random.Random, minimo: int = 1, maximo: int = 12) -> str:
+    texto = "".join(rnd.choice(_LETRAS) for _ in range(rnd.randint(minimo, maximo))).strip()
+    return texto or "x"
+
+
+def contacto_aleatorio(rnd: random.Random, marca: str) -> Contacto:
+    """Contacto válido con datos variados; `marca` (única) queda en el nombre para buscarlo."""
+    telefono = rnd.choice(_FORMATOS_TELEFONO).format(
+        a=rnd.randint(100, 9999), b=rnd.randint(1000, 9999)
+    )
+    usuario = "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz0123456789._") for _ in range(8))
+    return Contacto(
+        nombre=f"{_texto(rnd)} {marca}",
+        apellido=_texto(rnd),
+        telefono=telefono,
+        email=f"{usuario.strip('.')}x@{rnd.choice(_DOMINIOS)}",
+    )
+
+
+# ---------------------------------------------------------------------------
+# Configuración del almacén bajo prueba
+# ---------------------------------------------------------------------------
+@dataclass
+class Almacen:
+    """Bases temporales de una corrida: una sola (simple) o N shards."""
+    directorio: str
+    shards: int = 0
+
+    @property
+    def rutas(self) -> List[str]:
+        if self.shards:
+            return rutas_shards(self.shards, self.directorio)
+        return [f"{self.directorio}/contactos.db"]
+
+    def repositorio(self):
+        if self.shards:
+            return ContactoRepositoryParticionado(self.rutas)
+        return ContactoRepository(self.rutas[0])
+
+
+# ---------------------------------------------------------------------------
+# Resultados
+# ---------------------------------------------------------------------------
+@dataclass
+class Parcial:
+    """Lo que reporta un cliente (o un proceso, sumando sus clientes)."""
+    latencias: Dict[str, List[float]] = field(default_factory=dict)
+    errores: Dict[str, Counter] = field(default_factory=dict)
+    violaciones: List[str] = field(default_factory=list)
+    modelo: Dict[int, tuple] = field(default_factory=dict)  # id -> to_tuple() esperado
+    bajas: List[int] = field(default_factory=list)
+    bloqueo: List[dict] = field(default_factory=list)
+
+    def medir(self, operacion: str, funcion):
+        inicio = time.perf_counter()
+        try:
+            return funcion()
+        except Exception as err:
+            self.errores.setdefault(operacion, Counter())[type(err).__name__] += 1
+            return None
+        finally:
+            self.latencias.setdefault(operacion, []).append(time.perf_counter() - inicio)
+
+    def sumar(self, otro: "Parcial") -> None:
+        for operacion, valores in otro.latencias.items():
+            self.latencias.setdefault(operacion, []).extend(valores)
+        for operacion, errores in otro.errores.items():
+            self.errores.setdefault(operacion, Counter()).update(errores)
+        self.violaciones += otro.violaciones
+        self.modelo.update(otro.modelo)
+        self.bajas += otro.bajas
+        self.bloqueo += otro.bloqueo
+
+
+def _percentil(valores: List[float], q: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+@dataclass
+class ResultadoCarga:
+    duracion: float
+    parcial: Parcial
+    semilla: int
+    directorio: Optional[str] = None  # solo si se conservaron las bases
+
+    @property
+    def violaciones(self) -> List[str]:
+        return self.parcial.violaciones
+
+    @property
+    def ok(self) -> bool:
+        return not self.violaciones and not any(self.parcial.errores.values())
+
+    def total(self) -> int:
+        return sum(len(v) for v in self.parcial.latencias.values())
+
+    def reporte(self) -> str:
+        lineas = [
+            f"Duración: {self.duracion:.2f} s · {self.total()} operaciones · "
+            f"{self.total() / self.duracion if self.duracion else 0:.0f} op/s · semilla {self.semilla}",
+            "",
+            f"  {'operación':<12}{'cantidad':>9}{'op/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'máx ms':>9}{'errores':>9}",
+        ]
+        for operacion, valores in sorted(self.parcial.latencias.items()):
+            errores = sum(self.parcial.errores.get(operacion, Counter()).values())
+            lineas.append(
+                f"  {operacion:<12}{len(valores):>9}{len(valores) / self.duracion:>9.0f}"
+                f"{_percentil(valores, 0.50) * 1000:>9.2f}{_percentil(valores, 0.95) * 1000:>9.2f}"
+                f"{_percentil(valores, 0.99) * 1000:>9.2f}{max(valores) * 1000:>9.2f}"
+                f"{errores / len(valores):>9.1%}"
+            )
+        for operacion, errores in sorted(self.parcial.errores.items()):
+            for tipo, cantidad in errores.most_common():
+                lineas.append(f"  ! {operacion}: {tipo} x{cantidad}")
+
+        if self.parcial.bloqueo:
+            reintentos = sum(m["reintentos"] for m in self.parcial.bloqueo)
+            fallos = sum(m["fallos"] for m in self.parcial.bloqueo)
+            maxima = max(m["espera_maxima_ms"] for m in self.parcial.bloqueo)
+            p99 = max(m["espera_p99_ms"] for m in self.parcial.bloqueo)
+            lineas += [
+                "",
+                f"Locks: {reintentos} reintentos, {fallos} fallos, espera p99 {p99:.1f} ms "
+                f"(peor proceso), máxima {maxima:.1f} ms",
+            ]
+
+        lineas.append("")
+        if self.violaciones:
+            lineas.append(f"Invariantes: {len(self.violaciones)} violaciones")
+            lineas += [f"  - {v}" for v in self.violaciones[:20]]
+        else:
+            lineas.append("Invariantes: OK")
+        if self.directorio:
+            lineas.append(f"Bases conservadas en {self.directorio}")
+        return "\n".join(lineas)
+
+
+# ---------------------------------------------------------------------------
+# Clientes
+# ---------------------------------------------------------------------------
+def _cliente(almacen: Almacen, nombre: str, semilla: int, mezcla: Dict[str, int], fin: float,
+             max_operaciones: Optional[int]) -> Parcial:
+    """Un usuario simulado: operaciones al azar según `mezcla` hasta `fin`."""
+    rnd = random.Random(semilla)
+    repo = almacen.repositorio()
+    parcial = Parcial()
+    modelo: Dict[int, Contacto] = {}
+    operaciones, pesos = zip(*mezcla.items())
+    secuencia = 0
+
+    def violacion(texto: str) -> None:
+        parcial.violaciones.append(f"[{nombre}] {texto}")
+
+    hechas = 0
+    while time.monotonic() < fin and (max_operaciones is None or hechas < max_operaciones):
+        hechas += 1
+        operacion = rnd.choices(operaciones, pesos)[0]
+        propio = rnd.choice(list(modelo)) if modelo else None
+        if operacion in ("leer", "buscar", "modificar", "baja") and propio is None:
+            operacion = "alta"
+
+        if operacion == "alta":
+            secuencia += 1
+            nuevo = contacto_aleatorio(rnd, f"{nombre}n{secuencia}")
+            nuevo_id = parcial.medir("alta", lambda: repo.agregar(nuevo))
+            if nuevo_id is not None:
+                nuevo.id = nuevo_id
+                modelo[nuevo_id] = nuevo
+
+        elif operacion == "leer":
+            leido = parcial.medir("leer", lambda: repo.obtener_por_id(propio))
+            if leido != modelo[propio]:
+                violacion(f"obtener_por_id({propio}) = {leido}, se esperaba {modelo[propio]}")
+
+        elif operacion == "listar":
+            orden = rnd.choice(repo.ordenables)
+            pagina = parcial.medir("listar", lambda: repo.listar_pagina(orden, rnd.random() < 0.5, 50))
+            if pagina is not None:
+                claves = [clave_orden(c, orden) for c in pagina]
+                if len(pagina) > 50 or (claves != sorted(claves) and claves != sorted(claves, reverse=True)):
+                    violacion(f"listar_pagina({orden!r}) fuera de orden o de tamaño")
+
+        elif operacion == "buscar":
+            esperado = modelo[propio]
+            # Por la marca única o por un fragmento cualquiera (con comodines incluidos)
+            # (con cifrado el email no entra en la búsqueda por texto)
+            campos = (esperado.nombre, esperado.apellido)
+            campo = rnd.choice(campos if cifrador_por_defecto() else campos + (esperado.email,))
+            i = rnd.randrange(len(campo))
+            texto = rnd.choice((esperado.nombre.rsplit(" ", 1)[-1], campo[i : i + rnd.randint(3, 8)]))
+            hallados = parcial.medir("buscar", lambda: repo.buscar(texto))
+            if hallados is not None and esperado not in hallados:
+                violacion(f"buscar({texto!r}) no encontró el contacto {propio}")
+
+        elif operacion == "modificar":
+            secuencia += 1
+            cambios = contacto_aleatorio(rnd, f"{nombre}m{secuencia}")
+            cambios.id = propio
+            ok = parcial.medir("modificar", lambda: repo.actualizar(cambios))
+            if ok:
+                modelo[propio] = cambios
+            elif ok is not None:
+                violacion(f"actualizar({propio}) retornó {ok}")
+
+        elif operacion == "baja":
+            ok = parcial.medir("baja", lambda: repo.eliminar(modelo[propio]))
+            if ok:
+                del modelo[propio]
+                parcial.bajas.append(propio)
+                if repo.obtener_por_id(propio) is not None:
+                    violacion(f"el contacto {propio} sigue visible después de la baja")
+            elif ok is not None:
+                violacion(f"eliminar({propio}) retornó {ok}")
+
+    parcial.modelo = {i: (i,) + c.to_tuple() for i, c in modelo.items()}
+    return parcial
+
+
+def _proceso(almacen: Almacen, hilos: int, semilla: int, mezcla: Dict[str, int],
+             duracion: float, max_operaciones: Optional[int], indice: int = 0) -> Parcial:
+    """Corre `hilos` clientes en este proceso y suma sus resultados."""
+    metricas_bloqueo.reiniciar()
+    fin = time.monotonic() + duracion
+    total = Parcial()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = [
+            pool.submit(_cliente, almacen, f"p{indice}h{k}", semilla * 1000 + indice * 100 + k,
+                        mezcla, fin, max_operaciones)
+            for k in range(hilos)
+        ]
+        for futuro in futuros:
+            total.sumar(futuro.result())
+    total.bloqueo.append(metricas_bloqueo.resumen())
+    return total
+
+
+def _trabajos_de_fondo(almacen: Almacen, parcial: Parcial, detener: threading.Event) -> None:
+    """Purga de bajas, compactación del registro y refresco de estadísticas, en bucle."""
+    stats = EstadisticasService(almacen.rutas)
+    while not detener.wait(0.2):
+        for ruta in almacen.rutas:
+            parcial.medir("purga", lambda: purgar_bajas(0, 0.05, db_path=ruta))
+            parcial.medir("compactar", lambda: CambioRepository(ruta).compactar())
+        parcial.medir("stats", stats.resumen)
+
+
+# ---------------------------------------------------------------------------
+# Invariantes
+# ---------------------------------------------------------------------------
+def _derivadas_al_dia(telefono, email, canonico, invertido, dominio, indice_telefono, indice_email) -> bool:
+    """Columnas derivadas e índices ciegos coherentes con telefono/email (ver ContactoRepository._a_guardar)."""
+    cifrador = cifrador_por_defecto()
+    if not cifrador:
+        return (
+            (canonico, invertido) == claves_telefono(telefono)
+            and dominio == dominio_email(email)
+            and indice_telefono is None
+            and indice_email is None
+        )
+    telefono = cifrador.descifrar(telefono, "telefono")
+    email = cifrador.descifrar(email, "email")
+    return (
+        (canonico, invertido) == ("", "")
+        and dominio == dominio_email(email)
+        and indice_telefono == cifrador.indice("telefono", telefono)
+        and indice_email == cifrador.indice("email", email)
+    )
+
+
+def _verificar(almacen: Almacen, parcial: Parcial, precarga: int) -> None:
+    violaciones = parcial.violaciones
+    repo = almacen.repositorio()
+
+    vistos: Dict[int, int] = {}
+    activos = 0
+    for k, ruta in enumerate(almacen.rutas):
+        conn = obtener_conexion(ruta)
+        try:
+            filas = conn.execute(
+                "SELECT id, telefono, email, telefono_canonico, telefono_invertido, "
+                "email_dominio, baja, creado, modificado, telefono_indice, email_indice "
+                "FROM contactos"
+            ).fetchall()
+            ultimas = dict(
+                conn.execute(
+                    "SELECT contacto_id, operacion FROM contactos_cambios c WHERE seq = "
+                    "(SELECT MAX(seq) FROM contactos_cambios WHERE contacto_id = c.contacto_id)"
+                ).fetchall()
+            )
+        finally:
+            cerrar_conexion(conn)
+
+        for (contacto_id, telefono, email, canonico, invertido, dominio, baja, creado, modificado,
+             indice_telefono, indice_email) in filas:
+            if contacto_id in vistos:
+                violaciones.append(f"id {contacto_id} repetido en los shards {vistos[contacto_id]} y {k}")
+            vistos[contacto_id] = k
+            if almacen.shards and contacto_id % almacen.shards != k:
+                violaciones.append(f"id {contacto_id} está en el shard {k}")
+            if not _derivadas_al_dia(telefono, email, canonico, invertido, dominio,
+                                     indice_telefono, indice_email):
+                violaciones.append(f"columnas derivadas desactualizadas en el id {contacto_id}")
+            if modificado is None or (creado or "") > modificado or (baja or "") > modificado:
+                violaciones.append(f"marcas de tiempo inconsistentes en el id {contacto_id}")
+            if baja is None:
+                activos += 1
+                if ultimas.get(contacto_id) == "D":
+                    violaciones.append(f"el registro de cambios da de baja al activo {contacto_id}")
+        for contacto_id in parcial.bajas:
+            if contacto_id % max(almacen.shards, 1) == k and ultimas.get(contacto_id, "D") != "D":
+                violaciones.append(f"el registro de cambios no refleja la baja de {contacto_id}")
+
+    esperados = precarga + len(parcial.modelo)
+    if activos != esperados:
+        violaciones.append(f"hay {activos} contactos activos, se esperaban {esperados}")
+    for contacto_id, esperado in parcial.modelo.items():
+        actual = repo.obtener_por_id(contacto_id)
+        if actual is None or (actual.id,) + actual.to_tuple() != esperado:
+            violaciones.append(f"el contacto {contacto_id} no coincide con lo escrito: {actual}")
+    for contacto_id in parcial.bajas:
+        if repo.obtener_por_id(contacto_id) is not None:
+            violaciones.append(f"el contacto {contacto_id} dado de baja sigue activo")
+
+
+# ---------------------------------------------------------------------------
+# Punto de entrada
+# ---------------------------------------------------------------------------
+def ejecutar_carga(
+    hilos: int = 4,
+    procesos: int = 1,
+    duracion: float = 5.0,
+    mezcla: Optional[Dict[str, int]] = None,
+    semilla: Optional[int] = None,
+    shards: int = 0,
+    precarga: int = 500,
+    fondo: bool = True,
+    max_operaciones: Optional[int] = None,
+    conservar: bool = False,
+) -> ResultadoCarga:
+    """
+    Corre la simulación sobre bases nuevas en un directorio temporal:
+    `procesos` x `hilos` clientes durante `duracion` segundos (o hasta
+    `max_operaciones` por cliente), con `shards` > 0 para el almacén
+    particionado. `fondo` agrega purga/compactación/estadísticas concurrentes.
+    """
+    mezcla = mezcla or MEZCLA
+    desconocidas = set(mezcla) - set(OPERACIONES)
+    if desconocidas:
+        raise ValueError(f"Operaciones desconocidas: {', '.join(sorted(desconocidas))}")
+    semilla = random.randrange(1_000_000) if semilla is None else semilla
+
+    almacen = Almacen(tempfile.mkdtemp(prefix="carga_contactos_"), shards)
+    try:
+        for ruta in almacen.rutas:
+            init_schema(db_path=ruta)
+        repo = almacen.repositorio()
+        rnd = random.Random(semilla)
+        for k in range(precarga):
+            repo.agregar(contacto_aleatorio(rnd, f"pre{k}"))
+
+        total = Parcial()
+        de_fondo = Parcial()
+        detener = threading.Event()
+        fondo_hilo = threading.Thread(
+            target=_trabajos_de_fondo, args=(almacen, de_fondo, detener), daemon=True
+        )
+        inicio = time.perf_counter()
+        if fondo:
+            fondo_hilo.start()
+        try:
+            args = (almacen, hilos, semilla, mezcla, duracion, max_operaciones)
+            if procesos <= 1:
+                total.sumar(_proceso(*args))
+            else:
+                # spawn: mismo comportamiento en Windows y Linux
+                contexto = multiprocessing.get_context("spawn")
+                with contexto.Pool(procesos) as pool:
+                    for parcial in pool.starmap(_proceso, [args + (i,) for i in range(procesos)]):
+                        total.sumar(parcial)
+        finally:
+            detener.set()
+            if fondo:
+                fondo_hilo.join()
+        total.sumar(de_fondo)
+        duracion_real = time.perf_counter() - inicio
+
+        _verificar(almacen, total, precarga)
+        return ResultadoCarga(
+            duracion_real, total, semilla, almacen.directorio if conservar else None
+        )
+    finally:
+        if not conservar:
+            shutil.rmtree(almacen.directorio, ignore_errors=True)
@@ -0,0 +1,197 @@
+# services/cifrado_services.py
+"""
+Migración de bases existentes al cifrado de campos (y de vuelta) y medición
+de su costo frente a guardar en claro. Ver repository/cifrado.py.
+"""
+import itertools
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from database.conexion import transaccion
+from models.contacto import Contacto, dominio_email
+from models.telefono import claves_telefono
+from repository.cifrado import Cifrador, ClaveFija
+from repository.consulta import AHORA_SQL, Consulta
+from repository.contacto_repository import ContactoRepository
+from services.db_services import init_schema
+
+__all__ = ["cifrar_existentes", "descifrar_existentes", "medir_cifrado", "MedicionCifrado"]
+
+# Filas por transacción al migrar
+LOTE_MIGRACION = 1000
+
+# Páginas de 200 filas que medir_cifrado recorre dos veces (entran en el caché)
+PAGINAS_MEDIDAS = 25
+
+_ACTUALIZAR = (
+    "UPDATE contactos SET telefono = ?, email = ?, telefono_canonico = ?, telefono_invertido = ?, "
+    f"email_dominio = ?, telefono_indice = ?, email_indice = ?, modificado = {AHORA_SQL} WHERE id = ?"
+)
+
+
+def _migrar(db_path, pendientes: str, convertir: Callable, lote: int) -> int:
+    """Reescribe de a `lote` filas (bajas incluidas) las que cumplen `pendientes`."""
+    migradas = 0
+    ultimo = 0
+    while True:
+        with transaccion(db_path) as conn:
+            filas = conn.execute(
+                "SELECT id, telefono, email FROM contactos "
+                f"WHERE id > ? AND ({pendientes}) ORDER BY id LIMIT ?",
+                (ultimo, lote),
+            ).fetchall()
+            conn.executemany(
+                _ACTUALIZAR,
+                [convertir(telefono, email) + (contacto_id,) for contacto_id, telefono, email in filas],
+            )
+        if not filas:
+            return migradas
+        migradas += len(filas)
+        ultimo = filas[-1][0]
+
+
+def cifrar_existentes(cifrador: Cifrador, db_path: Optional[str] = None, lote: int = LOTE_MIGRACION) -> int:
+    """
+    Cifra telefono/email de las filas que todavía están en claro (sin índice
+    ciego) y completa sus índices. Se puede interrumpir y volver a ejecutar;
+    mientras tanto el repositorio lee las filas en claro tal cual. Cada fila
+    reescrita cuenta como modificación en el registro de cambios, así los
+    espejos y los respaldos incrementales reciben la versión cifrada.
+    Retorna las filas cifradas.
+    """
+
+    def convertir(telefono: str, email: str) -> Tuple:
+        telefono = cifrador.descifrar(telefono, "telefono")
+        email = cifrador.descifrar(email, "email")
+        return (
+            cifrador.cifrar(telefono, "telefono"),
+            cifrador.cifrar(email, "email"),
+            "",
+            "",
+            dominio_email(email),
+            cifrador.indice("telefono", telefono),
+            cifrador.indice("email", email),
+        )
+
+    return _migrar(db_path, "telefono_indice IS NULL OR email_indice IS NULL", convertir, lote)
+
+
+def descifrar_existentes(cifrador: Cifrador, db_path: Optional[str] = None, lote: int = LOTE_MIGRACION) -> int:
+    """Vuelve a guardar en claro las filas cifradas (para apagar CIFRADO_CAMPOS). Retorna cuántas."""
+
+    def convertir(telefono: str, email: str) -> Tuple:
+        telefono = cifrador.descifrar(telefono, "telefono")
+        email = cifrador.descifrar(email, "email")
+        return (telefono, email) + claves_telefono(telefono) + (dominio_email(email), None, None)
+
+    return _migrar(db_path, "telefono_indice IS NOT NULL OR email_indice IS NOT NULL", convertir, lote)
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+@dataclass
+class MedicionCifrado:
+    """Milisegundos por operación en claro y cifrado, y el uso del caché."""
+
+    contactos: int
+    tiempos: List[Tuple[str, float, float]] = field(default_factory=list)
+    cache: Optional[object] = None
+    coinciden: bool = False  # ambas bases devuelven los mismos contactos
+
+    def reporte(self) -> str:
+        lineas = [
+            f"Cifrado de campos: {self.contactos} contactos",
+            f"  {'operación':<34} {'en claro':>10} {'cifrado':>10} {'costo':>8}",
+        ]
+        for nombre, plano, cifrado in self.tiempos:
+            costo = f"{100 * (cifrado - plano) / plano:+.0f}%" if plano else "-"
+            lineas.append(f"  {nombre:<34} {plano:>8.2f}ms {cifrado:>8.2f}ms {costo:>8}")
+        if self.cache:
+            lineas.append(
+                f"  caché de descifrado: {self.cache.hits} aciertos, {self.cache.misses} fallos"
+            )
+        lineas.append(f"  resultados iguales en claro y cifrado: {'sí' if self.coinciden else 'NO'}")
+        return "\n".join(lineas)
+
+
+def _cronometrar(funcion: Callable[[], object]) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _recorrer_paginas(repo: ContactoRepository, paginas: Optional[int] = None, tamano: int = 200) -> int:
+    """La grilla ordenada por apellido, página a página (como al desplazarse)."""
+    clave = None
+    leidos = 0
+    for _ in itertools.repeat(None) if paginas is None else range(paginas):
+        pagina = repo.listar_pagina("apellido", False, tamano, despues_de=clave)
+        if not pagina:
+            break
+        leidos += len(pagina)
+        clave = (pagina[-1].apellido, pagina[-1].id)
+    return leidos
+
+
+def medir_cifrado(cantidad: int = 20_000, semilla: int = 0) -> MedicionCifrado:
+    """
+    Carga los mismos `cantidad` contactos en dos bases temporales, una en
+    claro y otra cifrada, y mide las operaciones de la grilla y las
+    búsquedas. Las primeras PAGINAS_MEDIDAS páginas se recorren en frío
+    (caché de descifrado vacío) y otra vez, como al volver a desplazarse por
+    ellas, con el caché lleno; la grilla completa puede no entrar en el caché.
+    """
+    rnd = random.Random(semilla)
+    contactos = [
+        Contacto(
+            i,
+            f"Nombre{rnd.randrange(5000)}",
+            f"Apellido{rnd.randrange(5000)}",
+            f"11 {rnd.randrange(10**7, 10**8)}",
+            f"usuario{i}@dominio{rnd.randrange(50)}.com",
+        )
+        for i in range(1, cantidad + 1)
+    ]
+    muestra = rnd.sample(contactos, min(500, cantidad))
+    cifrador = Cifrador(ClaveFija(os.urandom(32)))
+    resultado = MedicionCifrado(cantidad)
+
+    with tempfile.TemporaryDirectory(prefix="cifrado_") as directorio:
+        repos = []
+        for nombre, con in (("claro", False), ("cifrado", cifrador)):
+            ruta = os.path.join(directorio, f"{nombre}.db")
+            init_schema(db_path=ruta)
+            repos.append(ContactoRepository(ruta, cifrador=con))
+        plano, cifrado = repos
+
+        def medir(nombre: str, operacion: Callable[[ContactoRepository], object]):
+            tiempos = [_cronometrar(lambda r=r: operacion(r)) for r in repos]
+            resultado.tiempos.append((nombre, tiempos[0], tiempos[1]))
+
+        medir("alta en lote (restablecer)", lambda r: r.restablecer(contactos))
+        medir("recorrer toda la grilla", _recorrer_paginas)
+        cifrador.descifrar.cache_clear()
+        paginas = lambda r: _recorrer_paginas(r, PAGINAS_MEDIDAS)
+        medir(f"{PAGINAS_MEDIDAS} páginas (frío)", paginas)
+        medir(f"{PAGINAS_MEDIDAS} páginas (de nuevo, caché)", paginas)
+        medir(
+            "leer por id (x500)",
+            lambda r: [r.obtener_por_id(c.id) for c in muestra],
+        )
+        medir(
+            "igualdad por email (x500)",
+            lambda r: [r.consultar(Consulta().donde(email=c.email)) for c in muestra],
+        )
+        medir(
+            "igualdad por teléfono (x500)",
+            lambda r: [r.buscar_por_telefono(c.telefono) for c in muestra],
+        )
+        resultado.cache = cifrador.descifrar.cache_info()
+
+        resultado.coinciden = plano.obtener_todos() == cifrado.obtener_todos()
+    return resultado
@@ -0,0 +1,441 @@
+# services/conformidad_services.py
+"""
+Conformidad entre motores de RepositorioContactos (repository/interfaz.py).
+
+Aplica la misma secuencia aleatoria (reproducible con la semilla) de altas,
+modificaciones, bajas, restauraciones, operaciones en lote, etiquetas,
+lecturas, consultas (filtros, búsqueda, orden, proyección, keyset, límite y
+desplazamiento) y recorridos de páginas a cada motor, sobre bases
+temporales, y compara lo que responde cada uno con lo que responde el
+primero. Cada tanto, y al final, compara además el estado completo
+(todos los contactos, bajas, etiquetas, páginas en cada orden, inválidos) y
+lo que calculan sobre cada motor las estadísticas y la auditoría de calidad,
+que leen las bases del repositorio o, si no tiene (memoria), el repositorio.
+
+Es la prueba que tiene que pasar un motor nuevo para reemplazar a SQLite:
+
+    python cli.py conformidad --operaciones 2000
+    python cli.py conformidad --motores sqlite memoria particionado
+
+Las marcas de tiempo (creado, modificado, baja) no se comparan por valor:
+dos motores no escriben en el mismo milisegundo. Se corre una vez con baja
+lógica y otra sin ella. También informa cuánto tardó cada motor en total.
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.contacto import Contacto
+from repository.consulta import CAMPOS, ESTADOS, ClausulaEtiquetas, Consulta
+from repository.contacto_repository import ContactoRepository
+from repository.interfaz import ORDENABLES, RepositorioContactos, clave_orden
+from repository.memoria_repository import ContactoRepositoryMemoria
+from repository.particionado_repository import ContactoRepositoryParticionado, rutas_shards
+from services.calidad_services import AuditoriaCalidad
+from services.carga_services import contacto_aleatorio
+from services.db_services import init_schema
+from services.estadisticas_services import EstadisticasService
+
+__all__ = ["MOTORES", "ResultadoConformidad", "verificar_conformidad"]
+
+# Motores que se pueden comparar; el primero de la lista es la referencia
+MOTORES = ("sqlite", "memoria", "particionado")
+
+# Peso relativo de cada operación
+MEZCLA = {
+    "alta": 20,
+    "alta_lote": 2,
+    "modificar": 12,
+    "baja": 6,
+    "baja_lote": 2,
+    "restaurar": 3,
+    "actualizar_lote": 2,
+    "dominio": 2,
+    "restablecer": 2,
+    "etiquetar": 6,
+    "desetiquetar": 3,
+    "eliminar_etiqueta": 1,
+    "leer": 8,
+    "consulta": 25,
+    "pagina": 6,
+    "buscar": 6,
+}
+
+# Columnas que se comparan por valor (las marcas de tiempo dependen del reloj)
+COMPARABLES = tuple(c for c in CAMPOS if c not in ("baja", "creado", "modificado"))
+ORDENES = ORDENABLES + ("email_dominio", "telefono_canonico")
+ETIQUETAS = ("cliente", "vip", "Socio", "moroso", "proveedor")
+COMPARAR_ESTADO_CADA = 200  # operaciones entre comparaciones del estado completo
+MAX_DIFERENCIAS = 50  # detalles que se guardan (se cuentan todas)
+
+
+@dataclass
+class Motor:
+    nombre: str
+    repo: RepositorioContactos
+    segundos: float = 0.0
+
+
+@dataclass
+class ResultadoConformidad:
+    motores: List[str]
+    semilla: int
+    operaciones: int = 0
+    comprobaciones: int = 0
+    diferencias: int = 0
+    detalles: List[str] = field(default_factory=list)
+    segundos: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.diferencias == 0
+
+    def reporte(self) -> str:
+        lineas = [
+            f"Conformidad de {', '.join(self.motores)} (referencia: {self.motores[0]}) · "
+            f"semilla {self.semilla}",
+            f"  {self.operaciones} operaciones, {self.comprobaciones} comprobaciones",
+            "",
+            f"  {'motor':<14}{'segundos':>10}{'vs. ref.':>10}",
+        ]
+        referencia = self.segundos.get(self.motores[0]) or 0
+        for nombre in self.motores:
+            segundos = self.segundos.get(nombre, 0.0)
+            relativo = f"{referencia / segundos:.1f}x" if segundos else "-"
+            lineas.append(f"  {nombre:<14}{segundos:>10.2f}{relativo:>10}")
+        lineas.append("")
+        if self.diferencias:
+            lineas.append(f"Diferencias: {self.diferencias}")
+            lineas += [f"  - {d}" for d in self.detalles[:20]]
+        else:
+            lineas.append("Diferencias: ninguna")
+        return "\n".join(lineas)
+
+
+def _crear_motor(nombre: str, directorio: str, baja_logica: bool) -> Motor:
+    os.makedirs(directorio, exist_ok=True)
+    if nombre == "memoria":
+        return Motor(nombre, ContactoRepositoryMemoria(baja_logica=baja_logica))
+    if nombre == "sqlite":
+        ruta = f"{directorio}/contactos.db"
+        init_schema(db_path=ruta)
+        return Motor(nombre, ContactoRepository(ruta, baja_logica, cifrador=False))
+    if nombre == "particionado":
+        rutas = rutas_shards(3, f"{directorio}/shards")
+        return Motor(nombre, ContactoRepositoryParticionado(rutas, baja_logica=baja_logica))
+    raise ValueError(f"Motor desconocido: {nombre!r} (usar {', '.join(MOTORES)})")
+
+
+def _contacto(rnd: random.Random, marca: str) -> Contacto:
+    """Un contacto aleatorio; uno de cada diez no pasa la validación (para solo_invalidos)."""
+    contacto = contacto_aleatorio(rnd, marca)
+    if rnd.random() < 0.1:
+        campo = rnd.choice(("telefono", "email", "apellido"))
+        setattr(contacto, campo, rnd.choice(("", "x", "sin arroba")))
+    return contacto
+
+
+class _Escenario:
+    """Genera operaciones al azar y las aplica a todos los motores."""
+
+    def __init__(self, motores: List[Motor], rnd: random.Random, resultado: ResultadoConformidad):
+        self.motores = motores
+        self.rnd = rnd
+        self.resultado = resultado
+        self.ultimo_id = 0
+        self.marcas = 0
+
+    # ------------------------------------------------------------------
+    # Aplicar y comparar
+    # ------------------------------------------------------------------
+    def aplicar(self, descripcion: str, operacion: Callable[[RepositorioContactos], Any]) -> Any:
+        """Aplica `operacion` en cada motor, compara con la referencia y devuelve la de la referencia."""
+        respuestas = []
+        for motor in self.motores:
+            inicio = time.perf_counter()
+            try:
+                respuesta = operacion(motor.repo)
+            except Exception as err:
+                respuesta = ("error", type(err).__name__)
+            motor.segundos += time.perf_counter() - inicio
+            respuestas.append(respuesta)
+        self.resultado.comprobaciones += 1
+        for motor, respuesta in zip(self.motores[1:], respuestas[1:]):
+            if respuesta != respuestas[0]:
+                self.resultado.diferencias += 1
+                if len(self.resultado.detalles) < MAX_DIFERENCIAS:
+                    self.resultado.detalles.append(
+                        f"{descripcion}: {self.motores[0].nombre} -> {_resumir(respuestas[0])}; "
+                        f"{motor.nombre} -> {_resumir(respuesta)}"
+                    )
+        return respuestas[0]
+
+    def _id(self) -> int:
+        """Un id que existe o existió (a veces uno que nunca existió)."""
+        if self.ultimo_id == 0 or self.rnd.random() < 0.05:
+            return self.ultimo_id + self.rnd.randint(1, 10)
+        return self.rnd.randint(1, self.ultimo_id)
+
+    def _ids(self, maximo: int = 30) -> List[int]:
+        return [self._id() for _ in range(self.rnd.randint(1, maximo))]
+
+    def _muestra(self) -> Contacto:
+        """Un contacto existente (de la referencia), para sacar valores de filtros y claves."""
+        for _ in range(5):
+            contacto = self.motores[0].repo.obtener_por_id(self._id())
+            if contacto:
+                return contacto
+        return contacto_aleatorio(self.rnd, "muestra")
+
+    def _nuevo(self) -> Contacto:
+        self.marcas += 1
+        return _contacto(self.rnd, f"c{self.marcas}")
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+    def operar(self, operacion: str) -> None:
+        rnd = self.rnd
+        if operacion == "alta":
+            nuevo = self._nuevo()
+            contacto_id = self.aplicar("agregar", lambda r: r.agregar(nuevo))
+            if isinstance(contacto_id, int):
+                self.ultimo_id = max(self.ultimo_id, contacto_id)
+        elif operacion == "alta_lote":
+            nuevos = [self._nuevo() for _ in range(rnd.randint(1, 40))]
+            agregados = self.aplicar("agregar_lote", lambda r: r.agregar_lote(nuevos))
+            if isinstance(agregados, int):
+                self.ultimo_id += agregados
+        elif operacion == "modificar":
+            otro = self._nuevo()
+            cambio = Contacto(
+                self._id(),
+                *(v if rnd.random() < 0.5 else "" for v in otro.to_tuple()),
+            )
+            self.aplicar(f"actualizar {cambio}", lambda r: r.actualizar(cambio))
+        elif operacion == "baja":
+            contacto = Contacto(self._id())
+            self.aplicar(f"eliminar {contacto.id}", lambda r: r.eliminar(contacto))
+        elif operacion == "baja_lote":
+            ids = self._ids()
+            self.aplicar(f"eliminar_lote {ids}", lambda r: r.eliminar_lote(ids))
+        elif operacion == "restaurar":
+            ids = self._ids()
+            self.aplicar(f"restaurar {ids}", lambda r: r.restaurar(ids))
+        elif operacion == "actualizar_lote":
+            ids, otro = self._ids(), self._nuevo()
+            campo = rnd.choice(("nombre", "apellido", "telefono", "email"))
+            campos = {campo: getattr(otro, campo)}
+            self.aplicar(f"actualizar_lote {ids} {campos}", lambda r: r.actualizar_lote(ids, campos))
+        elif operacion == "dominio":
+            ids = self._ids()
+            dominio = rnd.choice(("acme.com", "@nueva.com.ar", "sin-punto", "Mail.ORG"))
+            self.aplicar(
+                f"cambiar_dominio_email {ids} {dominio}", lambda r: r.cambiar_dominio_email(ids, dominio)
+            )
+        elif operacion == "restablecer":
+            imagenes = [
+                Contacto(self._id(), *self._nuevo().to_tuple()) for _ in range(rnd.randint(1, 5))
+            ]
+            imagenes = [c for c in imagenes if c.id <= self.ultimo_id]
+            self.aplicar(f"restablecer {imagenes}", lambda r: r.restablecer(imagenes))
+        elif operacion == "etiquetar":
+            ids, nombres = self._ids(), rnd.sample(ETIQUETAS, rnd.randint(1, 2))
+            if rnd.random() < 0.3:
+                nombres = [n.upper() for n in nombres]  # los nombres no distinguen mayúsculas
+            self.aplicar(f"etiquetar {ids} {nombres}", lambda r: r.etiquetar(ids, nombres))
+        elif operacion == "desetiquetar":
+            ids, nombres = self._ids(), rnd.sample(ETIQUETAS, rnd.randint(1, 2))
+            self.aplicar(f"desetiquetar {ids} {nombres}", lambda r: r.desetiquetar(ids, nombres))
+        elif operacion == "eliminar_etiqueta":
+            nombre = rnd.choice(ETIQUETAS)
+            self.aplicar(f"eliminar_etiqueta {nombre}", lambda r: r.eliminar_etiqueta(nombre))
+        elif operacion == "leer":
+            self._leer()
+        elif operacion == "consulta":
+            consulta = self._consulta()
+            self.aplicar(f"filas {consulta}", lambda r: r.filas(consulta))
+        elif operacion == "pagina":
+            self._paginas(rnd.choice(ORDENABLES), rnd.random() < 0.5)
+        elif operacion == "buscar":
+            self._buscar()
+
+    def _leer(self) -> None:
+        contacto_id, ids = self._id(), self._ids()
+        self.aplicar(f"obtener_por_id {contacto_id}", lambda r: r.obtener_por_id(contacto_id))
+        self.aplicar(f"obtener_por_ids {ids}", lambda r: r.obtener_por_ids(ids))
+        self.aplicar(f"etiquetas_de {contacto_id}", lambda r: r.etiquetas_de(contacto_id))
+
+    def _buscar(self) -> None:
+        rnd, muestra = self.rnd, self._muestra()
+        texto = rnd.choice((muestra.nombre, muestra.apellido, muestra.email, "%", "_", "\\"))
+        if texto:
+            desde = rnd.randrange(len(texto))
+            texto = texto[desde : desde + rnd.randint(1, 4)]
+            if rnd.random() < 0.3:
+                texto = texto.swapcase()
+        limite = rnd.choice((None, 5))
+        self.aplicar(f"buscar {texto!r}", lambda r: r.buscar(texto, limite))
+        dominio = muestra.email.partition("@")[2] or "acme.com"
+        self.aplicar(f"buscar_por_dominio {dominio}", lambda r: r.buscar_por_dominio(dominio, limite))
+        self.aplicar(
+            f"buscar_por_telefono {muestra.telefono}", lambda r: r.buscar_por_telefono(muestra.telefono)
+        )
+        digitos = "".join(ch for ch in muestra.telefono if ch.isdigit())[-rnd.randint(1, 8):]
+        self.aplicar(
+            f"buscar_por_sufijo_telefono {digitos}",
+            lambda r: r.buscar_por_sufijo_telefono(digitos, limite),
+        )
+        etiquetas = rnd.sample(ETIQUETAS, 3)
+        self.aplicar(
+            f"buscar_por_etiquetas {etiquetas}",
+            lambda r: r.buscar_por_etiquetas(etiquetas[:1], etiquetas[1:2], etiquetas[2:], limite),
+        )
+
+    def _consulta(self) -> Consulta:
+        rnd, muestra = self.rnd, self._muestra()
+        consulta = Consulta().con_estado(rnd.choice(ESTADOS))
+        filtros = [
+            lambda c: c.filtrar("nombre", "contiene", muestra.nombre[: rnd.randint(1, 3)]),
+            lambda c: c.filtrar("apellido", "empieza", muestra.apellido[:2].lower()),
+            lambda c: c.donde(email_dominio=muestra.email.partition("@")[2]),
+            lambda c: c.filtrar("id", "rango", sorted((self._id(), self._id()))),
+            lambda c: c.filtrar("id", "en", self._ids()),
+            lambda c: c.filtrar("apellido", rnd.choice(("<", "<=", ">", ">=", "!=")), muestra.apellido),
+            lambda c: c.filtrar("telefono_canonico", rnd.choice(("=", "!=")), ""),
+            lambda c: c.filtrar("email_dominio", "en", ("acme.com", "mail.org", "gmail.com")),
+        ]
+        for filtro in rnd.sample(filtros, rnd.randint(0, 2)):
+            consulta = filtro(consulta)
+        if rnd.random() < 0.3:
+            campos = rnd.sample(("nombre", "apellido", "telefono", "email"), rnd.randint(1, 4))
+            consulta = consulta.buscar(muestra.nombre[:2].upper(), campos)
+        if rnd.random() < 0.3:
+            clausulas = [
+                ClausulaEtiquetas(tuple(rnd.sample(ETIQUETAS, rnd.randint(1, 2))), rnd.random() < 0.4)
+                for _ in range(rnd.randint(1, 2))
+            ]
+            consulta = consulta.con_clausulas(clausulas)
+        orden = rnd.choice(ORDENES)
+        consulta = consulta.ordenar_por(orden, rnd.random() < 0.5)
+        if rnd.random() < 0.4:
+            valor = getattr(muestra, orden, None)
+            if valor is None:
+                valor = self.motores[0].repo.filas(Consulta().seleccionar(orden).donde(id=muestra.id))
+                valor = valor[0][0] if valor else ""
+            consulta = consulta.despues((valor, muestra.id))
+        columnas = rnd.sample(COMPARABLES, rnd.randint(1, 5))
+        consulta = consulta.seleccionar(*columnas)
+        if rnd.random() < 0.6:
+            consulta = consulta.limitar(rnd.randint(1, 30), rnd.choice((0, 0, rnd.randint(1, 20))))
+        return consulta
+
+    def _paginas(self, orden: str, descendente: bool, invalidos: bool = False) -> None:
+        """Recorre la grilla en páginas hacia adelante y vuelve una página hacia atrás."""
+        limite = self.rnd.randint(3, 40)
+        clave = None
+        for numero in range(1000):
+            pagina = self.aplicar(
+                f"listar_pagina {orden} desc={descendente} invalidos={invalidos} n.{numero}",
+                lambda r: r.listar_pagina(
+                    orden, descendente, limite, despues_de=clave, solo_invalidos=invalidos
+                ),
+            )
+            if not isinstance(pagina, list) or len(pagina) < limite:
+                break
+            anterior, clave = clave, clave_orden(pagina[-1], orden)
+            if anterior is not None and self.rnd.random() < 0.2:
+                primera = clave_orden(pagina[0], orden)
+                self.aplicar(
+                    f"listar_pagina {orden} antes_de={primera}",
+                    lambda r: r.listar_pagina(orden, descendente, limite, antes_de=primera),
+                )
+
+    def comparar_estado(self) -> None:
+        """Compara todo lo que se puede leer de cada motor."""
+        self.aplicar("obtener_todos", lambda r: r.obtener_todos())
+        self.aplicar("obtener_bajas", lambda r: sorted(r.obtener_bajas(), key=lambda c: c.id))
+        self.aplicar(
+            "modificados_desde",
+            lambda r: sorted(
+                ((m.contacto.id, m.contacto, m.baja is None) for m in r.modificados_desde("2000-01-01")),
+                key=lambda t: t[0],
+            ),
+        )
+        self.aplicar("etiquetas", lambda r: r.etiquetas())
+        self.aplicar(
+            "iterar por apellido",
+            lambda r: list(r.iterar(Consulta().ordenar_por("apellido", True), lote=37)),
+        )
+        for orden in ORDENABLES:
+            self._paginas(orden, False)
+        self.aplicar("estadísticas", _estadisticas)
+        self.aplicar(
+            "auditoría de calidad",
+            lambda r: AuditoriaCalidad.para_repositorio(r).auditar().total_invalidos,
+        )
+        self.aplicar("resumen de calidad", lambda r: AuditoriaCalidad.para_repositorio(r).resumen())
+        self._paginas("id", False, invalidos=True)
+
+
+def _estadisticas(repo: RepositorioContactos) -> Dict[str, Any]:
+    """
+    Agregados de EstadisticasService sin los cortes por límite (los empates
+    pueden salir en otro orden) y, del crecimiento, solo el total de altas:
+    `creado` no coincide entre motores.
+    """
+    stats = EstadisticasService.para_repositorio(repo)
+    return {
+        "total": stats.total(),
+        "por_dominio": sorted(stats.por_dominio(None), key=repr),
+        "por_prefijo_telefono": sorted(stats.por_prefijo_telefono(4, None), key=repr),
+        "por_inicial": stats.por_inicial(),
+        "altas": sum(cantidad for _, cantidad in stats.por_periodo("dia")),
+    }
+
+
+def _resumir(respuesta: Any, largo: int = 300) -> str:
+    texto = repr(respuesta)
+    return texto if len(texto) <= largo else texto[:largo] + "..."
+
+
+def verificar_conformidad(
+    motores: Tuple[str, ...] = ("sqlite", "memoria"),
+    operaciones: int = 1000,
+    semilla: Optional[int] = None,
+) -> ResultadoConformidad:
+    """
+    Corre `operaciones` operaciones al azar (la mitad con baja lógica y la
+    mitad sin ella) sobre bases nuevas de cada uno de `motores` y compara las
+    respuestas con las del primero.
+    """
+    if len(motores) < 2:
+        raise ValueError("Se necesitan al menos dos motores para comparar")
+    semilla = random.randrange(1_000_000) if semilla is None else semilla
+    resultado = ResultadoConformidad(list(motores), semilla)
+    resultado.segundos = dict.fromkeys(motores, 0.0)
+    rnd = random.Random(semilla)
+    tipos, pesos = zip(*MEZCLA.items())
+    for baja_logica in (True, False):
+        directorio = tempfile.mkdtemp(prefix="conformidad_")
+        try:
+            instancias = [
+                _crear_motor(nombre, f"{directorio}/{k}", baja_logica)
+                for k, nombre in enumerate(motores)
+            ]
+            escenario = _Escenario(instancias, rnd, resultado)
+            for i in range(operaciones // 2):
+                escenario.operar(rnd.choices(tipos, pesos)[0])
+                resultado.operaciones += 1
+                if (i + 1) % COMPARAR_ESTADO_CADA == 0:
+                    escenario.comparar_estado()
+            escenario.comparar_estado()
+            for motor in instancias:
+                resultado.segundos[motor.nombre] += motor.segundos
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    return resultado
@@ -1,17 +1,191 @@
 # services/db_services.py
+import sqlite3
 from pathlib import Path
-from database.conexion import obtener_conexion, cerrar_conexion
+from config.settings import DB_MODO_DIARIO, SCHEMA_PATH
+from database.conexion import obtener_conexion, cerrar_conexion, transaccion
+from models.contacto import dominio_email
+from models.telefono import claves_telefono
+from repository.cifrado import cifrador_por_defecto
+from repository.consulta import AHORA_SQL
 
 __all__ = ["init_schema"]  # Export explícito para evitar ambigüedades
 
-def init_schema(schema_path: str = "database/schema.sql") -> None:
+# Columnas agregadas a `contactos` después de su versión inicial. Las bases
+# existentes las reciben con ALTER TABLE antes de ejecutar el schema (que ya
+# crea índices sobre ellas).
+_COLUMNAS_CONTACTOS = (
+    ("baja", "TEXT"),
+    ("telefono_canonico", "TEXT"),
+    ("telefono_invertido", "TEXT"),
+    ("email_dominio", "TEXT"),
+    ("creado", "TEXT"),
+    ("modificado", "TEXT"),
+    ("telefono_indice", "TEXT"),
+    ("email_indice", "TEXT"),
+)
+
+# Filas por transacción al rellenar columnas derivadas
+LOTE_RELLENO = 1000
+
+# Marcas en `metadatos` de los rellenos ya terminados: init_schema corre en
+# cada arranque (GUI, cada comando de cli.py y cada shard) y no tiene que
+# volver a recorrer la tabla una vez migrada.
+RELLENO_TELEFONOS = "relleno_telefonos"
+RELLENO_DOMINIOS = "relleno_dominios"
+
+
+def _relleno_hecho(db_path: str, clave: str) -> bool:
+    conn = obtener_conexion(db_path)
+    try:
+        fila = conn.execute("SELECT 1 FROM metadatos WHERE clave = ?", (clave,)).fetchone()
+    finally:
+        cerrar_conexion(conn)
+    return fila is not None
+
+
+def _marcar_relleno(conn, clave: str) -> None:
+    conn.execute(
+        f"INSERT OR IGNORE INTO metadatos (clave, valor) VALUES (?, {AHORA_SQL})", (clave,)
+    )
+
+
+def _migrar_columnas(conn) -> None:
+    existentes = {row[1] for row in conn.execute("PRAGMA table_info(contactos)")}
+    if not existentes:
+        return  # tabla nueva: la crea el schema completa
+    for nombre, tipo in _COLUMNAS_CONTACTOS:
+        if nombre not in existentes:
+            conn.execute(f"ALTER TABLE contactos ADD COLUMN {nombre} {tipo}")
+    if "modificado" not in existentes:
+        _rellenar_marcas_tiempo(conn)
+
+
+def _rellenar_marcas_tiempo(conn) -> None:
+    """
+    Al agregar creado/modificado, los estima con el registro de cambios (el
+    primer y el último momento de cada contacto que todavía figure en él).
+    Las filas sin historial quedan en NULL: no cambiaron desde entonces.
+    """
+    hay_registro = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contactos_cambios'"
+    ).fetchone()
+    if not hay_registro:
+        return
+    conn.execute(
+        "UPDATE contactos SET "
+        "creado = (SELECT min(momento) FROM contactos_cambios WHERE contacto_id = contactos.id), "
+        "modificado = (SELECT max(momento) FROM contactos_cambios WHERE contacto_id = contactos.id)"
+    )
+
+
+def _rellenar_telefonos(db_path: str = None, lote: int = LOTE_RELLENO) -> int:
+    """
+    Calcula telefono_canonico/telefono_invertido de las filas que no los
+    tienen (bases anteriores a esas columnas), de a `lote` filas por
+    transacción. Al terminar deja la marca RELLENO_TELEFONOS y las próximas
+    llamadas no hacen nada; si se corta a mitad, la siguiente sigue. Con
+    CIFRADO_CAMPOS las columnas quedan vacías, como las escribe el repositorio.
+    Retorna las filas rellenadas.
+    """
+    if _relleno_hecho(db_path, RELLENO_TELEFONOS):
+        return 0
+    cifrado = cifrador_por_defecto() is not None
+    rellenadas = 0
+    ultimo = 0
+    while True:
+        with transaccion(db_path) as conn:
+            filas = conn.execute(
+                "SELECT id, telefono FROM contactos "
+                "WHERE id > ? AND telefono_canonico IS NULL ORDER BY id LIMIT ?",
+                (ultimo, lote),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE contactos SET telefono_canonico = ?, telefono_invertido = ? WHERE id = ?",
+                [
+                    (("", "") if cifrado else claves_telefono(telefono)) + (contacto_id,)
+                    for contacto_id, telefono in filas
+                ],
+            )
+            if not filas:
+                _marcar_relleno(conn, RELLENO_TELEFONOS)
+        if not filas:
+            return rellenadas
+        rellenadas += len(filas)
+        ultimo = filas[-1][0]
+
+
+def _rellenar_dominios(db_path: str = None, lote: int = LOTE_RELLENO) -> int:
+    """
+    Igual que `_rellenar_telefonos` para email_dominio (marca RELLENO_DOMINIOS).
+    El dominio se calcula en Python con dominio_email, como al escribir, sobre
+    el email descifrado si CIFRADO_CAMPOS está activo.
+    """
+    if _relleno_hecho(db_path, RELLENO_DOMINIOS):
+        return 0
+    cifrador = cifrador_por_defecto()
+    rellenadas = 0
+    ultimo = 0
+    while True:
+        with transaccion(db_path) as conn:
+            filas = conn.execute(
+                "SELECT id, email FROM contactos "
+                "WHERE id > ? AND email_dominio IS NULL ORDER BY id LIMIT ?",
+                (ultimo, lote),
+            ).fetchall()
+            dominios = []
+            for contacto_id, email in filas:
+                if cifrador:
+                    email = cifrador.descifrar(email, "email")
+                dominios.append((dominio_email(email), contacto_id))
+            conn.executemany("UPDATE contactos SET email_dominio = ? WHERE id = ?", dominios)
+            if not filas:
+                _marcar_relleno(conn, RELLENO_DOMINIOS)
+        if not filas:
+            return rellenadas
+        rellenadas += len(filas)
+        ultimo = filas[-1][0]
+
+
+def _sentencias(sql: str):
+    """Divide un script en sentencias completas (los triggers llevan ';' dentro)."""
+    actual = ""
+    for linea in sql.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            yield actual
+            actual = ""
+    if actual.strip():
+        yield actual
+
+
+def init_schema(schema_path: str = SCHEMA_PATH, db_path: str = None) -> None:
 
     #Ejecuta el DDL (CREATE TABLE IF NOT EXISTS ...) para que la tabla exista.
+    #También (re)instala los triggers que alimentan el registro de cambios.
+    #Todo en una transacción: varios procesos pueden arrancar a la vez sin
+    #pisarse (p. ej. uno recreando un trigger mientras otro lo crea).
+
+    conn = obtener_conexion(db_path)
+    try:
+        # Solo tiene efecto en una base nueva (antes de crear tablas, fuera de
+        # una transacción); permite que la purga de bajas devuelva espacio con
+        # incremental_vacuum.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    finally:
+        cerrar_conexion(conn)
+
+    sql = Path(schema_path).read_text(encoding="utf-8")
+    with transaccion(db_path) as conn:
+        _migrar_columnas(conn)
+        for sentencia in _sentencias(sql):
+            conn.execute(sentencia)
 
-    conn = obtener_conexion()
+    conn = obtener_conexion(db_path)
     try:
-        sql = Path(schema_path).read_text(encoding="utf-8")
-        conn.executescript(sql)
-        conn.commit()
+        # Persistente en el archivo: con WAL los lectores (GUI, reportes) no
+        # bloquean a los escritores de otros procesos
+        conn.execute(f"PRAGMA journal_mode = {DB_MODO_DIARIO}").fetchone()
     finally:
         cerrar_conexion(conn)
+    _rellenar_telefonos(db_path)
+    _rellenar_dominios(db_path)
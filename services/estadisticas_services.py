@@ -0,0 +1,200 @@
+# services/estadisticas_services.py
+"""
+Estadísticas de contactos calculadas en SQL (COUNT/GROUP BY) en lugar de
+cargar todas las filas en Python.
+
+Los resultados se guardan en caché junto con la versión de la base: el último
+seq del registro de cambios (contactos_cambios), que avanza con cada alta,
+modificación o baja, venga de este proceso o de otro. Consultar la versión es
+una lectura de una fila de sqlite_sequence, así que mientras nadie escriba los
+refrescos del tablero no vuelven a recorrer la tabla.
+
+Un motor sin archivos (REPOSITORIO_MOTOR = "memoria") no tiene SQL ni
+registro de cambios: ahí cada agregado es la misma Consulta resuelta por el
+repositorio y agrupada en Python, sin caché.
+"""
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.conexion import obtener_conexion, cerrar_conexion
+from repository.consulta import Consulta
+from repository.interfaz import rutas_de
+
+__all__ = ["EstadisticasService", "PERIODOS"]
+
+_SQL_VERSION = "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+
+# Largo del prefijo de `creado` ("2025-03-14 ...") que define cada período
+PERIODOS = {"dia": 10, "mes": 7}
+
+
+def _inicial(apellido: Optional[str]) -> Optional[str]:
+    """upper(substr(apellido, 1, 1)) de SQLite: solo pasa a mayúsculas las letras ASCII."""
+    if apellido is None:
+        return None
+    inicial = apellido[:1]
+    return inicial.upper() if inicial.isascii() else inicial
+
+
+class EstadisticasService:
+    """
+    Agregados sobre los contactos activos de una o varias bases (shards).
+    Cada método cachea su resultado hasta que cambia la versión de la base.
+    """
+
+    def __init__(self, rutas: Optional[List[str]] = None, repo=None):
+        # None = la base por defecto (DB_PATH); sin bases, se consulta `repo`
+        self.rutas = [None] if rutas is None else list(rutas)
+        self.repo = repo
+        self._cache: Dict[Tuple, Tuple[Tuple, object]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def para_repositorio(cls, repo) -> "EstadisticasService":
+        """Servicio sobre las mismas bases que usa el repositorio (o sobre él, si no tiene)."""
+        rutas = rutas_de(repo)
+        return cls(rutas) if rutas else cls([], repo)
+
+    # ------------------------------------------------------------------
+    # Caché
+    # ------------------------------------------------------------------
+    def version(self) -> Tuple[int, ...]:
+        """Último seq de cambios de cada base (cambia con cada escritura)."""
+        versiones = []
+        for ruta in self.rutas:
+            conn = obtener_conexion(ruta)
+            try:
+                row = conn.execute(_SQL_VERSION).fetchone()
+            finally:
+                cerrar_conexion(conn)
+            versiones.append(row[0] if row else 0)
+        return tuple(versiones)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _cacheado(self, clave: Tuple, calcular: Callable[[], object]):
+        if not self.rutas:
+            return calcular()  # motor sin registro de cambios: no hay versión
+        version = self.version()
+        with self._lock:
+            entrada = self._cache.get(clave)
+            if entrada and entrada[0] == version:
+                return entrada[1]
+        valor = calcular()
+        with self._lock:
+            self._cache[clave] = (version, valor)
+        return valor
+
+    def _contar(
+        self,
+        query: str,
+        params: tuple = (),
+        consulta: Optional[Consulta] = None,
+        clave: Callable[[Any], Any] = lambda valor: valor,
+    ) -> Counter:
+        """
+        Ejecuta un GROUP BY (clave, cantidad) en cada base y suma los parciales.
+        Sin bases, agrupa por `clave` la única columna de `consulta` en el repositorio.
+        """
+        total: Counter = Counter()
+        if not self.rutas:
+            for (valor,) in self.repo.filas(consulta):
+                total[clave(valor)] += 1
+            return total
+        for ruta in self.rutas:
+            conn = obtener_conexion(ruta)
+            try:
+                for valor, cantidad in conn.execute(query, params):
+                    total[valor] += cantidad
+            finally:
+                cerrar_conexion(conn)
+        return total
+
+    # ------------------------------------------------------------------
+    # Agregados
+    # ------------------------------------------------------------------
+    def total(self) -> int:
+        """Cantidad de contactos activos (recorre el índice parcial de activos)."""
+        query = "SELECT 1, COUNT(*) FROM contactos WHERE baja IS NULL"
+        consulta = Consulta().seleccionar("id")
+        return self._cacheado(
+            ("total",), lambda: self._contar(query, (), consulta, lambda _: 1)[1]
+        )
+
+    def por_dominio(self, limite: int = 20) -> List[Tuple[str, int]]:
+        """Dominios de email más frecuentes (GROUP BY sobre el índice de email_dominio)."""
+        query = (
+            "SELECT email_dominio, COUNT(*) FROM contactos "
+            "WHERE baja IS NULL GROUP BY email_dominio"
+        )
+        consulta = Consulta().seleccionar("email_dominio")
+        return self._cacheado(
+            ("dominio", limite), lambda: self._contar(query, (), consulta).most_common(limite)
+        )
+
+    def por_prefijo_telefono(self, digitos: int = 4, limite: int = 20) -> List[Tuple[str, int]]:
+        """
+        Prefijos más frecuentes del teléfono canónico ('+' y código de país
+        incluidos: con 4 dígitos, "+5411" agrupa Argentina / AMBA).
+        """
+        query = (
+            "SELECT substr(telefono_canonico, 1, ? + 1), COUNT(*) FROM contactos "
+            "WHERE baja IS NULL AND telefono_canonico <> '' GROUP BY 1"
+        )
+        consulta = (
+            Consulta()
+            .seleccionar("telefono_canonico")
+            .filtrar("telefono_canonico", "!=", "")
+        )
+        return self._cacheado(
+            ("prefijo", digitos, limite),
+            lambda: self._contar(
+                query, (digitos,), consulta, lambda t: t[: digitos + 1]
+            ).most_common(limite),
+        )
+
+    def por_inicial(self) -> List[Tuple[str, int]]:
+        """Cantidad de contactos por inicial del apellido, en orden alfabético."""
+        query = (
+            "SELECT upper(substr(apellido, 1, 1)), COUNT(*) FROM contactos "
+            "WHERE baja IS NULL GROUP BY 1"
+        )
+        consulta = Consulta().seleccionar("apellido")
+        return self._cacheado(
+            ("inicial",),
+            lambda: sorted(self._contar(query, (), consulta, _inicial).items()),
+        )
+
+    def por_periodo(
+        self, periodo: str = "mes", limite: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Crecimiento: contactos activos dados de alta en cada día o mes (según
+        `creado`, en UTC), en orden cronológico; con `limite`, los últimos.
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: {periodo!r} (usar {', '.join(PERIODOS)})")
+        largo = PERIODOS[periodo]
+        query = (
+            "SELECT substr(creado, 1, ?), COUNT(*) FROM contactos "
+            "WHERE baja IS NULL AND creado IS NOT NULL GROUP BY 1"
+        )
+        consulta = Consulta().seleccionar("creado").filtrar("creado", "no_nulo")
+
+        def calcular():
+            filas = sorted(self._contar(query, (largo,), consulta, lambda c: c[:largo]).items())
+            return filas[-limite:] if limite else filas
+
+        return self._cacheado(("periodo", periodo, limite), calcular)
+
+    def resumen(self) -> Dict[str, object]:
+        return {
+            "total": self.total(),
+            "por_dominio": self.por_dominio(),
+            "por_prefijo_telefono": self.por_prefijo_telefono(),
+            "por_inicial": self.por_inicial(),
+            "por_mes": self.por_periodo("mes"),
+        }
@@ -0,0 +1,21 @@
+# services/exportacion_services.py
+import csv
+from typing import Iterable
+
+from models.contacto import Contacto
+
+__all__ = ["exportar_csv"]
+
+ENCABEZADOS = ("id", "nombre", "apellido", "telefono", "email")
+
+
+def exportar_csv(contactos: Iterable[Contacto], destino: str) -> int:
+    """Escribe los contactos en un CSV (UTF-8 con BOM, para Excel). Retorna cuántos."""
+    n = 0
+    with open(destino, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(ENCABEZADOS)
+        for c in contactos:
+            writer.writerow((c.id, c.nombre, c.apellido, c.telefono, c.email))
+            n += 1
+    return n
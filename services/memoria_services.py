@@ -0,0 +1,146 @@
+# services/memoria_services.py
+"""
+Reporte de memoria de los listados masivos de contactos.
+
+Mide con tracemalloc lo que retiene en memoria la lista de todos los
+contactos, de tres formas:
+
+- "dataclass con __dict__": el Contacto de antes (sin slots) y un str por
+  valor leído, como lo armaba from_row;
+- "slots": el Contacto actual, sin compartir valores;
+- "slots + internado": obtener_todos(), que además comparte los valores
+  repetidos de nombre y apellido (repository/diccionario.py).
+
+También mide el pico de memoria de recorrer los mismos contactos con
+iterar(), que nunca tiene más de una página cargada.
+"""
+import os
+import random
+import tempfile
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.contacto import Contacto
+from repository.consulta import Consulta
+from repository.contacto_repository import ContactoRepository
+from repository.diccionario import Internador
+from services.db_services import init_schema
+
+__all__ = ["MedicionMemoria", "medir_memoria", "medir_memoria_sintetica"]
+
+
+@dataclass
+class _ContactoConDict:
+    """El Contacto sin slots (cada instancia con su __dict__), como referencia."""
+
+    id: Optional[int] = None
+    nombre: str = ""
+    apellido: str = ""
+    telefono: str = ""
+    email: str = ""
+
+    __post_init__ = Contacto.__post_init__
+
+
+@dataclass
+class MedicionMemoria:
+    contactos: int
+    retenido: List[Tuple[str, int]] = field(default_factory=list)  # (forma, bytes)
+    picos: List[Tuple[str, int]] = field(default_factory=list)  # (lectura, bytes)
+    internado: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def reporte(self) -> str:
+        n = self.contactos or 1
+        base = self.retenido[0][1] if self.retenido else 0
+        lineas = [
+            f"Memoria de {self.contactos} contactos (tracemalloc)",
+            f"  {'lista retenida':<28} {'MB':>9} {'bytes/contacto':>15} {'vs. antes':>10}",
+        ]
+        for nombre, bytes_ in self.retenido:
+            relativo = f"{100 * bytes_ / base:.0f}%" if base else "-"
+            lineas.append(f"  {nombre:<28} {bytes_ / 2**20:>9.1f} {bytes_ / n:>15.0f} {relativo:>10}")
+        lineas.append(f"  {'pico al leer':<28} {'MB':>9}")
+        for nombre, bytes_ in self.picos:
+            lineas.append(f"  {nombre:<28} {bytes_ / 2**20:>9.1f}")
+        for campo, datos in self.internado.items():
+            lineas.append(
+                f"  internado {campo:<18} {datos['distintos']:>9} distintos en {datos['valores']} "
+                f"({datos['bytes_evitados'] / 2**20:.1f} MB de copias evitadas)"
+            )
+        return "\n".join(lineas)
+
+
+def _retenido(construir: Callable[[], object]) -> Tuple[object, int, int]:
+    """(resultado, bytes que siguen vivos al terminar, pico durante la construcción)."""
+    tracemalloc.start()
+    try:
+        resultado = construir()
+        actual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, actual, pico
+
+
+def _recorrer(iterador) -> int:
+    n = 0
+    for _ in iterador:
+        n += 1
+    return n
+
+
+def medir_memoria(repo) -> MedicionMemoria:
+    """Mide las lecturas masivas de `repo` (simple, particionado o espejo)."""
+    consulta = Consulta()
+
+    def antes():
+        return [_ContactoConDict(*fila) for fila in repo.filas(consulta)]
+
+    lista, con_dict, pico_antes = _retenido(antes)
+    del lista
+    lista, con_slots, _ = _retenido(lambda: [Contacto.from_row(f) for f in repo.filas(consulta)])
+    del lista
+    internador = Internador()
+    lista, internada, pico_todos = _retenido(lambda: repo.obtener_todos(internador))
+    resultado = MedicionMemoria(len(lista))
+    del lista
+    _, _, pico_iterar = _retenido(lambda: _recorrer(repo.iterar()))
+
+    resultado.retenido = [
+        ("dataclass con __dict__", con_dict),
+        ("slots", con_slots),
+        ("slots + internado", internada),
+    ]
+    resultado.picos = [
+        ("lista, como antes", pico_antes),
+        ("obtener_todos()", pico_todos),
+        ("iterar()", pico_iterar),
+    ]
+    resultado.internado = internador.resumen()
+    return resultado
+
+
+def medir_memoria_sintetica(cantidad: int = 200_000, semilla: int = 0) -> MedicionMemoria:
+    """
+    medir_memoria sobre una base temporal con `cantidad` contactos al azar,
+    con nombres y apellidos repetidos como en una agenda real (unos miles
+    de valores distintos) y teléfonos y emails únicos.
+    """
+    rnd = random.Random(semilla)
+    nombres = [f"Nombre{i}" for i in range(2000)]
+    apellidos = [f"Apellido{i}" for i in range(5000)]
+    with tempfile.TemporaryDirectory(prefix="memoria_") as directorio:
+        ruta = os.path.join(directorio, "contactos.db")
+        init_schema(db_path=ruta)
+        repo = ContactoRepository(ruta, cifrador=False)
+        repo.restablecer(
+            Contacto(
+                i,
+                rnd.choice(nombres),
+                rnd.choice(apellidos),
+                f"11 {rnd.randrange(10**7, 10**8)}",
+                f"usuario{i}@dominio{rnd.randrange(200)}.com",
+            )
+            for i in range(1, cantidad + 1)
+        )
+        return medir_memoria(repo)
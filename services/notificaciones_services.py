@@ -0,0 +1,92 @@
+# services/notificaciones_services.py
+"""
+Aviso de cambios entre procesos: qué contactos escribieron otras instancias
+de la GUI (u otros scripts) desde la última consulta.
+
+Cada VigilanteCambios mantiene una conexión abierta por base y le pregunta
+PRAGMA data_version, que SQLite incrementa cuando *otra* conexión confirma
+una escritura. Consultarlo no lee páginas de la base (en WAL alcanza con el
+índice en memoria compartida), así que sondear cada segundo no tiene costo
+medible. Solo cuando la versión cambió se lee el registro de cambios
+(contactos_cambios) desde el último seq visto, para saber qué ids se tocaron.
+Un motor sin archivos no tiene otras instancias que lo escriban: el vigilante
+queda sin bases y nunca avisa nada.
+"""
+from typing import List, Optional, Set
+
+from database.conexion import cerrar_conexion, obtener_conexion
+from repository.cambio_repository import CLAVE_COMPACTADO
+from repository.interfaz import rutas_de
+
+__all__ = ["VigilanteCambios"]
+
+_SQL_VERSION = "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+
+
+class VigilanteCambios:
+    """
+    Detecta escrituras de otras conexiones sobre una o varias bases (shards).
+    `pendientes()` retorna los ids tocados desde la llamada anterior.
+    """
+
+    def __init__(self, rutas: Optional[List[str]] = None):
+        # None = la base por defecto (DB_PATH); [] = ninguna (motor en memoria)
+        self.rutas = [None] if rutas is None else list(rutas)
+        self._conexiones = [obtener_conexion(ruta) for ruta in self.rutas]
+        self._versiones = [self._data_version(conn) for conn in self._conexiones]
+        self._seqs = [self._seq(conn) for conn in self._conexiones]
+        # Contadores: sondeos hechos y cuántos tuvieron que leer el registro
+        self.sondeos = 0
+        self.lecturas = 0
+
+    @classmethod
+    def para_repositorio(cls, repo) -> "VigilanteCambios":
+        """Vigilante sobre las mismas bases que usa el repositorio (ninguna si no tiene)."""
+        return cls(rutas_de(repo))
+
+    def cerrar(self) -> None:
+        for conn in self._conexiones:
+            cerrar_conexion(conn)
+        self._conexiones = []
+
+    @staticmethod
+    def _data_version(conn) -> int:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def _seq(conn) -> int:
+        row = conn.execute(_SQL_VERSION).fetchone()
+        return row[0] if row else 0
+
+    def pendientes(self) -> Optional[Set[int]]:
+        """
+        Ids de contactos dados de alta, modificados o dados de baja desde la
+        llamada anterior (vacío si nadie escribió). Retorna None si el registro
+        se compactó más allá de lo visto: no se puede saber qué cambió y hay
+        que releer todo.
+        """
+        self.sondeos += 1
+        tocados: Set[int] = set()
+        completo = True
+        for k, conn in enumerate(self._conexiones):
+            version = self._data_version(conn)
+            if version == self._versiones[k]:
+                continue
+            self._versiones[k] = version
+            self.lecturas += 1
+
+            desde = self._seqs[k]
+            compactado = conn.execute(
+                "SELECT valor FROM metadatos WHERE clave = ?", (CLAVE_COMPACTADO,)
+            ).fetchone()
+            if compactado and int(compactado[0]) > desde:
+                completo = False
+                self._seqs[k] = self._seq(conn)
+                continue
+            filas = conn.execute(
+                "SELECT contacto_id, seq FROM contactos_cambios WHERE seq > ?", (desde,)
+            ).fetchall()
+            for contacto_id, seq in filas:
+                tocados.add(contacto_id)
+                self._seqs[k] = max(self._seqs[k], seq)
+        return tocados if completo else None
@@ -0,0 +1,130 @@
+# services/purga_services.py
+"""
+Purga de bajas lógicas: borra físicamente los contactos dados de baja hace más
+de N días y devuelve el espacio libre al sistema de archivos con
+`PRAGMA incremental_vacuum`. Todo el trabajo se hace en tramos acotados por un
+presupuesto de tiempo, con una transacción corta por lote, para no bloquear a
+la GUI ni a otros escritores.
+"""
+import threading
+import time
+from typing import List, Optional
+
+from config.settings import (
+    PURGA_ANTIGUEDAD_DIAS,
+    PURGA_INTERVALO_SEGUNDOS,
+    PURGA_PRESUPUESTO_SEGUNDOS,
+)
+from database.conexion import obtener_conexion, cerrar_conexion, transaccion
+
+__all__ = [
+    "purgar_bajas",
+    "vacuum_incremental",
+    "habilitar_vacuum_incremental",
+    "PurgaPeriodica",
+]
+
+
+def purgar_bajas(
+    antiguedad_dias: float = PURGA_ANTIGUEDAD_DIAS,
+    presupuesto_segundos: float = PURGA_PRESUPUESTO_SEGUNDOS,
+    lote: int = 500,
+    db_path: Optional[str] = None,
+) -> int:
+    """
+    Borra bajas lógicas más antiguas que `antiguedad_dias`, de a `lote` filas,
+    hasta agotar el presupuesto de tiempo. Luego usa lo que quede del
+    presupuesto para compactar el archivo. Retorna las filas borradas.
+    """
+    limite = time.monotonic() + presupuesto_segundos
+    query = (
+        "DELETE FROM contactos WHERE id IN ("
+        "SELECT id FROM contactos WHERE baja IS NOT NULL "
+        "AND baja < strftime('%Y-%m-%d %H:%M:%f', 'now', ?) LIMIT ?)"
+    )
+    borradas = 0
+    while True:
+        with transaccion(db_path) as conn:
+            cursor = conn.execute(query, (f"-{antiguedad_dias} days", lote))
+        borradas += cursor.rowcount
+        if cursor.rowcount < lote or time.monotonic() >= limite:
+            break
+
+    restante = limite - time.monotonic()
+    if restante > 0:
+        vacuum_incremental(restante, db_path=db_path)
+    return borradas
+
+
+def vacuum_incremental(
+    presupuesto_segundos: float = PURGA_PRESUPUESTO_SEGUNDOS,
+    paginas_por_paso: int = 64,
+    db_path: Optional[str] = None,
+) -> int:
+    """
+    Devuelve páginas libres al sistema de archivos de a `paginas_por_paso`
+    hasta agotar el presupuesto. Requiere auto_vacuum = INCREMENTAL (ver
+    `habilitar_vacuum_incremental`); si no está activo no hace nada.
+    Retorna las páginas liberadas.
+    """
+    limite = time.monotonic() + presupuesto_segundos
+    liberadas = 0
+    conn = obtener_conexion(db_path)
+    try:
+        (modo,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        if modo != 2:  # 2 = INCREMENTAL
+            return 0
+        while time.monotonic() < limite:
+            (libres,) = conn.execute("PRAGMA freelist_count").fetchone()
+            if libres == 0:
+                break
+            conn.execute(f"PRAGMA incremental_vacuum({min(libres, paginas_por_paso)})").fetchall()
+            liberadas += min(libres, paginas_por_paso)
+    finally:
+        cerrar_conexion(conn)
+    return liberadas
+
+
+def habilitar_vacuum_incremental(db_path: Optional[str] = None) -> None:
+    """
+    Activa auto_vacuum = INCREMENTAL en una base creada sin él. Requiere un
+    VACUUM completo (bloqueante): ejecutarlo una sola vez, fuera de horario.
+    """
+    conn = obtener_conexion(db_path)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        cerrar_conexion(conn)
+
+
+class PurgaPeriodica(threading.Thread):
+    """
+    Hilo daemon que ejecuta `purgar_bajas` cada `intervalo` segundos sobre
+    cada una de las bases (todos los shards, si el almacén está particionado).
+    """
+
+    def __init__(
+        self,
+        intervalo: float = PURGA_INTERVALO_SEGUNDOS,
+        rutas: Optional[List[Optional[str]]] = None,
+        **opciones,
+    ):
+        super().__init__(name="purga-bajas", daemon=True)
+        self.intervalo = intervalo
+        # None = la base por defecto (DB_PATH); [] = ninguna (motor en memoria)
+        self.rutas = [None] if rutas is None else list(rutas)
+        self.opciones = opciones
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            for ruta in self.rutas:
+                try:
+                    purgar_bajas(db_path=ruta, **self.opciones)
+                except Exception as err:
+                    # Un fallo puntual (p. ej. base bloqueada) se reintenta en el próximo ciclo
+                    print(f"Error en la purga de bajas ({ruta or 'DB_PATH'}): {err}")
+
+    def detener(self):
+        self._detener.set()
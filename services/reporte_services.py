@@ -0,0 +1,359 @@
+# services/reporte_services.py
+"""
+Reporte de calidad de datos sobre toda la tabla, repartido en procesos.
+
+Recorrer `obtener_todos()` en un solo proceso deja la validación
+(`Contacto.revisar_calidad`, expresiones regulares, normalización de
+teléfonos) en un único núcleo. Acá la tabla se parte en rangos de id (por base, así los
+shards también se reparten) y cada rango lo procesa un ProcessPoolExecutor,
+cada tarea con su propia conexión de lectura. Cada rango devuelve agregados
+parciales (ParcialReporte) que el proceso principal suma, y el resultado se
+escribe como CSV o HTML.
+
+Completitud, errores de validación y conteos por dominio se suman sin más.
+Los duplicados no: el mismo email puede caer en dos rangos distintos, así
+que cada rango devuelve un Counter de huellas de 8 bytes (dominio, huella)
+y los repetidos se cuentan recién después de sumarlos.
+
+Cada tarea lee con su propia transacción, así que con escrituras
+concurrentes el reporte no es una foto de un único instante; `seq` indica
+hasta qué cambio, como mínimo, incluye.
+"""
+import csv
+import hashlib
+import html
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.settings import REPORTE_PARTICIONES_POR_PROCESO, REPORTE_PROCESOS
+from database.conexion import cerrar_conexion, obtener_conexion
+from models.contacto import Contacto
+from repository.cifrado import cifrador_por_defecto
+
+__all__ = ["ParcialReporte", "Reporte", "exportar_reporte", "generar_reporte", "particiones"]
+
+CAMPOS_COMPLETITUD = ("nombre", "apellido", "telefono", "email")
+EJEMPLOS_POR_ERROR = 20  # ids de muestra por cada error de validación
+
+# (ruta, desde_id, hasta_id), ambos extremos incluidos
+Particion = Tuple[Optional[str], int, int]
+
+_SQL_FILAS = (
+    "SELECT id, nombre, apellido, telefono, email, email_dominio, email_indice FROM contactos "
+    "WHERE baja IS NULL AND id BETWEEN ? AND ?"
+)
+
+
+def _huella(*partes: str) -> int:
+    """Huella de 64 bits: pesa poco al volver del proceso y choca con probabilidad despreciable."""
+    datos = "\0".join(partes).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), "little")
+
+
+@dataclass
+class ParcialReporte:
+    """Agregados de un rango de ids (o, sumados, de toda la tabla)."""
+
+    contactos: int = 0
+    validos: int = 0
+    completos: Counter = field(default_factory=Counter)  # campo -> contactos con el campo cargado
+    errores: Counter = field(default_factory=Counter)  # mensaje de revisar_calidad() -> contactos
+    ejemplos: Dict[str, List[int]] = field(default_factory=dict)  # mensaje -> algunos ids
+    por_dominio: Counter = field(default_factory=Counter)  # dominio -> contactos
+    invalidos_dominio: Counter = field(default_factory=Counter)  # dominio -> contactos inválidos
+    emails: Counter = field(default_factory=Counter)  # (dominio, huella del email) -> contactos
+    nombres: Counter = field(default_factory=Counter)  # (dominio, huella de nombre y apellido)
+
+    def agregar(self, contacto: Contacto, dominio: str, clave_email: str) -> None:
+        self.contactos += 1
+        for campo in CAMPOS_COMPLETITUD:
+            if getattr(contacto, campo):
+                self.completos[campo] += 1
+        errores = contacto.revisar_calidad()
+        if not errores:
+            self.validos += 1
+        else:
+            self.invalidos_dominio[dominio] += 1
+        for error in errores:
+            self.errores[error] += 1
+            ejemplos = self.ejemplos.setdefault(error, [])
+            if len(ejemplos) < EJEMPLOS_POR_ERROR:
+                ejemplos.append(contacto.id)
+        self.por_dominio[dominio] += 1
+        if clave_email:
+            self.emails[(dominio, _huella(clave_email))] += 1
+        if contacto.nombre or contacto.apellido:
+            nombre = f"{contacto.nombre.casefold()}\0{contacto.apellido.casefold()}"
+            self.nombres[(dominio, _huella(nombre))] += 1
+
+    def sumar(self, otro: "ParcialReporte") -> None:
+        self.contactos += otro.contactos
+        self.validos += otro.validos
+        for propio, ajeno in (
+            (self.completos, otro.completos),
+            (self.errores, otro.errores),
+            (self.por_dominio, otro.por_dominio),
+            (self.invalidos_dominio, otro.invalidos_dominio),
+            (self.emails, otro.emails),
+            (self.nombres, otro.nombres),
+        ):
+            propio.update(ajeno)
+        for error, ids in otro.ejemplos.items():
+            ejemplos = self.ejemplos.setdefault(error, [])
+            ejemplos.extend(ids[: EJEMPLOS_POR_ERROR - len(ejemplos)])
+
+
+def _procesar(particion: Particion) -> ParcialReporte:
+    """Tarea de un proceso del pool: valida y agrega un rango de ids con su propia conexión."""
+    ruta, desde, hasta = particion
+    cifrador = cifrador_por_defecto()
+    parcial = ParcialReporte()
+    conn = obtener_conexion(ruta)
+    try:
+        conn.execute("PRAGMA query_only = ON")
+        for id_, nombre, apellido, telefono, email, dominio, indice in conn.execute(
+            _SQL_FILAS, (desde, hasta)
+        ):
+            if cifrador:
+                telefono = cifrador.descifrar(telefono, "telefono")
+                email = cifrador.descifrar(email, "email")
+            contacto = Contacto(id_, nombre, apellido, telefono, email)
+            # Con cifrado, el índice ciego identifica al email igual que el texto
+            parcial.agregar(contacto, dominio or "", indice or contacto.email)
+    finally:
+        cerrar_conexion(conn)
+    return parcial
+
+
+def particiones(rutas: Iterable[Optional[str]], cantidad: int) -> List[Particion]:
+    """
+    Parte cada base en rangos de id de igual ancho, en total unos `cantidad`
+    repartidos según el tamaño de cada base. Los ids son autoincrementales y
+    las bajas purgadas dejan huecos pocos y chicos, así que rangos de igual
+    ancho tienen más o menos las mismas filas.
+    """
+    extremos = []
+    for ruta in rutas:
+        conn = obtener_conexion(ruta)
+        try:
+            minimo, maximo, filas = conn.execute(
+                "SELECT MIN(id), MAX(id), COUNT(*) FROM contactos WHERE baja IS NULL"
+            ).fetchone()
+        finally:
+            cerrar_conexion(conn)
+        if filas:
+            extremos.append((ruta, minimo, maximo, filas))
+
+    total = sum(filas for *_, filas in extremos)
+    resultado: List[Particion] = []
+    for ruta, minimo, maximo, filas in extremos:
+        partes = max(1, min(round(cantidad * filas / total), maximo - minimo + 1))
+        ancho = (maximo - minimo + 1) / partes
+        for i in range(partes):
+            desde = minimo + round(i * ancho)
+            hasta = minimo + round((i + 1) * ancho) - 1
+            resultado.append((ruta, desde, hasta))
+    return resultado
+
+
+@dataclass
+class Reporte:
+    """Resultado de generar_reporte: los agregados y cómo se calcularon."""
+
+    parcial: ParcialReporte
+    seq: int  # último cambio registrado al empezar (el reporte lo incluye)
+    procesos: int
+    particiones: int
+    segundos: float
+
+    @property
+    def contactos(self) -> int:
+        return self.parcial.contactos
+
+    def completitud(self) -> List[Tuple[str, int, float]]:
+        """(campo, contactos con el campo cargado, proporción)."""
+        total = self.contactos
+        return [
+            (campo, self.parcial.completos[campo], self.parcial.completos[campo] / total if total else 0.0)
+            for campo in CAMPOS_COMPLETITUD
+        ]
+
+    def errores(self) -> List[Tuple[str, int, List[int]]]:
+        """(error de validación, contactos, ids de ejemplo), de más a menos frecuente."""
+        return [
+            (error, cantidad, sorted(self.parcial.ejemplos.get(error, [])))
+            for error, cantidad in self.parcial.errores.most_common()
+        ]
+
+    def dominios(self) -> List[Tuple[str, int, int, int, int]]:
+        """
+        Por dominio, de más a menos contactos: (dominio, contactos, inválidos,
+        emails repetidos, nombres repetidos). "Repetidos" cuenta los contactos
+        de más: tres contactos con el mismo email suman 2.
+        """
+        emails_repetidos: Counter = Counter()
+        for (dominio, _), cantidad in self.parcial.emails.items():
+            if cantidad > 1:
+                emails_repetidos[dominio] += cantidad - 1
+        nombres_repetidos: Counter = Counter()
+        for (dominio, _), cantidad in self.parcial.nombres.items():
+            if cantidad > 1:
+                nombres_repetidos[dominio] += cantidad - 1
+        return [
+            (
+                dominio,
+                cantidad,
+                self.parcial.invalidos_dominio[dominio],
+                emails_repetidos[dominio],
+                nombres_repetidos[dominio],
+            )
+            for dominio, cantidad in self.parcial.por_dominio.most_common()
+        ]
+
+    def texto(self, limite: int = 15) -> str:
+        total = self.contactos
+        lineas = [
+            f"Contactos activos: {total} · válidos {self.parcial.validos} "
+            f"({100 * self.parcial.validos / total if total else 0:.1f}%) · seq {self.seq}",
+            f"{self.particiones} rangos en {self.procesos} procesos, {self.segundos:.2f} s",
+            "",
+            "Completitud:",
+        ]
+        for campo, cantidad, proporcion in self.completitud():
+            lineas.append(f"  {campo:<30} {cantidad:>10} {proporcion:7.1%}")
+        lineas += ["", "Errores de validación:"]
+        for error, cantidad, ids in self.errores():
+            lineas.append(f"  {error:<60} {cantidad:>8}  ej. {', '.join(map(str, ids[:5]))}")
+        lineas += ["", f"  {'dominio':<30} {'contactos':>10} {'inválidos':>10} {'emails rep.':>12} {'nombres rep.':>12}"]
+        for dominio, cantidad, invalidos, emails, nombres in self.dominios()[:limite]:
+            lineas.append(
+                f"  {dominio or '(vacío)':<30} {cantidad:>10} {invalidos:>10} {emails:>12} {nombres:>12}"
+            )
+        return "\n".join(lineas)
+
+
+def generar_reporte(
+    rutas: Iterable[Optional[str]] = (None,),
+    procesos: Optional[int] = None,
+    particiones_por_proceso: int = REPORTE_PARTICIONES_POR_PROCESO,
+) -> Reporte:
+    """
+    Reporte de calidad de los contactos activos de `rutas` (None = DB_PATH;
+    varias rutas = los shards). `procesos` None usa REPORTE_PROCESOS o, si
+    tampoco está fijado, un proceso por núcleo; con 1 se procesa todo en
+    este proceso, sin pool. Hay varios rangos por proceso para que uno más
+    lento no deje a los demás esperando.
+    """
+    rutas = list(rutas)
+    procesos = max(1, procesos or REPORTE_PROCESOS or os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    seq = 0
+    for ruta in rutas:
+        conn = obtener_conexion(ruta)
+        try:
+            row = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'contactos_cambios'"
+            ).fetchone()
+        finally:
+            cerrar_conexion(conn)
+        seq = max(seq, row[0] if row else 0)
+
+    tareas = particiones(rutas, procesos * max(1, particiones_por_proceso))
+    total = ParcialReporte()
+    if procesos == 1 or len(tareas) <= 1:
+        for tarea in tareas:
+            total.sumar(_procesar(tarea))
+    else:
+        # spawn: mismo comportamiento en Windows y Linux (como en carga_services)
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(min(procesos, len(tareas)), mp_context=contexto) as pool:
+            for parcial in pool.map(_procesar, tareas):
+                total.sumar(parcial)
+    return Reporte(total, seq, procesos, len(tareas), time.perf_counter() - inicio)
+
+
+# ---------------------------------------------------------------------------
+# Salida
+# ---------------------------------------------------------------------------
+def _secciones(reporte: Reporte) -> List[Tuple[str, Tuple[str, ...], List[tuple]]]:
+    """(título, encabezados, filas) de cada tabla del reporte, para CSV y HTML."""
+    return [
+        (
+            "Resumen",
+            ("indicador", "valor"),
+            [
+                ("contactos", reporte.contactos),
+                ("validos", reporte.parcial.validos),
+                ("invalidos", reporte.contactos - reporte.parcial.validos),
+                ("seq", reporte.seq),
+            ],
+        ),
+        (
+            "Completitud",
+            ("campo", "contactos", "proporcion"),
+            [(campo, cantidad, f"{proporcion:.4f}") for campo, cantidad, proporcion in reporte.completitud()],
+        ),
+        (
+            "Errores de validación",
+            ("error", "contactos", "ids_ejemplo"),
+            [(error, cantidad, " ".join(map(str, ids))) for error, cantidad, ids in reporte.errores()],
+        ),
+        (
+            "Por dominio",
+            ("dominio", "contactos", "invalidos", "emails_repetidos", "nombres_repetidos"),
+            reporte.dominios(),
+        ),
+    ]
+
+
+def _escribir_csv(reporte: Reporte, f) -> None:
+    # Un solo archivo: una columna "seccion" delante de cada tabla
+    writer = csv.writer(f)
+    for titulo, encabezados, filas in _secciones(reporte):
+        writer.writerow(("seccion",) + encabezados)
+        for fila in filas:
+            writer.writerow((titulo,) + tuple(fila))
+        writer.writerow(())
+
+
+def _escribir_html(reporte: Reporte, f) -> None:
+    e = html.escape
+    f.write(
+        "<!DOCTYPE html>\n<html lang=\"es\"><head><meta charset=\"utf-8\">"
+        "<title>Calidad de contactos</title><style>"
+        "body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}"
+        "th,td{border:1px solid #ccc;padding:.25em .6em}td.n{text-align:right}"
+        "</style></head><body>\n"
+        f"<h1>Calidad de contactos</h1><p>{reporte.contactos} contactos activos · "
+        f"{reporte.particiones} rangos en {reporte.procesos} procesos · {reporte.segundos:.2f} s</p>\n"
+    )
+    for titulo, encabezados, filas in _secciones(reporte):
+        f.write(f"<h2>{e(titulo)}</h2><table><tr>")
+        f.write("".join(f"<th>{e(h)}</th>" for h in encabezados))
+        f.write("</tr>\n")
+        for fila in filas:
+            celdas = (
+                f'<td class="n">{v}</td>' if isinstance(v, int) else f"<td>{e(str(v))}</td>"
+                for v in fila
+            )
+            f.write(f"<tr>{''.join(celdas)}</tr>\n")
+        f.write("</table>\n")
+    f.write("</body></html>\n")
+
+
+def exportar_reporte(reporte: Reporte, destino: str) -> str:
+    """Escribe el reporte como HTML (.html/.htm) o CSV (cualquier otra extensión). Retorna el formato."""
+    formato = "html" if destino.lower().endswith((".html", ".htm")) else "csv"
+    if formato == "html":
+        with open(destino, "w", encoding="utf-8") as f:
+            _escribir_html(reporte, f)
+    else:
+        # UTF-8 con BOM, para Excel (como exportacion_services)
+        with open(destino, "w", newline="", encoding="utf-8-sig") as f:
+            _escribir_csv(reporte, f)
+    return formato
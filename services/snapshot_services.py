@@ -0,0 +1,313 @@
+# services/snapshot_services.py
+"""
+Snapshot columnar de solo lectura de la tabla `contactos`, pensado para
+trabajos de reportes que leen la tabla completa una y otra vez.
+
+Formato del archivo (little-endian, secciones alineadas a 8 bytes):
+
+    cabecera   MAGIA, versión, cantidad de filas, id máximo, seq del
+               registro de cambios al momento de exportar
+    directorio por columna: (offset, largo) de sus secciones
+    ids        int64[n] ordenados (índice ordenado para búsqueda por id)
+    por cada columna de texto:
+        offsets  uint64[n + 1] dentro del heap
+        heap     bytes UTF-8 concatenados
+
+El lector mapea el archivo con `mmap` en modo lectura: varios procesos que
+abren el mismo snapshot comparten las páginas del page cache del sistema
+operativo y ninguno copia los datos. El archivo se reemplaza de forma atómica
+(`os.replace`), así que los lectores que ya lo tienen abierto siguen viendo la
+versión anterior hasta que lo vuelven a abrir.
+
+El refresco incremental usa el registro de cambios (contactos_cambios): solo
+relee de la base los contactos tocados desde el seq guardado en la cabecera.
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Tuple
+
+from database.conexion import obtener_conexion, cerrar_conexion
+from models.contacto import Contacto
+from repository.cambio_repository import CambioRepository
+from repository.cifrado import cifrador_por_defecto
+
+__all__ = ["exportar_snapshot", "actualizar_snapshot", "Snapshot"]
+
+MAGIA = b"CTSNAP01"
+VERSION = 2
+COLUMNAS = ("nombre", "apellido", "telefono", "email")
+
+# magia, versión, cantidad de columnas, filas, id máximo, seq de cambios
+_CABECERA = struct.Struct("<8sIIqqq")
+# offset y largo de la sección de offsets, offset y largo del heap
+_DIRECTORIO = struct.Struct("<qqqq")
+
+# Solo contactos activos (las bajas lógicas no se exportan)
+_SELECT = "SELECT id, nombre, apellido, telefono, email FROM contactos WHERE baja IS NULL"
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class _Columnas:
+    """Acumula ids y columnas de texto antes de escribir el archivo."""
+
+    def __init__(self, seq: int = 0):
+        self.seq = seq
+        self.ids = array("q")
+        self.offsets = [array("Q", [0]) for _ in COLUMNAS]
+        self.heaps = [bytearray() for _ in COLUMNAS]
+
+    def agregar_bytes(self, contacto_id: int, valores) -> None:
+        self.ids.append(contacto_id)
+        for i, valor in enumerate(valores):
+            heap = self.heaps[i]
+            heap += valor
+            self.offsets[i].append(len(heap))
+
+    def agregar_filas(self, filas) -> None:
+        for fila in filas:
+            self.agregar_bytes(
+                fila[0], [(valor or "").encode("utf-8") for valor in fila[1:]]
+            )
+
+
+def _escribir(destino: str, cols: _Columnas) -> None:
+    """Escribe el snapshot en un temporal y lo publica con os.replace."""
+    n = len(cols.ids)
+    max_id = cols.ids[-1] if n else 0
+
+    pos = _alinear(_CABECERA.size + _DIRECTORIO.size * len(COLUMNAS))
+    pos_ids = pos
+    pos = _alinear(pos + n * 8)
+    directorio = []
+    for offsets, heap in zip(cols.offsets, cols.heaps):
+        pos_off = pos
+        pos = _alinear(pos + len(offsets) * 8)
+        pos_heap = pos
+        pos = _alinear(pos + len(heap))
+        directorio.append((pos_off, len(offsets) * 8, pos_heap, len(heap)))
+
+    tmp = f"{destino}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_CABECERA.pack(MAGIA, VERSION, len(COLUMNAS), n, max_id, cols.seq))
+        for entrada in directorio:
+            f.write(_DIRECTORIO.pack(*entrada))
+        f.seek(pos_ids)
+        f.write(cols.ids.tobytes())
+        for (pos_off, _, pos_heap, _), offsets, heap in zip(
+            directorio, cols.offsets, cols.heaps
+        ):
+            f.seek(pos_off)
+            f.write(offsets.tobytes())
+            f.seek(pos_heap)
+            f.write(heap)
+        f.truncate(pos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, destino)
+
+
+def exportar_snapshot(destino: str, db_path: Optional[str] = None) -> int:
+    """Exporta la tabla completa al snapshot `destino`. Retorna las filas escritas."""
+    # El seq se toma antes de leer: un cambio concurrente queda incluido en las
+    # filas y además se vuelve a aplicar (de forma idempotente) al refrescar.
+    cols = _Columnas(CambioRepository(db_path).ultimo_seq())
+    conn = obtener_conexion(db_path)
+    try:
+        cursor = conn.execute(f"{_SELECT} ORDER BY id")
+        while True:
+            filas = cursor.fetchmany(5000)
+            if not filas:
+                break
+            cols.agregar_filas(filas)
+    finally:
+        cerrar_conexion(conn)
+    _escribir(destino, cols)
+    return len(cols.ids)
+
+
+def actualizar_snapshot(destino: str, db_path: Optional[str] = None) -> int:
+    """
+    Refresca el snapshot de forma incremental: lee de la base solo los
+    contactos con cambios posteriores al seq del snapshot y copia tal cual los
+    bytes ya codificados del resto. Retorna la cantidad de contactos tocados
+    (0 = no se reescribió) o, si se reconstruye, las filas exportadas.
+
+    Si el registro de cambios fue compactado más allá del seq del snapshot (o
+    el archivo no existe o es de otra versión) se exporta completo.
+    """
+    cambios = CambioRepository(db_path)
+    try:
+        snap = Snapshot(destino)
+    except (OSError, ValueError):
+        return exportar_snapshot(destino, db_path)
+
+    with snap:
+        if cambios.compactado_hasta() > snap.seq:
+            snap.cerrar()
+            return exportar_snapshot(destino, db_path)
+
+        hasta = cambios.ultimo_seq()
+        if hasta <= snap.seq:
+            return 0
+
+        conn = obtener_conexion(db_path)
+        try:
+            tocados = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT DISTINCT contacto_id FROM contactos_cambios "
+                    "WHERE seq > ? AND seq <= ? ORDER BY contacto_id",
+                    (snap.seq, hasta),
+                )
+            ]
+            frescas = []
+            for i in range(0, len(tocados), 500):
+                lote = tocados[i : i + 500]
+                marcas = ", ".join("?" * len(lote))
+                frescas += conn.execute(
+                    f"{_SELECT} AND id IN ({marcas})", lote
+                ).fetchall()
+        finally:
+            cerrar_conexion(conn)
+        frescas.sort()
+
+        # Merge por id: filas intactas del snapshot + filas releídas
+        descartar = set(tocados)
+        columnas = [snap.columna(nombre) for nombre in COLUMNAS]
+        cols = _Columnas(hasta)
+        k = 0
+        for i, contacto_id in enumerate(snap.ids):
+            while k < len(frescas) and frescas[k][0] < contacto_id:
+                cols.agregar_filas([frescas[k]])
+                k += 1
+            if contacto_id not in descartar:
+                cols.agregar_bytes(contacto_id, [col[i] for col in columnas])
+        cols.agregar_filas(frescas[k:])
+        del columnas
+
+    _escribir(destino, cols)
+    return len(tocados)
+
+
+class ColumnaTexto:
+    """Vista de una columna de texto del snapshot, sin copiar datos."""
+
+    def __init__(self, offsets: memoryview, heap: memoryview):
+        self.offsets = offsets
+        self.heap = heap
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> memoryview:
+        """Bytes UTF-8 de la fila i (memoryview sobre el mapeo)."""
+        return self.heap[self.offsets[i] : self.offsets[i + 1]]
+
+    def texto(self, i: int) -> str:
+        return str(self[i], "utf-8")
+
+    def __iter__(self) -> Iterator[memoryview]:
+        offsets, heap = self.offsets, self.heap
+        for i in range(len(offsets) - 1):
+            yield heap[offsets[i] : offsets[i + 1]]
+
+
+class Snapshot:
+    """
+    Lector de un snapshot mapeado en memoria.
+    - `ids` y `columna(nombre)` exponen los datos sin copiarlos.
+    - `obtener(id)` busca por id con bisección sobre el índice ordenado.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = open(ruta, "rb")
+        try:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._archivo.close()
+            raise ValueError(f"Snapshot vacío o inválido: {ruta}")
+        self._vista = memoryview(self._mapa)
+
+        magia, version, ncols, n, max_id, seq = _CABECERA.unpack_from(self._mapa, 0)
+        if magia != MAGIA or version != VERSION or ncols != len(COLUMNAS):
+            self._vista.release()
+            self._mapa.close()
+            self._archivo.close()
+            raise ValueError(f"Formato de snapshot no reconocido: {ruta}")
+        self.max_id = max_id
+        self.seq = seq
+
+        pos_ids = _alinear(_CABECERA.size + _DIRECTORIO.size * ncols)
+        self.ids = self._vista[pos_ids : pos_ids + n * 8].cast("q")
+        self._columnas = {}
+        for i, nombre in enumerate(COLUMNAS):
+            pos_off, largo_off, pos_heap, largo_heap = _DIRECTORIO.unpack_from(
+                self._mapa, _CABECERA.size + i * _DIRECTORIO.size
+            )
+            self._columnas[nombre] = ColumnaTexto(
+                self._vista[pos_off : pos_off + largo_off].cast("Q"),
+                self._vista[pos_heap : pos_heap + largo_heap],
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def columna(self, nombre: str) -> ColumnaTexto:
+        return self._columnas[nombre]
+
+    def posicion(self, contacto_id: int) -> Optional[int]:
+        """Posición de la fila con ese id, o None si no está en el snapshot."""
+        i = bisect_left(self.ids, contacto_id)
+        if i < len(self.ids) and self.ids[i] == contacto_id:
+            return i
+        return None
+
+    def fila(self, i: int) -> Tuple[int, str, str, str, str]:
+        """
+        Fila i con telefono/email en claro. Con CIFRADO_CAMPOS el archivo los
+        guarda cifrados, como la base, y `columna()` los da tal cual.
+        """
+        nombre, apellido, telefono, email = (
+            self._columnas[columna].texto(i) for columna in COLUMNAS
+        )
+        cifrador = cifrador_por_defecto()
+        if cifrador:
+            telefono = cifrador.descifrar(telefono, "telefono")
+            email = cifrador.descifrar(email, "email")
+        return (self.ids[i], nombre, apellido, telefono, email)
+
+    def obtener(self, contacto_id: int) -> Optional[Contacto]:
+        """Construye el Contacto con ese id, o None si no existe."""
+        i = self.posicion(contacto_id)
+        return Contacto.from_row(self.fila(i)) if i is not None else None
+
+    def contactos(self) -> List[Contacto]:
+        return [Contacto.from_row(self.fila(i)) for i in range(len(self))]
+
+    def cerrar(self) -> None:
+        """Libera las vistas y el mapeo (no debe quedar ninguna vista viva)."""
+        if self._mapa is None:
+            return
+        self.ids.release()
+        for col in self._columnas.values():
+            col.offsets.release()
+            col.heap.release()
+        self.ids = None
+        self._columnas = {}
+        self._vista.release()
+        self._mapa.close()
+        self._archivo.close()
+        self._mapa = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
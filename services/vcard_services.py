@@ -0,0 +1,368 @@
+# services/vcard_services.py
+"""
+Importación y exportación de contactos en vCard (.vcf), el formato con el
+que los teléfonos y las agendas de correo intercambian contactos.
+
+Lectura: versiones 2.1 (la que exportan muchos teléfonos, con
+QUOTED-PRINTABLE), 3.0 y 4.0. De cada tarjeta se toman N (o FN si no hay
+N), el TEL y el EMAIL preferidos (PREF / TYPE=pref, si no el celular, si no
+el primero); el resto de las propiedades (fotos, direcciones...) se ignora.
+Escritura: 3.0 (por defecto) o 4.0, con líneas CRLF plegadas a 75 octetos.
+
+Un volcado de cientos de MB no se carga entero: el archivo se corta en
+trozos de VCARD_TROZO_BYTES alineados al comienzo de una tarjeta
+(BEGIN:VCARD), cada trozo se parsea en un ProcessPoolExecutor y el proceso
+principal inserta los contactos de a VCARD_LOTE por transacción
+(agregar_lote). Nunca hay más de dos trozos por proceso en vuelo, así que la
+memoria no depende del tamaño del archivo. La exportación recorre la base
+con `iterar()` y escribe a medida que lee.
+"""
+import multiprocessing
+import os
+import quopri
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import VCARD_LOTE, VCARD_PROCESOS, VCARD_TROZO_BYTES
+from models.contacto import Contacto
+
+__all__ = [
+    "ResultadoImportacion",
+    "escribir_vcard",
+    "exportar_vcard",
+    "importar_vcard",
+    "leer_vcard",
+    "trozos",
+    "vcard",
+]
+
+VERSIONES = ("3.0", "4.0")
+ANCHO_LINEA = 75  # octetos por línea física antes de plegar (RFC 6350 §3.2)
+
+# (ruta, desde_byte, hasta_byte): un tramo del archivo con tarjetas enteras
+Trozo = Tuple[str, int, int]
+
+# (nombre, parámetros en mayúsculas, valor) de una línea de contenido
+Propiedad = Tuple[str, Dict[str, List[str]], str]
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+def _es_quoted_printable(linea: str) -> bool:
+    cabecera = linea.split(":", 1)[0].upper()
+    return "QUOTED-PRINTABLE" in cabecera
+
+
+def _lineas_logicas(lineas: Iterable[str]) -> Iterator[str]:
+    """
+    Despliega las líneas plegadas: las que empiezan con espacio o tab
+    continúan la anterior (3.0/4.0) y, en QUOTED-PRINTABLE (2.1), un '=' al
+    final también.
+    """
+    actual = None
+    for linea in lineas:
+        linea = linea.rstrip("\r\n")
+        if actual is not None:
+            if linea[:1] in (" ", "\t"):
+                actual += linea[1:]
+                continue
+            if actual.endswith("=") and _es_quoted_printable(actual):
+                actual = actual[:-1] + linea
+                continue
+            yield actual
+        actual = linea
+    if actual is not None:
+        yield actual
+
+
+def _partir(texto: str, separador: str) -> List[str]:
+    """Parte `texto` en `separador`, salvo dentro de comillas o escapado con '\\'."""
+    if '"' not in texto and "\\" not in texto:
+        return texto.split(separador)
+    partes, actual, comillas, escape = [], [], False, False
+    for caracter in texto:
+        if escape:
+            actual.append(caracter)
+            escape = False
+        elif caracter == "\\":
+            actual.append(caracter)
+            escape = True
+        elif caracter == '"':
+            actual.append(caracter)
+            comillas = not comillas
+        elif caracter == separador and not comillas:
+            partes.append("".join(actual))
+            actual = []
+        else:
+            actual.append(caracter)
+    partes.append("".join(actual))
+    return partes
+
+
+def _desescapar(valor: str) -> str:
+    if "\\" not in valor:
+        return valor
+    resultado, escape = [], False
+    for caracter in valor:
+        if escape:
+            resultado.append("\n" if caracter in "nN" else caracter)
+            escape = False
+        elif caracter == "\\":
+            escape = True
+        else:
+            resultado.append(caracter)
+    return "".join(resultado)
+
+
+def _propiedad(linea: str) -> Optional[Propiedad]:
+    """Separa una línea lógica en (nombre, parámetros, valor crudo); None si no es una propiedad."""
+    fin = linea.find(":")
+    if fin < 0:
+        return None
+    cabecera = linea[:fin]
+    if '"' in cabecera:  # un parámetro entre comillas puede contener ':'
+        cabecera = _partir(linea, ":")[0]
+        if len(cabecera) == len(linea):
+            return None
+    valor = linea[len(cabecera) + 1 :]
+    nombre, *crudos = _partir(cabecera, ";")
+    nombre = nombre.rsplit(".", 1)[-1].strip().upper()  # sin el grupo ("item1.EMAIL")
+    parametros: Dict[str, List[str]] = {}
+    for crudo in crudos:
+        clave, igual, valores = crudo.partition("=")
+        if not igual:  # 2.1: "TEL;CELL;PREF:..." = TYPE=CELL, TYPE=PREF
+            clave, valores = "TYPE", clave
+        for v in _partir(valores, ","):
+            parametros.setdefault(clave.strip().upper(), []).append(v.strip().strip('"').upper())
+    if "QUOTED-PRINTABLE" in parametros.get("ENCODING", ()):
+        datos = quopri.decodestring(valor.encode("latin-1", "replace"))
+        try:
+            valor = datos.decode((parametros.get("CHARSET") or ["UTF-8"])[0], "replace")
+        except LookupError:
+            valor = datos.decode("utf-8", "replace")
+    return nombre, parametros, valor
+
+
+def _preferida(propiedades: List[Propiedad]) -> str:
+    """Valor de la propiedad preferida: PREF, luego celular, luego la primera."""
+    def rango(prop: Propiedad) -> Tuple[int, int]:
+        _, parametros, _ = prop
+        tipos = parametros.get("TYPE", ())
+        pref = parametros.get("PREF")
+        if pref or "PREF" in tipos:
+            orden = int(pref[0]) if pref and pref[0].isdigit() else 1
+            return (0, orden)
+        return (1 if "CELL" in tipos else 2, 0)
+
+    _, _, valor = min(propiedades, key=rango)  # min es estable: la primera a igual rango
+    valor = _desescapar(valor).strip()
+    for esquema in ("tel:", "mailto:"):  # 4.0 admite TEL/EMAIL como URI
+        if valor.lower().startswith(esquema):
+            return valor[len(esquema) :]
+    return valor
+
+
+def _a_contacto(propiedades: Dict[str, List[Propiedad]]) -> Optional[Contacto]:
+    nombre = apellido = ""
+    if "N" in propiedades:
+        componentes = [
+            " ".join(_desescapar(v).strip() for v in _partir(c, ",") if v.strip())
+            for c in _partir(propiedades["N"][0][2], ";")
+        ] + ["", "", ""]
+        apellido = componentes[0]
+        nombre = " ".join(c for c in componentes[1:3] if c)  # nombres de pila y adicionales
+    if not (nombre or apellido) and "FN" in propiedades:
+        completo = _desescapar(propiedades["FN"][0][2]).split()
+        nombre = " ".join(completo[:-1]) if len(completo) > 1 else " ".join(completo)
+        apellido = completo[-1] if len(completo) > 1 else ""
+    telefono = _preferida(propiedades["TEL"]) if "TEL" in propiedades else ""
+    email = _preferida(propiedades["EMAIL"]) if "EMAIL" in propiedades else ""
+    if not (nombre or apellido or telefono or email):
+        return None
+    return Contacto(None, nombre, apellido, telefono, email)
+
+
+def leer_vcard(lineas: Iterable[str]) -> Iterator[Optional[Contacto]]:
+    """
+    Un Contacto por cada tarjeta de `lineas` (un archivo abierto en modo
+    texto sirve), o None si la tarjeta no tiene nombre, teléfono ni email.
+    Lo que haya fuera de BEGIN:VCARD/END:VCARD se ignora.
+    """
+    propiedades: Optional[Dict[str, List[Propiedad]]] = None
+    for linea in _lineas_logicas(lineas):
+        prop = _propiedad(linea.lstrip("\ufeff"))
+        if prop is None:
+            continue
+        nombre, _, valor = prop
+        if nombre == "BEGIN" and valor.strip().upper() == "VCARD":
+            propiedades = {}
+        elif nombre == "END" and valor.strip().upper() == "VCARD":
+            if propiedades is not None:
+                yield _a_contacto(propiedades)
+            propiedades = None
+        elif propiedades is not None and nombre in ("N", "FN", "TEL", "EMAIL"):
+            propiedades.setdefault(nombre, []).append(prop)
+
+
+def trozos(ruta: str, tamano: int = VCARD_TROZO_BYTES) -> Iterator[Trozo]:
+    """
+    Corta el archivo en tramos de unos `tamano` bytes que empiezan en una
+    línea BEGIN:VCARD (salvo el primero), así cada uno se parsea por su cuenta.
+    Solo lee lo necesario para encontrar los cortes.
+    """
+    total = os.path.getsize(ruta)
+    desde = 0
+    with open(ruta, "rb") as f:
+        while desde < total:
+            hasta = desde + max(1, tamano)
+            if hasta >= total:
+                yield ruta, desde, total
+                return
+            f.seek(hasta)
+            f.readline()  # el resto de la línea en la que cayó el corte
+            while True:
+                hasta = f.tell()
+                linea = f.readline()
+                if not linea or linea[:11].upper() == b"BEGIN:VCARD":
+                    break
+            yield ruta, desde, hasta
+            desde = hasta
+
+
+def _parsear_trozo(trozo: Trozo) -> Tuple[List[tuple], int]:
+    """Tarea del pool: (filas de los contactos del tramo, tarjetas vacías omitidas)."""
+    ruta, desde, hasta = trozo
+    with open(ruta, "rb") as f:
+        f.seek(desde)
+        texto = f.read(hasta - desde).decode("utf-8", "replace")
+    filas, omitidas = [], 0
+    for contacto in leer_vcard(texto.splitlines()):
+        if contacto is None:
+            omitidas += 1
+        else:
+            filas.append(contacto.to_tuple())
+    return filas, omitidas
+
+
+def _parseados(tareas: Iterator[Trozo], procesos: int) -> Iterator[Tuple[List[tuple], int]]:
+    """Resultados de `_parsear_trozo` en orden, con a lo sumo dos trozos por proceso en vuelo."""
+    if procesos == 1:
+        yield from map(_parsear_trozo, tareas)
+        return
+    # spawn: mismo comportamiento en Windows y Linux (como en reporte_services)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(procesos, mp_context=contexto) as pool:
+        en_vuelo = deque()
+        for tarea in tareas:
+            en_vuelo.append(pool.submit(_parsear_trozo, tarea))
+            if len(en_vuelo) >= 2 * procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+@dataclass
+class ResultadoImportacion:
+    importados: int  # contactos insertados
+    omitidos: int  # tarjetas sin nombre, teléfono ni email
+    trozos: int
+    procesos: int
+    segundos: float
+
+
+def importar_vcard(
+    repo,
+    ruta: str,
+    procesos: Optional[int] = None,
+    tamano_trozo: int = VCARD_TROZO_BYTES,
+    lote: int = VCARD_LOTE,
+) -> ResultadoImportacion:
+    """
+    Importa las tarjetas de `ruta` como contactos nuevos de `repo` (simple,
+    particionado o espejo). `procesos` None usa VCARD_PROCESOS o uno por
+    núcleo; con 1 se parsea en este proceso. Se insertan de a `lote` por
+    transacción: si algo falla a mitad, lo ya insertado queda.
+    """
+    procesos = max(1, procesos or VCARD_PROCESOS or os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    importados = omitidos = cantidad = 0
+    pendientes: List[Contacto] = []
+    for filas, vacias in _parseados(trozos(ruta, tamano_trozo), procesos):
+        cantidad += 1
+        omitidos += vacias
+        for fila in filas:
+            pendientes.append(Contacto(None, *fila))
+            if len(pendientes) >= lote:
+                importados += repo.agregar_lote(pendientes)
+                pendientes = []
+    if pendientes:
+        importados += repo.agregar_lote(pendientes)
+    return ResultadoImportacion(
+        importados, omitidos, cantidad, procesos, time.perf_counter() - inicio
+    )
+
+
+# ---------------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------------
+def _escapar(valor: str) -> str:
+    return (
+        valor.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+    )
+
+
+def _plegar(linea: str) -> str:
+    """Pliega una línea a ANCHO_LINEA octetos sin partir caracteres UTF-8."""
+    if len(linea.encode("utf-8")) <= ANCHO_LINEA:
+        return linea + "\r\n"
+    partes, actual, octetos = [], [], 0
+    for caracter in linea:
+        largo = len(caracter.encode("utf-8"))
+        limite = ANCHO_LINEA if not partes else ANCHO_LINEA - 1  # las siguientes llevan un espacio
+        if octetos + largo > limite:
+            partes.append("".join(actual))
+            actual, octetos = [], 0
+        actual.append(caracter)
+        octetos += largo
+    partes.append("".join(actual))
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def vcard(contacto: Contacto, version: str = "3.0") -> str:
+    """La tarjeta de un contacto, en la versión pedida (3.0 o 4.0)."""
+    if version not in VERSIONES:
+        raise ValueError(f"Versión de vCard no soportada: {version!r} (usar {', '.join(VERSIONES)})")
+    completo = " ".join(p for p in (contacto.nombre, contacto.apellido) if p)
+    lineas = [
+        "BEGIN:VCARD",
+        f"VERSION:{version}",
+        f"N:{_escapar(contacto.apellido)};{_escapar(contacto.nombre)};;;",
+        f"FN:{_escapar(completo)}",
+    ]
+    if contacto.telefono:
+        tipo = "CELL" if version == "3.0" else "cell"
+        lineas.append(f"TEL;TYPE={tipo}:{_escapar(contacto.telefono)}")
+    if contacto.email:
+        tipo = ";TYPE=INTERNET" if version == "3.0" else ""
+        lineas.append(f"EMAIL{tipo}:{_escapar(contacto.email)}")
+    lineas.append("END:VCARD")
+    return "".join(_plegar(linea) for linea in lineas)
+
+
+def escribir_vcard(contactos: Iterable[Contacto], destino: str, version: str = "3.0") -> int:
+    """Escribe los contactos en un .vcf (UTF-8, CRLF), uno por tarjeta. Retorna cuántos."""
+    n = 0
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        for c in contactos:
+            f.write(vcard(c, version))
+            n += 1
+    return n
+
+
+def exportar_vcard(repo, destino: str, version: str = "3.0") -> int:
+    """Exporta todos los contactos activos de `repo` recorriéndolo en streaming."""
+    return escribir_vcard(repo.iterar(), destino, version)